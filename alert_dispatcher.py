@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Alert Dispatcher
+Posts HIGH risk transactions to a webhook in micro-batches, with retries that spill to disk
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Deque, IO, List, Optional
+
+import aiohttp
+
+from json_encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+ALERT_LEVEL = 'HIGH'
+
+
+class AlertDispatcher:
+    """Store listener that sends a webhook alert when a row is stored as HIGH risk.
+
+    Alerts fire on insert, and on replace when a row becomes HIGH, so
+    re-deliveries do not repeat them. submit() only appends to a queue. A
+    background task posts the alerts in batches of up to ``batch_size``,
+    waiting at most ``max_latency`` seconds for a batch to fill. Up to
+    ``concurrency`` posts are in flight at once, all over one pooled
+    session. A slow or failing webhook therefore never holds up ingestion
+    or scoring.
+
+    A failed batch goes to a retry queue and all senders back off
+    exponentially until a shared deadline. Then one batch probes the
+    webhook while the other senders wait for its result, so an outage is
+    not retried ``concurrency`` times as often. Alerts waiting in memory (queued plus retrying) are
+    capped at ``max_pending``. Past that, whole batches are appended to
+    ``spill_path`` as JSON lines. Spilled batches are replayed once
+    deliveries succeed again, including after a restart. Spill writes and
+    replay reads run in order on one I/O thread, so submit() never waits
+    for the disk. 4xx replies other
+    than 408 and 429 mean the webhook rejected the payload, so those
+    batches are dropped rather than retried. Delivery is at least once:
+    a batch that times out after the webhook accepted it is sent again.
+    """
+
+    def __init__(self, url: str, batch_size: int = 100, max_latency: float = 0.5, max_pending: int = 10000,
+                 timeout: float = 5.0, concurrency: int = 4, spill_path: str = 'webhook_spill.jsonl',
+                 min_retry_delay: float = 0.5, max_retry_delay: float = 60.0):
+        self.url = url
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.spill_path = spill_path
+        self.replay_path = spill_path + '.replay'
+        self.min_retry_delay = min_retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.pending: Deque[Dict[str, Any]] = deque()
+        self.retry: Deque[List[Dict[str, Any]]] = deque()
+        self.retry_alerts = 0
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.sent = 0
+        self.batches_sent = 0
+        self.failures = 0
+        self.rejected = 0
+        self.spilled = 0
+        self.last_error: Optional[str] = None
+        self._delay = 0.0
+        # No batch is taken before this monotonic time (infinite while a probe is in flight)
+        self._retry_at = 0.0
+        self._backoff_changed = asyncio.Event()
+        self._first_pending_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._replay: Optional[IO[str]] = None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='alert-spill')
+
+    @classmethod
+    def from_config(cls, config) -> Optional['AlertDispatcher']:
+        """Build the dispatcher for WEBHOOK_URL, or return None when no webhook is configured"""
+        if not config.WEBHOOK_URL:
+            return None
+        return cls(
+            config.WEBHOOK_URL,
+            batch_size=config.WEBHOOK_BATCH_SIZE,
+            max_latency=config.WEBHOOK_BATCH_LATENCY,
+            max_pending=config.WEBHOOK_MAX_PENDING,
+            timeout=config.WEBHOOK_TIMEOUT,
+            concurrency=config.WEBHOOK_CONCURRENCY,
+            spill_path=config.WEBHOOK_SPILL_FILE
+        )
+
+    def on_insert(self, tx: Dict[str, Any]):
+        if tx.get('risk_level') == ALERT_LEVEL:
+            self.submit(tx)
+
+    def on_replace(self, old: Dict[str, Any], new: Dict[str, Any]):
+        if new.get('risk_level') == ALERT_LEVEL and old.get('risk_level') != ALERT_LEVEL:
+            self.submit(new)
+
+    def on_evict(self, tx: Dict[str, Any]):
+        pass
+
+    def submit(self, tx: Dict[str, Any]):
+        """Queue an alert without waiting, spilling a batch to disk if memory is full"""
+        if not self.pending:
+            # Starts the batch's latency clock
+            self._first_pending_at = time.monotonic()
+            self._wakeup.set()
+        self.pending.append({'transaction': dict(tx), 'alerted_at': datetime.now().isoformat()})
+        if len(self.pending) + self.retry_alerts > self.max_pending:
+            self._spill([self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))])
+        if len(self.pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _spill(self, batch: List[Dict[str, Any]]):
+        """Queue a batch for the I/O thread to append to the spill file"""
+        self._io.submit(self._write_spill, batch)
+        self.spilled += len(batch)
+
+    def _write_spill(self, batch: List[Dict[str, Any]]):
+        try:
+            with open(self.spill_path, 'a') as f:
+                f.write(json.dumps(batch) + '\n')
+        except OSError as e:
+            logger.error(f"Could not spill {len(batch)} alerts to {self.spill_path}: {e}")
+
+    def _retry_later(self, batch: List[Dict[str, Any]]):
+        if len(self.pending) + self.retry_alerts + len(batch) > self.max_pending:
+            self._spill(batch)
+        else:
+            self.retry.append(batch)
+            self.retry_alerts += len(batch)
+
+    def _next_replayed(self) -> Optional[List[Dict[str, Any]]]:
+        """Read the next spilled batch, moving the spill file aside to replay it (on the I/O thread)"""
+        if self._replay is None:
+            if not os.path.exists(self.replay_path):
+                if not os.path.exists(self.spill_path):
+                    return None
+                os.replace(self.spill_path, self.replay_path)
+            self._replay = open(self.replay_path)
+        for line in self._replay:
+            if line.strip():
+                return json.loads(line)
+        self._replay.close()
+        self._replay = None
+        os.remove(self.replay_path)
+        return None
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        """Wait for the next batch: retries first, then spilled alerts, then new alerts"""
+        while True:
+            backoff = self._retry_at - time.monotonic()
+            if backoff > 0:
+                try:
+                    await asyncio.wait_for(self._backoff_changed.wait(), None if backoff == float('inf') else backoff)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if self.retry:
+                batch = self.retry.popleft()
+                self.retry_alerts -= len(batch)
+                return batch
+            if self._delay == 0.0:
+                batch = await asyncio.get_running_loop().run_in_executor(self._io, self._next_replayed)
+                if batch:
+                    return batch
+            if self.pending:
+                wait = self._first_pending_at + self.max_latency - time.monotonic()
+                if len(self.pending) >= self.batch_size or wait <= 0:
+                    batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+                    self._first_pending_at = time.monotonic()
+                    return batch
+            else:
+                wait = None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, batch: List[Dict[str, Any]]) -> bool:
+        """POST one batch, returning False if it should be retried"""
+        payload = dumps({'alerts': batch, 'count': len(batch), 'sent_at': datetime.now().isoformat()})
+        try:
+            async with self.session.post(self.url, data=payload,
+                                         headers={'Content-Type': 'application/json'}) as response:
+                if response.status < 300:
+                    self.sent += len(batch)
+                    self.batches_sent += 1
+                    return True
+                if 400 <= response.status < 500 and response.status not in (408, 429):
+                    self.rejected += len(batch)
+                    logger.error(f"Webhook rejected {len(batch)} alerts with HTTP {response.status}")
+                    return True
+                self.last_error = f"HTTP {response.status}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.last_error = str(e) or type(e).__name__
+        return False
+
+    def _set_retry_at(self, retry_at: float):
+        self._retry_at = retry_at
+        self._backoff_changed.set()
+        self._backoff_changed = asyncio.Event()
+
+    async def _sender(self):
+        while True:
+            batch = await self._next_batch()
+            probe = self._delay > 0
+            if probe:
+                self._set_retry_at(float('inf'))
+            try:
+                delivered = await self._deliver(batch)
+            except asyncio.CancelledError:
+                # Shutting down mid-post: keep the batch for close() to spill
+                self.retry.appendleft(batch)
+                self.retry_alerts += len(batch)
+                raise
+            if delivered:
+                if self._delay > 0:
+                    self._delay = 0.0
+                    self._set_retry_at(0.0)
+                continue
+            self.failures += 1
+            self._retry_later(batch)
+            now = time.monotonic()
+            # Posts already in flight when another sender backed off do not back off again
+            if probe or now >= self._retry_at:
+                self._delay = min(max(self._delay * 2, self.min_retry_delay), self.max_retry_delay)
+                self._set_retry_at(now + self._delay)
+                logger.warning(f"Webhook delivery failed ({self.last_error}); retrying in {self._delay:.1f}s")
+
+    async def run(self):
+        """Send alerts until cancelled, backing off while the webhook fails"""
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                             connector=aiohttp.TCPConnector(limit=self.concurrency))
+        try:
+            await asyncio.gather(*(self._sender() for _ in range(self.concurrency)))
+        finally:
+            await self.session.close()
+
+    def close(self):
+        """Spill every undelivered alert, so the next start sends it"""
+        for batch in self.retry:
+            self._spill(batch)
+        self.retry.clear()
+        self.retry_alerts = 0
+        while self.pending:
+            self._spill([self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))])
+        # Wait for every spill to reach the file and any replay read to finish
+        self._io.shutdown(wait=True)
+        if self._replay is not None:
+            self._replay.close()
+            self._replay = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'pending': len(self.pending),
+            'retrying': self.retry_alerts,
+            'sent': self.sent,
+            'batches_sent': self.batches_sent,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'spilled': self.spilled,
+            'retry_delay': self._delay,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Index Benchmark
+Compares filtered and search query latency over the live store with and without indexes
+"""
+
+import argparse
+import random
+import time
+
+from transaction_generator import generate_transactions
+from transaction_index import SortedList, TransactionIndex
+from transaction_query import TransactionQuery
+from transaction_store import TransactionStore
+
+RISK_LEVELS = ['LOW', 'MEDIUM', 'HIGH']
+
+QUERIES = [
+    ('customer', {'customer_id': 'CUST_012345'}),
+    ('customer + type', {'customer_id': 'CUST_012345', 'transaction_type': 'paypal'}),
+    ('status + risk + type', {'status': 'failed', 'risk_level': 'HIGH', 'transaction_type': 'paypal'}),
+    ('category contains', {'category': 'jewel', 'risk_level': 'HIGH'}),
+    ('amount range', {'min_amount': '10000', 'max_amount': '10100'}),
+    ('amount range + status', {'min_amount': '5000', 'status': 'pending', 'risk_level': 'HIGH'}),
+    ('search id', {'q': 'bench_0004200'}),
+    ('search customer', {'q': 'cust_01234'}),
+    ('search merchant, ranked', {'q': 'merchant 42', 'sort': 'relevance'}),
+    ('no filter', {})
+]
+
+
+def build_store(rows: int, index: TransactionIndex) -> TransactionStore:
+    """Fill an indexed store with scored-looking transactions"""
+    rng = random.Random(7)
+    store = TransactionStore(max_transactions=rows, retention_seconds=0)
+    store.add_listener(index)
+    now = time.time()
+    transactions = generate_transactions(rows)
+    for i, tx in enumerate(transactions):
+        tx['risk_level'] = rng.choices(RISK_LEVELS, weights=[80, 15, 5])[0]
+        tx['fraud_risk_score'] = round(rng.random(), 3)
+        tx['timestamp'] = now - rows + i
+    store.upsert_many(transactions)
+    return store
+
+
+def time_query(func, repeats: int):
+    """Run func several times and return (median seconds, last result)"""
+    samples = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    index = TransactionIndex()
+    start = time.perf_counter()
+    store = build_store(args.rows, index)
+    build_time = time.perf_counter() - start
+    backend = 'sortedcontainers' if SortedList is not None else 'bisect list'
+    print(f"Rows: {args.rows:,}  amount index: {backend}  build + index: {build_time:.1f}s")
+    print(f"{'query':<26}{'matched':>10}{'scan ms':>12}{'index ms':>12}{'speedup':>10}")
+
+    for name, params in QUERIES:
+        query = TransactionQuery.from_params(params, default_limit=100)
+        scan_time, scanned = time_query(lambda: query.execute(store.entries()), args.repeats)
+        index_time, indexed = time_query(lambda: query.execute(index.lookup(query, store)), args.repeats)
+        assert scanned == indexed, f'indexed results differ for {name}'
+        print(f"{name:<26}{scanned['summary']['total_transactions']:>10,}{scan_time * 1000:>12.2f}"
+              f"{index_time * 1000:>12.3f}{scan_time / index_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+MCP Client Benchmark
+Measures pooled/pipelined MCP calls against a fresh connection per call
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import List
+
+from fake_mcp_server import FakeMCPServer
+from mcp_client import MCPClientPool
+
+SQL = 'SELECT * FROM `credit-card-transactions` LIMIT 10'
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name: str, latencies: List[float], elapsed: float):
+    print(f"{name:<32}{percentile(latencies, 50) * 1000:>10.2f}{percentile(latencies, 99) * 1000:>10.2f}"
+          f"{len(latencies) / elapsed:>12,.0f}")
+
+
+async def timed_call(pool: MCPClientPool, latencies: List[float]):
+    start = time.perf_counter()
+    await pool.execute_sql('financial-data', SQL)
+    latencies.append(time.perf_counter() - start)
+
+
+async def run(calls: int, concurrency: int, pool_size: int, latency: float):
+    server = FakeMCPServer(latency=latency)
+    url = await server.start()
+    print(f"Fake MCP server at {url}, {latency * 1000:.1f} ms server latency, {calls} calls")
+    print(f"{'mode':<32}{'p50 ms':>10}{'p99 ms':>10}{'calls/s':>12}")
+
+    # A new connection and MCP handshake per call, as a naive client would do
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        call_start = time.perf_counter()
+        pool = MCPClientPool(url, size=1)
+        await pool.start()
+        await pool.execute_sql('financial-data', SQL)
+        await pool.close()
+        latencies.append(time.perf_counter() - call_start)
+    report('new connection per call', latencies, time.perf_counter() - start)
+
+    pool = MCPClientPool(url, size=pool_size)
+    await pool.start()
+    await pool.wait_ready(5)
+    try:
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(calls):
+            await timed_call(pool, latencies)
+        report('pooled, sequential', latencies, time.perf_counter() - start)
+
+        latencies = []
+        start = time.perf_counter()
+        for offset in range(0, calls, concurrency):
+            await asyncio.gather(*(timed_call(pool, latencies) for _ in range(min(concurrency, calls - offset))))
+        report(f'pooled, {concurrency} in flight', latencies, time.perf_counter() - start)
+    finally:
+        await pool.close()
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--pool-size', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.005, help='fake server latency in seconds')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args.calls, args.concurrency, args.pool_size, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Memory Benchmark
+Measures bytes per stored transaction for dict rows against the columnar store
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+
+from transaction_generator import generate_transactions
+from transaction_store import TransactionStore, parse_timestamp
+
+
+def ingested_rows(count: int):
+    """Yield rows as ingestion sees them: freshly decoded JSON, scored, one object per value"""
+    now = time.time()
+    for i, tx in enumerate(generate_transactions(count)):
+        tx['timestamp'] = datetime.fromtimestamp(now - count + i).isoformat()
+        tx['fraud_risk_score'] = 0.3
+        tx['risk_level'] = 'LOW'
+        yield json.loads(json.dumps(tx))
+
+
+def dict_rows(count: int):
+    """The previous layout: transaction_id -> (epoch, dict) in an OrderedDict"""
+    rows = OrderedDict()
+    for tx in ingested_rows(count):
+        rows[tx['transaction_id']] = (parse_timestamp(tx['timestamp']), tx)
+    return rows
+
+
+def columnar_rows(count: int):
+    store = TransactionStore(max_transactions=count, retention_seconds=0)
+    store.upsert_many(ingested_rows(count))
+    return store
+
+
+def measure(build, count: int) -> float:
+    """Get the bytes per row still allocated after building a container of count rows"""
+    gc.collect()
+    tracemalloc.start()
+    container = build(count)
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(container) == count
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+
+    before = measure(dict_rows, args.rows)
+    after = measure(columnar_rows, args.rows)
+    print(f"Rows: {args.rows:,}")
+    print(f"{'layout':<32}{'bytes/row':>12}{'total MB':>12}")
+    for name, per_row in [('dict per row (before)', before), ('columnar store (after)', after)]:
+        print(f"{name:<32}{per_row:>12,.0f}{per_row * args.rows / 1e6:>12,.1f}")
+    print(f"Reduction: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Scoring microbenchmarks and an HTTP/WebSocket load test against a local dashboard, written as JSON
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+
+from json_encoding import loads
+from transaction_generator import TransactionGenerator
+from transaction_store import parse_timestamp
+
+SECTIONS = ('scoring', 'ingest', 'http', 'ws')
+
+ENDPOINTS = [
+    ('transactions', '/api/transactions', lambda rng: {'limit': '100'}),
+    ('transactions_filtered', '/api/transactions', lambda rng: {'risk_level': 'HIGH', 'limit': '100'}),
+    ('metrics', '/api/metrics', lambda rng: {}),
+    ('search', '/api/search', lambda rng: {'q': f'cust_{rng.randint(1, 5000):06d}', 'limit': '20'})
+]
+
+# Result keys compared by --compare: throughput should not drop, latency should not rise
+HIGHER_IS_BETTER = ('_per_s',)
+LOWER_IS_BETTER = ('_ms', '_ns', '_mb')
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, Any]:
+    """Summarize latencies in seconds as milliseconds"""
+    return {
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else None
+    }
+
+
+def rss_mb(pid: Optional[int] = None) -> Dict[str, Optional[float]]:
+    """Get a process's current and peak resident set size from /proc, where available"""
+    values = {'rss_mb': None, 'peak_rss_mb': None}
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    values['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith('VmHWM:'):
+                    values['peak_rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return values
+
+
+def best_of(repeats: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_scoring(rows: int, repeats: int) -> Dict[str, Any]:
+    """Per-call cost of calculate_fraud_risk and get_risk_level, and batch scoring throughput.
+
+    Both scoring paths apply customer features and start every run from an
+    empty feature store, so they compute the same scores.
+    """
+    from customer_features import CustomerFeatureStore
+    from fraud_scoring import BatchScorer
+    from real_live_dashboard import RealLiveDashboard
+    dashboard = RealLiveDashboard()
+    plan = dashboard.rules.plan
+    transactions = TransactionGenerator().make(rows)
+
+    def scalar():
+        dashboard.scorer = BatchScorer(plan, CustomerFeatureStore())
+        return [dashboard.calculate_fraud_risk(tx) for tx in transactions]
+
+    def batch_scores():
+        return BatchScorer(plan, CustomerFeatureStore()).score_transactions([dict(tx) for tx in transactions])
+
+    scores = scalar()
+    assert [tx['fraud_risk_score'] for tx in batch_scores()] == scores, 'batch scores differ from calculate_fraud_risk'
+    risk = best_of(repeats, scalar)
+    level = best_of(repeats, lambda: [dashboard.get_risk_level(score) for score in scores])
+    batch = best_of(repeats, batch_scores)
+    return {
+        'calculate_fraud_risk': {'per_call_ns': round(risk / rows * 1e9, 1), 'calls_per_s': round(rows / risk)},
+        'get_risk_level': {'per_call_ns': round(level / rows * 1e9, 1), 'calls_per_s': round(rows / level)},
+        'batch_score': {'rows_per_s': round(rows / batch)}
+    }
+
+
+def bench_ingest(rows: int, batch_size: int) -> Dict[str, Any]:
+    """Rows per second through scoring plus store_transactions, as the Kafka path does it"""
+    from real_live_dashboard import RealLiveDashboard
+    dashboard = RealLiveDashboard()
+    generator = TransactionGenerator(prefix='ING')
+    batches = [generator.make(batch_size) for _ in range(max(1, rows // batch_size))]
+    start = time.perf_counter()
+    for batch in batches:
+        dashboard.store_transactions(dashboard.score_transactions(batch))
+    seconds = time.perf_counter() - start
+    return {'store_transactions': {'rows_per_s': round(len(batches) * batch_size / seconds),
+                                   'batch_ms': round(seconds / len(batches) * 1000, 3)}}
+
+
+async def run_server(port: int, rate: float, customers: int, merchants: int):
+    from config import get_config
+    from kafka_ingestion import InMemoryBroker
+    from real_live_dashboard import RealLiveDashboard
+    config = get_config()
+    broker = InMemoryBroker()
+    generator = TransactionGenerator(customers=customers, merchants=merchants, hot_customers=0.05)
+    asyncio.create_task(generator.produce(broker, config.TOPICS, rate))
+    dashboard = RealLiveDashboard(config, broker)
+    await dashboard.start_server(host='127.0.0.1', port=port)
+
+
+def server_main(port: int, rate: float, customers: int, merchants: int):
+    """Process entry point for the dashboard under test"""
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('aiohttp.access').setLevel(logging.WARNING)
+    try:
+        asyncio.run(run_server(port, rate, customers, merchants))
+    except KeyboardInterrupt:
+        pass
+
+
+async def wait_ready(session: aiohttp.ClientSession, base: str, timeout: float = 30.0):
+    """Wait until the dashboard answers and holds some rows"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base}/api/metrics") as response:
+                if response.status == 200 and (await response.json()).get('total_transactions'):
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"dashboard at {base} did not become ready")
+
+
+async def http_load(session: aiohttp.ClientSession, url: str, params, concurrency: int,
+                    duration: float) -> Dict[str, Any]:
+    """Hammer one endpoint with ``concurrency`` closed-loop clients for ``duration`` seconds"""
+    latencies: List[float] = []
+    rows = 0
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(seed: int):
+        nonlocal rows, errors
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                async with session.get(url, params=params(rng)) as response:
+                    body = await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            result = loads(body)
+            rows += len(result.get('transactions') or result.get('results') or ())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(seed) for seed in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'rows_per_s': round(rows / elapsed, 1),
+        **latency_summary(latencies)
+    }
+
+
+async def ws_load(session: aiohttp.ClientSession, url: str, clients: int, duration: float) -> Dict[str, Any]:
+    """Hold ``clients`` sockets open, measuring delta rate and transaction-to-client latency"""
+    latencies: List[float] = []
+    messages = 0
+    rows = 0
+
+    async def client():
+        nonlocal messages, rows
+        async with session.ws_connect(url) as ws:
+            deadline = time.monotonic() + duration
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    msg = await ws.receive(timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+                received = time.time()
+                message = loads(msg.data)
+                messages += 1
+                for tx in message.get('upserts', ()):
+                    rows += 1
+                    latencies.append(received - parse_timestamp(tx.get('timestamp')))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        'clients': clients,
+        'messages_per_s': round(messages / elapsed, 1),
+        'rows_per_s': round(rows / elapsed, 1),
+        **{key.replace('_ms', '_delivery_ms'): value for key, value in latency_summary(latencies).items()}
+    }
+
+
+async def bench_server(args) -> Dict[str, Any]:
+    """Start a dashboard in its own process, fed at --rate, and load its endpoints"""
+    context = multiprocessing.get_context('spawn')
+    server = context.Process(target=server_main, args=(args.port, args.rate, args.customers, args.merchants),
+                             name='dashboard-under-test', daemon=True)
+    server.start()
+    base = f"http://127.0.0.1:{args.port}"
+    results: Dict[str, Any] = {}
+    try:
+        connector = aiohttp.TCPConnector(limit=args.concurrency + args.ws_clients)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await wait_ready(session, base)
+            await asyncio.sleep(args.warmup)
+            results['server_before'] = rss_mb(server.pid)
+            if 'http' in args.sections:
+                for name, path, params in ENDPOINTS:
+                    results[f"http_{name}"] = await http_load(session, f"{base}{path}", params,
+                                                              args.concurrency, args.duration)
+            if 'ws' in args.sections:
+                results['ws'] = await ws_load(session, f"{base}/ws", args.ws_clients, args.duration)
+            results['server_after'] = rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.join(5)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """List the metrics that got worse than the baseline by more than ``tolerance``"""
+    regressions = []
+    current, previous = flatten(results), flatten(baseline)
+    for key, old in previous.items():
+        new = current.get(key)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+            continue
+        if key.endswith(HIGHER_IS_BETTER) and new < old * (1 - tolerance):
+            regressions.append(f"{key}: {old} -> {new} ({(new / old - 1) * 100:+.0f}%)")
+        elif key.endswith(LOWER_IS_BETTER) and new > old * (1 + tolerance):
+            regressions.append(f"{key}: {old} -> {new} ({(new / old - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sections', default=','.join(SECTIONS), help=f"comma-separated subset of {SECTIONS}")
+    parser.add_argument('--rows', type=int, default=200_000, help='rows for the scoring and ingest sections')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--rate', type=float, default=1000, help='rows/s fed into the dashboard under load')
+    parser.add_argument('--customers', type=int, default=50000)
+    parser.add_argument('--merchants', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16, help='closed-loop HTTP clients per endpoint')
+    parser.add_argument('--ws-clients', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per load phase')
+    parser.add_argument('--warmup', type=float, default=3.0, help='seconds of ingestion before loading')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='baseline results file; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+    args.sections = [section.strip() for section in args.sections.split(',') if section.strip()]
+    logging.basicConfig(level=logging.WARNING)
+
+    results: Dict[str, Any] = {}
+    if 'scoring' in args.sections:
+        results['scoring'] = bench_scoring(args.rows, args.repeats)
+    if 'ingest' in args.sections:
+        results['ingest'] = bench_ingest(args.rows, args.batch_size)
+    if 'http' in args.sections or 'ws' in args.sections:
+        results['server'] = asyncio.run(bench_server(args))
+    results['client'] = rss_mb()
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'args': vars(args),
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for key, value in flatten(results).items():
+        print(f"{key:<58}{value}")
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%} against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Worker Benchmark
+Compares in-process scoring with worker processes publishing through shared-memory rings
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from config import get_config
+from ingestion_workers import ScoringWorker, SharedRing, WorkerPool, available_cpus, publish
+from transaction_generator import generate_transactions
+from transaction_store import TransactionStore
+
+
+def worker_transactions(worker_id: int, rows: int):
+    """This worker's share of the stream, with distinct ids and current timestamps"""
+    now = time.time()
+    transactions = generate_transactions(rows, seed=worker_id)
+    for i, tx in enumerate(transactions):
+        tx['transaction_id'] = f"W{worker_id}_{tx['transaction_id']}"
+        tx['timestamp'] = datetime.fromtimestamp(now - rows + i).isoformat()
+    return transactions
+
+
+def synthetic_worker(worker_id: int, ring_name: str, rows: int, batch_size: int):
+    """Worker process that scores generated batches instead of consuming Kafka"""
+    async def run():
+        ring = SharedRing.attach(ring_name)
+        worker = ScoringWorker(get_config())
+        transactions = worker_transactions(worker_id, rows)
+        for start in range(0, rows, batch_size):
+            await publish(ring, worker.score_transactions(transactions[start:start + batch_size]))
+        ring.close()
+        # Stay up until the pool terminates us, so it does not restart a finished worker
+        await asyncio.sleep(3600)
+    asyncio.run(run())
+
+
+def in_process(workers: int, rows: int, batch_size: int) -> dict:
+    """Score and store everything on one core, as the single-loop dashboard does"""
+    config = get_config()
+    store = TransactionStore(max_transactions=workers * rows, retention_seconds=0)
+    scorers = [ScoringWorker(config) for _ in range(workers)]
+    streams = [worker_transactions(worker_id, rows) for worker_id in range(workers)]
+    wall, cpu = time.perf_counter(), time.process_time()
+    for start in range(0, rows, batch_size):
+        for scorer, transactions in zip(scorers, streams):
+            store.upsert_many(scorer.score_transactions(transactions[start:start + batch_size]))
+    return {'rows': len(store), 'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu}
+
+
+async def with_workers(workers: int, rows: int, batch_size: int) -> dict:
+    """Score in worker processes; the front process only decodes and stores"""
+    store = TransactionStore(max_transactions=workers * rows, retention_seconds=0)
+    pool = WorkerPool(workers, poll_interval=0.001, target=synthetic_worker, target_args=(rows, batch_size))
+    pool.start()
+    try:
+        # Time from the first batch, so process start-up is not counted
+        store.upsert_many(await pool.get_batch())
+        wall, cpu = time.perf_counter(), time.process_time()
+        while len(store) < workers * rows:
+            store.upsert_many(await pool.get_batch())
+        return {'rows': len(store), 'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu}
+    finally:
+        pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=50_000, help='rows per worker')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    total = args.workers * args.rows
+    print(f"Rows: {total:,} ({args.workers} streams of {args.rows:,}, batches of {args.batch_size})")
+    cpus = available_cpus()
+    print(f"CPUs: {cpus}")
+    if args.workers >= cpus:
+        print("Note: workers share CPUs with the front process here, so expect no gain over in-process")
+    print(f"{'mode':<28}{'rows/s':>12}{'front CPU us/row':>18}")
+    for name, result in [
+        ('in-process (before)', in_process(args.workers, args.rows, args.batch_size)),
+        (f'{args.workers} workers (after)', asyncio.run(with_workers(args.workers, args.rows, args.batch_size)))
+    ]:
+        assert result['rows'] == total
+        print(f"{name:<28}{total / result['wall']:>12,.0f}{result['cpu'] / total * 1e6:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
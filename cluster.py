@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Cluster
+Peering between dashboard nodes that each own a share of the Kafka partitions
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+import aiohttp
+
+from metrics_aggregator import MetricsAggregator
+
+logger = logging.getLogger(__name__)
+
+# Query parameter marking a request from a peer, answered from local state only
+LOCAL_SCOPE = 'local'
+
+
+def node_id_from_config(config) -> str:
+    return config.CLUSTER_NODE_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class PeerLink:
+    """State of the stream this node follows from one peer"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.node_id: Optional[str] = None
+        self.connected = False
+        self.messages = 0
+        self.last_message = 0.0
+        self.last_error: Optional[str] = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'node_id': self.node_id,
+            'connected': self.connected,
+            'messages': self.messages,
+            'last_message': self.last_message or None,
+            'last_error': self.last_error
+        }
+
+
+class ClusterNode:
+    """This node's view of its peers.
+
+    Nodes share one Kafka consumer group, so each owns a disjoint share of
+    the partitions and holds only its own rows. Every node follows each
+    peer's /api/cluster/stream WebSocket, which carries the peer's row
+    deltas and its partial metric aggregates. Cluster metrics are then a
+    merge of pushed partials, with no request fan-out; page queries and
+    sketches are scatter-gathered from the peers on demand.
+
+    ``version`` counts the changes this node has shown its clients, local
+    or forwarded, so it orders WebSocket deltas against page snapshots the
+    way the store version does on a single node.
+    """
+
+    def __init__(self, node_id: str, peers: List[str], timeout: float = 2.0,
+                 on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 max_reconnect_delay: float = 30.0):
+        self.node_id = node_id
+        self.links = [PeerLink(url) for url in peers]
+        self.timeout = timeout
+        self.on_message = on_message
+        self.max_reconnect_delay = max_reconnect_delay
+        self.partials: Dict[str, Dict[str, Any]] = {}
+        self.peer_versions: Dict[str, int] = {}
+        self.version = 0
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @classmethod
+    def from_config(cls, config, on_message=None) -> Optional['ClusterNode']:
+        """Build the node from CLUSTER_PEERS, or return None when running alone"""
+        peers = [url.strip() for url in config.CLUSTER_PEERS.split(',') if url.strip()]
+        if not peers:
+            return None
+        return cls(node_id_from_config(config), peers, timeout=config.CLUSTER_TIMEOUT, on_message=on_message)
+
+    def bump(self) -> int:
+        self.version += 1
+        return self.version
+
+    async def start(self):
+        """Open the pooled peer session and start following every peer"""
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._tasks = [asyncio.create_task(self._follow(link)) for link in self.links]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.session is not None:
+            await self.session.close()
+
+    async def _follow(self, link: PeerLink):
+        """Keep a stream open to one peer, reconnecting with backoff"""
+        delay = 1.0
+        while True:
+            try:
+                async with self.session.ws_connect(f"{link.url}/api/cluster/stream", heartbeat=self.timeout * 5,
+                                                   timeout=self.timeout) as ws:
+                    link.connected = True
+                    link.last_error = None
+                    delay = 1.0
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._receive(link, json.loads(msg.data))
+                        elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                link.last_error = str(e) or type(e).__name__
+            if link.connected:
+                logger.warning(f"Lost cluster peer {link.url}; retrying")
+            self._disconnect(link)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _receive(self, link: PeerLink, message: Dict[str, Any]):
+        link.node_id = message.get('node')
+        link.messages += 1
+        link.last_message = time.time()
+        if 'partial' in message:
+            self.partials[link.node_id] = message['partial']
+            self.peer_versions[link.node_id] = message.get('version', 0)
+        if self.on_message is not None:
+            self.on_message(message)
+
+    def _disconnect(self, link: PeerLink):
+        """Drop an unreachable peer's aggregates: its rows cannot be queried either"""
+        link.connected = False
+        if link.node_id is not None and self.partials.pop(link.node_id, None) is not None:
+            self.peer_versions.pop(link.node_id, None)
+            if self.on_message is not None:
+                self.on_message({'type': 'peer_down', 'node': link.node_id})
+
+    def merged_metrics(self, local: MetricsAggregator) -> MetricsAggregator:
+        """Merge the local aggregates with every connected peer's latest partial"""
+        return MetricsAggregator.from_partials([local.partial(), *self.partials.values()])
+
+    def signature(self) -> str:
+        """Identify the peer data a response was built from, for ETags"""
+        return ','.join(f"{node}:{version}" for node, version in sorted(self.peer_versions.items()))
+
+    async def gather(self, path: str, params: Dict[str, str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """GET path from every peer in parallel, returning (found responses, unreachable peer urls)"""
+        params = {**params, 'scope': LOCAL_SCOPE}
+
+        async def fetch(link: PeerLink) -> Optional[Dict[str, Any]]:
+            async with self.session.get(f"{link.url}{path}", params=params) as response:
+                if response.status == 404:
+                    return None  # the peer does not hold what was asked for
+                response.raise_for_status()
+                return await response.json()
+
+        results = await asyncio.gather(*(fetch(link) for link in self.links), return_exceptions=True)
+        responses, unreachable = [], []
+        for link, result in zip(self.links, results):
+            if isinstance(result, BaseException):
+                unreachable.append(link.url)
+            elif result is not None:
+                responses.append(result)
+        return responses, unreachable
+
+    def unreachable(self) -> List[str]:
+        return [link.url for link in self.links if not link.connected]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'node_id': self.node_id,
+            'version': self.version,
+            'peers': [link.describe() for link in self.links]
+        }
+
+
+def is_local_request(request) -> bool:
+    """Check whether a request asks for this node's data only"""
+    return request.query.get('scope') == LOCAL_SCOPE
+
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Local Cluster
+Runs several peered dashboard nodes as local processes
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+from datetime import datetime
+
+from config import get_config
+from kafka_ingestion import InMemoryBroker
+from real_live_dashboard import RealLiveDashboard
+from transaction_generator import generate_transactions
+
+
+async def produce(broker: InMemoryBroker, config, node: int, rate: int):
+    """Feed a node's own in-process broker, standing in for its share of the partitions"""
+    topics = config.TOPICS
+    sent = 0
+    while True:
+        for tx in generate_transactions(rate, seed=node * 1_000_003 + sent):
+            tx['transaction_id'] = f"N{node}_{sent:08d}"
+            tx['timestamp'] = datetime.now().isoformat()
+            broker.produce(topics[tx['transaction_type']], tx, key=tx['customer_id'])
+            sent += 1
+        await asyncio.sleep(1)
+
+
+async def run_node(node: int, ports, demo_rate: int):
+    config = get_config()
+    config.CLUSTER_NODE_ID = f"node-{node}"
+    config.CLUSTER_PEERS = ','.join(f"http://localhost:{port}" for i, port in enumerate(ports) if i != node)
+    broker = None
+    if demo_rate:
+        broker = InMemoryBroker()
+        asyncio.create_task(produce(broker, config, node, demo_rate))
+    elif config.INGESTION_SOURCE != 'kafka' and node > 0:
+        # Simulated and MCP sources give every node the same rows, which the cluster would
+        # count once per node; node 0 reads them and the others only serve what peers push
+        config.INGESTION_SOURCE = 'kafka'
+        broker = InMemoryBroker()
+    dashboard = RealLiveDashboard(config, broker)
+    await dashboard.start_server(port=ports[node])
+
+
+def node_main(node: int, ports, demo_rate: int):
+    try:
+        asyncio.run(run_node(node, ports, demo_rate))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, default=3)
+    parser.add_argument('--base-port', type=int, default=8080)
+    parser.add_argument('--demo-rate', type=int, default=0,
+                        help='rows/s each node generates into its own in-process broker, with '
+                             'node-prefixed ids. 0 uses INGESTION_SOURCE: Kafka nodes split the '
+                             'consumer group, and a simulated or MCP source is read by node 0 only')
+    args = parser.parse_args()
+
+    ports = [args.base_port + i for i in range(args.nodes)]
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=node_main, args=(node, ports, args.demo_rate), name=f"node-{node}")
+                 for node in range(args.nodes)]
+    for process in processes:
+        process.start()
+    print(f"Started {args.nodes} nodes: " + ', '.join(f"http://localhost:{port}" for port in ports))
+    try:
+        while any(process.is_alive() for process in processes):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
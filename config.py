@@ -12,6 +12,12 @@ class Config:
     # Lenses MCP Configuration
     LENSES_MCP_URL = os.getenv('LENSES_MCP_URL', 'ws://108.129.193.220:8080')
     LENSES_ENVIRONMENT = os.getenv('LENSES_ENVIRONMENT', 'financial-data')
+    MCP_POOL_SIZE = int(os.getenv('MCP_POOL_SIZE', '2'))
+    MCP_CALL_TIMEOUT = float(os.getenv('MCP_CALL_TIMEOUT', '10'))
+    MCP_RECONNECT_MAX_DELAY = float(os.getenv('MCP_RECONNECT_MAX_DELAY', '30'))
+    MCP_PAGE_SIZE = int(os.getenv('MCP_PAGE_SIZE', '500'))
+    MCP_MAX_PAGES = int(os.getenv('MCP_MAX_PAGES', '10'))
+    MCP_CHECKPOINT_FILE = os.getenv('MCP_CHECKPOINT_FILE', 'mcp_checkpoints.json')
     
     # Kafka Configuration
     KAFKA_BOOTSTRAP_SERVERS = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092').split(',')
@@ -38,6 +44,40 @@ class Config:
     PROCESSING_DELAY = float(os.getenv('PROCESSING_DELAY', '0.1'))
     METRICS_INTERVAL = int(os.getenv('METRICS_INTERVAL', '60'))
     
+    # Live Store Configuration
+    # INGESTION_SOURCE is 'simulated' (built-in sample data), 'mcp' or 'kafka'
+    INGESTION_SOURCE = os.getenv('INGESTION_SOURCE', 'simulated')
+    # With Kafka, INGESTION_WORKERS > 0 consumes and scores in that many processes,
+    # which hand scored batches to the dashboard through WORKER_RING_BYTES shared-memory rings.
+    # It is capped at the CPUs beside the dashboard's (so 0 on one CPU), and /api/customers is
+    # not served in this mode
+    INGESTION_WORKERS = int(os.getenv('INGESTION_WORKERS', '0'))
+    WORKER_RING_BYTES = int(os.getenv('WORKER_RING_BYTES', str(8 * 1024 * 1024)))
+    INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', '10'))
+    INGEST_INTERVAL = float(os.getenv('INGEST_INTERVAL', '5'))
+    STORE_MAX_TRANSACTIONS = int(os.getenv('STORE_MAX_TRANSACTIONS', '10000'))
+    STORE_RETENTION_SECONDS = int(os.getenv('STORE_RETENTION_SECONDS', '3600'))
+    
+    # Flow control: batches sized to keep each store write under FLOW_TARGET_BATCH_MS; under overload
+    # (full ingest queue or loop lag over FLOW_MAX_LOOP_LAG) rows outside the policy's protected risk
+    # levels are sampled down to 1 in FLOW_MAX_SHED and socket publishes are spaced out
+    FLOW_TARGET_BATCH_MS = float(os.getenv('FLOW_TARGET_BATCH_MS', '5'))
+    FLOW_MIN_BATCH = int(os.getenv('FLOW_MIN_BATCH', '20'))
+    FLOW_MAX_BATCH = int(os.getenv('FLOW_MAX_BATCH', '2000'))
+    FLOW_MAX_LOOP_LAG = float(os.getenv('FLOW_MAX_LOOP_LAG', '0.2'))
+    FLOW_SHED_POLICY = os.getenv('FLOW_SHED_POLICY', 'sample_low')
+    FLOW_MAX_SHED = int(os.getenv('FLOW_MAX_SHED', '16'))
+    FLOW_MAX_PUBLISH_INTERVAL = float(os.getenv('FLOW_MAX_PUBLISH_INTERVAL', '0.5'))
+    
+    # API Paging Configuration
+    API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '100'))
+    API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '1000'))
+    
+    # WebSocket Push Configuration
+    WS_SEND_QUEUE_SIZE = int(os.getenv('WS_SEND_QUEUE_SIZE', '16'))
+    WS_SEND_TIMEOUT = float(os.getenv('WS_SEND_TIMEOUT', '5'))
+    WS_MAX_DELTA_ROWS = int(os.getenv('WS_MAX_DELTA_ROWS', '500'))
+    
     # Fraud Detection Configuration
     FRAUD_THRESHOLDS = {
         'high_amount_cc': 1000.0,
@@ -46,12 +86,69 @@ class Config:
         'account_age_threshold': 30
     }
     
+    # Fraud Rule Engine Configuration
+    # Amount tiers are [amount strictly above, weight]; the lowest tier for each
+    # transaction type is taken from the FRAUD_THRESHOLDS key it maps to.
+    # Velocity fires above 'frequent_transactions' per velocity window for a
+    # customer; the z-score rule compares an amount with the customer's history.
+    FRAUD_RULES = {
+        'amount_tiers': [[1000.0, 0.1], [2000.0, 0.2], [5000.0, 0.4]],
+        'type_amount_thresholds': {
+            'credit_card': 'high_amount_cc',
+            'paypal': 'high_amount_pp'
+        },
+        'high_risk_categories': ['electronics', 'jewelry', 'travel', 'gaming'],
+        'high_risk_category_weight': 0.2,
+        'approved_statuses': ['approved', 'completed'],
+        'unapproved_status_weight': 0.3,
+        'medium_risk_score': 0.3,
+        'high_risk_score': 0.7,
+        'velocity_window_seconds': 3600,
+        'velocity_weight': 0.2,
+        'amount_zscore_threshold': 3.0,
+        'amount_zscore_weight': 0.2,
+        'amount_zscore_min_history': 5
+    }
+    # Optional JSON file overriding FRAUD_RULES/FRAUD_THRESHOLDS, hot-reloaded on change
+    FRAUD_RULES_FILE = os.getenv('FRAUD_RULES_FILE', '')
+    
+    # Customer Feature Store Configuration (bounded LRU with idle TTL)
+    CUSTOMER_FEATURES_MAX = int(os.getenv('CUSTOMER_FEATURES_MAX', '100000'))
+    CUSTOMER_FEATURES_TTL = float(os.getenv('CUSTOMER_FEATURES_TTL', '86400'))
+    
+    # Cluster Configuration
+    # Nodes in one KAFKA_GROUP_ID split the partitions; CLUSTER_PEERS lists the other
+    # nodes' base URLs (e.g. http://10.0.0.2:8080) so queries can span the cluster
+    CLUSTER_NODE_ID = os.getenv('CLUSTER_NODE_ID', '')
+    CLUSTER_PEERS = os.getenv('CLUSTER_PEERS', '')
+    CLUSTER_TIMEOUT = float(os.getenv('CLUSTER_TIMEOUT', '2'))
+    
+    # Transaction Archive Configuration (append-only segment files; a file:// DATABASE_URL also works)
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', '')
+    ARCHIVE_SEGMENT_BYTES = int(os.getenv('ARCHIVE_SEGMENT_BYTES', str(64 * 1024 * 1024)))
+    ARCHIVE_MAX_BYTES = int(os.getenv('ARCHIVE_MAX_BYTES', str(1024 ** 3)))
+    # Longest start-end range one /api/history request may scan
+    ARCHIVE_MAX_QUERY_HOURS = float(os.getenv('ARCHIVE_MAX_QUERY_HOURS', '24'))
+    
+    # Admin diagnostics (stall detector and sampling profiler under /admin; disabled without a token)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    STALL_DETECTOR_ENABLED = os.getenv('STALL_DETECTOR_ENABLED', 'false').lower() == 'true'
+    STALL_THRESHOLD = float(os.getenv('STALL_THRESHOLD', '0.1'))
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+    
     # Logging Configuration
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'kafka_stream.log')
     
     # External Systems Configuration
     WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+    # HIGH risk alerts are posted in batches; undeliverable ones wait in memory, then on disk
+    WEBHOOK_BATCH_SIZE = int(os.getenv('WEBHOOK_BATCH_SIZE', '100'))
+    WEBHOOK_BATCH_LATENCY = float(os.getenv('WEBHOOK_BATCH_LATENCY', '0.5'))
+    WEBHOOK_MAX_PENDING = int(os.getenv('WEBHOOK_MAX_PENDING', '10000'))
+    WEBHOOK_TIMEOUT = float(os.getenv('WEBHOOK_TIMEOUT', '5'))
+    WEBHOOK_CONCURRENCY = int(os.getenv('WEBHOOK_CONCURRENCY', '4'))
+    WEBHOOK_SPILL_FILE = os.getenv('WEBHOOK_SPILL_FILE', 'webhook_spill.jsonl')
     DATABASE_URL = os.getenv('DATABASE_URL', '')
     
     @classmethod
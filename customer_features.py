@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Customer Features
+Bounded per-customer behavioural state (velocity, amount statistics) for fraud scoring
+"""
+
+import math
+from collections import OrderedDict
+from typing import Dict, Any, NamedTuple, Optional
+
+
+class CustomerFeatures(NamedTuple):
+    """Features of one transaction relative to its customer's history"""
+    velocity: float  # decayed transaction count over the velocity window, this one included
+    amount_zscore: Optional[float]  # amount against the customer's prior EWMA mean/std
+    history: int  # transactions seen for the customer before this one
+
+
+class CustomerState:
+    __slots__ = ('last_seen', 'velocity', 'mean', 'variance', 'count')
+
+    def __init__(self, timestamp: float, amount: float):
+        self.last_seen = timestamp
+        self.velocity = 1.0
+        self.mean = amount
+        self.variance = 0.0
+        self.count = 1
+
+
+class CustomerFeatureStore:
+    """Rolling per-customer statistics updated in O(1) per transaction.
+
+    Velocity is an exponentially decayed count with the velocity window as
+    its time constant, so a steady N transactions per window settles at N.
+    Amounts keep an exponentially weighted mean and variance (weight
+    ``alpha`` on the newest amount). Customers are kept in LRU order and
+    dropped when there are more than ``max_customers`` or when they have
+    been idle for ``ttl_seconds`` of event time, so memory stays bounded
+    however many customers the stream carries.
+    """
+
+    def __init__(self, max_customers: int = 100000, ttl_seconds: float = 86400, alpha: float = 0.1):
+        self.max_customers = max_customers
+        self.ttl_seconds = ttl_seconds
+        self.alpha = alpha
+        self._customers: "OrderedDict[str, CustomerState]" = OrderedDict()
+        self._newest = 0.0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._customers)
+
+    def observe(self, customer_id: str, amount: float, timestamp: float, velocity_window: float,
+                update: bool = True) -> CustomerFeatures:
+        """Get a transaction's features, then fold it into the customer's state.
+
+        Pass update=False for a re-delivered transaction, so it is scored
+        against the same history without being counted twice.
+        """
+        state = self._customers.get(customer_id)
+        if state is None:
+            if update:
+                self._customers[customer_id] = CustomerState(timestamp, amount)
+                self._expire(timestamp)
+            return CustomerFeatures(1.0, None, 0)
+
+        elapsed = max(0.0, timestamp - state.last_seen)
+        velocity = state.velocity * math.exp(-elapsed / velocity_window) + 1.0
+        zscore = None
+        if state.variance > 0:
+            zscore = (amount - state.mean) / math.sqrt(state.variance)
+        features = CustomerFeatures(velocity, zscore, state.count)
+
+        if update:
+            diff = amount - state.mean
+            increment = self.alpha * diff
+            state.mean += increment
+            state.variance = (1 - self.alpha) * (state.variance + diff * increment)
+            state.velocity = velocity
+            state.count += 1
+            state.last_seen = max(state.last_seen, timestamp)
+            self._customers.move_to_end(customer_id)
+            self._expire(timestamp)
+        return features
+
+    def _expire(self, timestamp: float):
+        self._newest = max(self._newest, timestamp)
+        customers = self._customers
+        while len(customers) > self.max_customers:
+            customers.popitem(last=False)
+            self.evicted += 1
+        cutoff = self._newest - self.ttl_seconds
+        while customers and next(iter(customers.values())).last_seen < cutoff:
+            customers.popitem(last=False)
+            self.evicted += 1
+
+    def describe(self, customer_id: str, velocity_window: float, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Get a JSON-friendly view of a customer's state, velocity decayed to now"""
+        state = self._customers.get(customer_id)
+        if state is None:
+            return None
+        elapsed = max(0.0, (now if now is not None else self._newest) - state.last_seen)
+        return {
+            'customer_id': customer_id,
+            'transactions_seen': state.count,
+            'velocity': state.velocity * math.exp(-elapsed / velocity_window),
+            'amount_mean': state.mean,
+            'amount_std': math.sqrt(state.variance),
+            'last_seen': state.last_seen
+        }
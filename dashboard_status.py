@@ -43,7 +43,7 @@ def check_dashboard_status():
             if transactions_response.status_code == 200:
                 transactions_data = transactions_response.json()
                 print("+ Transactions API is working")
-                print(f"+ Loaded {len(transactions_data.get('transactions', []))} transactions")
+                print(f"+ Loaded {len(transactions_data.get('transactions', []))} of {transactions_data.get('matched', 0)} transactions")
                 print()
                 
                 # Show sample transactions
@@ -59,6 +59,29 @@ def check_dashboard_status():
                 
             else:
                 print("- Transactions API error")
+            
+            # Runtime instrumentation (Prometheus text format)
+            instrumentation_response = requests.get("http://localhost:8080/metrics", timeout=5)
+            if instrumentation_response.status_code == 200:
+                series = {}
+                for line in instrumentation_response.text.splitlines():
+                    if line and not line.startswith('#'):
+                        name, _, value = line.rpartition(' ')
+                        series[name] = float(value)
+                print("RUNTIME:")
+                print("-" * 30)
+                print(f"Event Loop Lag: {series.get('dashboard_event_loop_lag_last_seconds', 0) * 1000:.1f} ms")
+                print(f"Store Rows: {series.get('dashboard_store_rows', 0):.0f}")
+                clients = series.get('dashboard_ws_connections{channel="clients"}', 0)
+                print(f"WebSocket Clients: {clients:.0f}")
+                scored = series.get('dashboard_scoring_batch_seconds_count', 0)
+                if scored:
+                    print(f"Mean Scoring Batch: {series['dashboard_scoring_batch_seconds_sum'] / scored * 1000:.2f} ms")
+                print(f"Flow Batch Size: {series.get('dashboard_flow_batch_size', 0):.0f}")
+                shed = sum(value for name, value in series.items() if name.startswith('dashboard_flow_shed_rows_total'))
+                overloaded = 'yes' if series.get('dashboard_flow_overloaded') else 'no'
+                print(f"Overloaded: {overloaded} ({shed:.0f} rows shed)")
+                print()
                 
         else:
             print("- Dashboard is not responding")
@@ -76,16 +99,19 @@ def check_dashboard_status():
     print("Web Interface: http://localhost:8080")
     print("API Endpoints:")
     print("  - Metrics: http://localhost:8080/api/metrics")
+    print("  - Window Metrics: http://localhost:8080/api/metrics/windows")
+    print("  - Sketch Metrics: http://localhost:8080/api/metrics/sketches")
     print("  - Transactions: http://localhost:8080/api/transactions")
     print("  - Search: http://localhost:8080/api/search")
     print("  - WebSocket: ws://localhost:8080/ws")
+    print("  - Prometheus: http://localhost:8080/metrics")
     print()
     print("FEATURES AVAILABLE:")
     print("- Real-time transaction monitoring")
     print("- Advanced filtering and search")
     print("- Fraud detection and risk scoring")
     print("- Live metrics and analytics")
-    print("- Auto-refresh every 30 seconds")
+    print("- Live WebSocket delta push (30-second polling fallback)")
     print()
     print("To stop the dashboard: Press Ctrl+C in the terminal where it's running")
 
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Fake Lenses MCP Server
+Local stand-in for the Lenses MCP server, for tests and latency benchmarks
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from aiohttp import web, WSMsgType
+
+logger = logging.getLogger(__name__)
+
+TOPICS = ['credit-card-transactions', 'paypal-transactions']
+SQL_TOPIC = re.compile(r'FROM\s+`?([\w.-]+)`?', re.IGNORECASE)
+SQL_LIMIT = re.compile(r'LIMIT\s+(\d+)', re.IGNORECASE)
+SQL_PARTITION_OFFSET = re.compile(r'_meta\.partition\s*=\s*(\d+)\s+AND\s+_meta\.offset\s*>\s*(-?\d+)', re.IGNORECASE)
+SQL_PARTITION_NOT_IN = re.compile(r'_meta\.partition\s+NOT\s+IN\s*\(([\d,\s]+)\)', re.IGNORECASE)
+SQL_TIMESTAMP = re.compile(r'_meta\.timestamp\s*>\s*(\d+)', re.IGNORECASE)
+
+
+def sample_transaction(topic: str, index: int) -> Dict[str, Any]:
+    """Build a transaction row shaped like the Lenses topics"""
+    rng = random.Random(f"{topic}-{index}")
+    return {
+        'transaction_id': f"{'CC' if topic.startswith('credit') else 'PP'}_{index:08d}",
+        'merchant': rng.choice(['Amazon Web Services', 'Stripe Inc', 'Tesla Motors', 'Apple Store', 'Goldman Sachs']),
+        'category': rng.choice(['technology', 'automotive', 'electronics', 'financial', 'travel']),
+        'amount': round(rng.lognormvariate(6.5, 1.5), 2),
+        'status': rng.choice(['approved', 'completed', 'pending', 'failed']),
+        'customer_id': f"CUST_{rng.randint(1, 5000):06d}",
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+class FakeMCPServer:
+    """Speaks enough MCP JSON-RPC over WebSocket for the dashboard client.
+
+    Supports initialize, tools/list and tools/call for list_environments,
+    list_topics and execute_sql. Each request waits ``latency`` seconds before
+    replying, and requests on one socket are answered concurrently, as a
+    pipelining server would.
+    """
+
+    def __init__(self, latency: float = 0.0, rows_per_topic: int = 1000, environment: str = 'financial-data',
+                 partitions: int = 3):
+        self.latency = latency
+        self.environment = environment
+        self.partitions = partitions
+        # Per topic, a list of partitions, each a list of (timestamp_ms, row) by offset
+        self.topics: Dict[str, List[List[Any]]] = {topic: [[] for _ in range(partitions)] for topic in TOPICS}
+        for topic in TOPICS:
+            self.append(topic, rows_per_topic)
+        self.connections = 0
+        self.requests = 0
+        self._sockets = set()
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ''
+
+    def append(self, topic: str, count: int):
+        """Produce ``count`` new rows to a topic, round-robin over partitions"""
+        logs = self.topics[topic]
+        produced = sum(len(log) for log in logs)
+        now_ms = int(datetime.now().timestamp() * 1000)
+        for index in range(produced, produced + count):
+            logs[index % self.partitions].append((now_ms, sample_transaction(topic, index)))
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/', self.websocket_handler)
+        app.router.add_get('/mcp', self.websocket_handler)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start listening and return the ws:// URL to connect to"""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        self.url = f"ws://{host}:{bound_port}/mcp"
+        return self.url
+
+    async def stop(self):
+        await self.drop_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def drop_connections(self):
+        """Close every client socket, e.g. to exercise reconnects"""
+        for ws in list(self._sockets):
+            await ws.close()
+
+    async def websocket_handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self._sockets.add(ws)
+        tasks = set()
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                message = json.loads(msg.data)
+                if 'id' not in message:
+                    continue  # notification
+                task = asyncio.create_task(self._respond(ws, message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            self._sockets.discard(ws)
+            for task in tasks:
+                task.cancel()
+        return ws
+
+    async def _respond(self, ws: web.WebSocketResponse, message: Dict[str, Any]):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        try:
+            reply = {'jsonrpc': '2.0', 'id': message['id'], 'result': self.handle(message['method'], message.get('params', {}))}
+        except KeyError as e:
+            reply = {'jsonrpc': '2.0', 'id': message['id'], 'error': {'code': -32601, 'message': f"Unknown {e}"}}
+        except ValueError as e:
+            reply = {'jsonrpc': '2.0', 'id': message['id'], 'error': {'code': -32602, 'message': str(e)}}
+        if not ws.closed:
+            await ws.send_str(json.dumps(reply))
+
+    def handle(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == 'initialize':
+            return {'protocolVersion': params.get('protocolVersion'), 'capabilities': {'tools': {}},
+                    'serverInfo': {'name': 'fake-lenses-mcp', 'version': '1.0'}}
+        if method == 'tools/list':
+            return {'tools': [{'name': name} for name in ('list_environments', 'list_topics', 'execute_sql')]}
+        if method == 'tools/call':
+            tool = {
+                'list_environments': self.list_environments,
+                'list_topics': self.list_topics,
+                'execute_sql': self.execute_sql
+            }[params['name']]
+            return {'content': [{'type': 'text', 'text': json.dumps(tool(**params.get('arguments', {})))}]}
+        raise KeyError(method)
+
+    def list_environments(self) -> List[str]:
+        return [self.environment]
+
+    def list_topics(self, environment: str) -> List[str]:
+        return list(self.topics)
+
+    def execute_sql(self, environment: str, sql: str) -> List[Dict[str, Any]]:
+        """Evaluate the narrow SQL subset the dashboard issues (see mcp_fetcher)"""
+        topic_match = SQL_TOPIC.search(sql)
+        if not topic_match or topic_match.group(1) not in self.topics:
+            raise ValueError(f"Unknown topic in query: {sql}")
+        limit_match = SQL_LIMIT.search(sql)
+        limit = int(limit_match.group(1)) if limit_match else None
+        with_meta = '_meta.partition AS' in sql
+
+        after_offset = {int(p): int(o) for p, o in SQL_PARTITION_OFFSET.findall(sql)}
+        not_in = SQL_PARTITION_NOT_IN.search(sql)
+        unseen_allowed = not_in is not None or not after_offset
+        timestamp_match = SQL_TIMESTAMP.search(sql)
+        after_timestamp = int(timestamp_match.group(1)) if timestamp_match else None
+
+        rows = []
+        for partition, log in enumerate(self.topics[topic_match.group(1)]):
+            if partition in after_offset:
+                start = after_offset[partition] + 1
+            elif unseen_allowed:
+                start = 0
+            else:
+                continue
+            for offset in range(max(start, 0), len(log)):
+                timestamp, row = log[offset]
+                if after_timestamp is not None and timestamp <= after_timestamp:
+                    continue
+                row = dict(row)
+                if with_meta:
+                    row.update(_partition=partition, _offset=offset, _timestamp=timestamp)
+                rows.append(row)
+                if limit is not None and len(rows) >= limit:
+                    return rows
+        return rows
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each reply')
+    args = parser.parse_args()
+
+    server = FakeMCPServer(latency=args.latency)
+    url = await server.start(args.host, args.port)
+    logger.info(f"Fake MCP server listening on {url}")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
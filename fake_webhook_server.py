@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Fake Webhook Server
+Local alert receiver with configurable latency and failures, for tests and benchmarks
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+from typing import Dict, Any, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class FakeWebhookServer:
+    """Accepts alert batches POSTed by AlertDispatcher and records them.
+
+    Each request waits ``latency`` seconds, then fails with ``fail_status``
+    with probability ``fail_rate``. Set ``fail_rate`` to 1.0 to simulate an
+    outage and back to 0.0 to recover.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0, fail_status: int = 503, seed: int = 0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.batches: List[Dict[str, Any]] = []
+        self.requests = 0
+        self.failed = 0
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ''
+
+    @property
+    def alerts(self) -> int:
+        return sum(batch['count'] for batch in self.batches)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/webhook', self.webhook_handler)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start listening and return the URL to post alerts to"""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{bound_port}/webhook"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def webhook_handler(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._random.random() < self.fail_rate:
+            self.failed += 1
+            return web.json_response({'ok': False}, status=self.fail_status)
+        self.batches.append(await request.json())
+        return web.json_response({'ok': True})
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each reply')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of requests answered with an error')
+    args = parser.parse_args()
+
+    server = FakeWebhookServer(latency=args.latency, fail_rate=args.fail_rate)
+    url = await server.start(args.host, args.port)
+    logger.info(f"Fake webhook server listening on {url}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            logger.info(f"Received {server.alerts} alerts in {len(server.batches)} batches "
+                        f"({server.failed} requests failed)")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Flow Control
+Adaptive batch sizing, load shedding and publish pacing between ingestion and HTTP serving
+"""
+
+import logging
+import zlib
+from collections import Counter
+from typing import Dict, Any, Callable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Shedding policies: the risk levels that are always kept; other rows may be sampled
+SHED_POLICIES = {
+    'none': None,
+    'sample_low': frozenset(('MEDIUM', 'HIGH')),
+    'sample_low_medium': frozenset(('HIGH',))
+}
+
+
+class StageTimer:
+    """Moving averages of one stage's time per batch and per row"""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.per_batch = 0.0
+        self.per_row = 0.0
+        self.batches = 0
+
+    def observe(self, seconds: float, rows: int):
+        if rows <= 0:
+            return
+        if self.batches == 0:
+            self.per_batch, self.per_row = seconds, seconds / rows
+        else:
+            self.per_batch += self.alpha * (seconds - self.per_batch)
+            self.per_row += self.alpha * (seconds / rows - self.per_row)
+        self.batches += 1
+
+
+class FlowController:
+    """Keeps ingestion from starving request handlers on the shared event loop.
+
+    Batch size: scoring and storing a batch each hold the loop, so the
+    batch size is set to what the measured per-row cost of those stages
+    fits into ``target_seconds``. Requests then wait at most about that long
+    between batches, whatever the stream rate.
+
+    Overload: update() is called periodically with the ingest queue fill
+    (0-1) and the event loop lag. Overload starts above ``queue_high`` fill
+    or ``max_loop_lag`` lag, and ends below ``queue_low`` and half that lag.
+    While overloaded, two things back off, doubling each update, and they
+    recover the same way once it passes:
+    - Shedding: rows whose risk level the policy does not protect are
+      sampled, keeping 1 in ``keep_every`` (up to ``max_shed``). Sampling is
+      by transaction id, so a row is kept or shed consistently. Rows already
+      in the store are never shed, so updates are not lost.
+    - Publishing: WebSocket deltas are published at most every
+      ``publish_interval`` (up to ``max_publish_interval``). The change
+      tracker merges what accumulates in between.
+    """
+
+    def __init__(self, target_seconds: float = 0.005, initial_batch: int = 100, min_batch: int = 20,
+                 max_batch: int = 2000, max_loop_lag: float = 0.2, queue_high: float = 0.8,
+                 queue_low: float = 0.25, shed_policy: str = 'sample_low', max_shed: int = 16,
+                 max_publish_interval: float = 0.5):
+        if shed_policy not in SHED_POLICIES:
+            raise ValueError(f"Unknown shed policy '{shed_policy}'; use one of {', '.join(SHED_POLICIES)}")
+        self.target_seconds = target_seconds
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.batch_size = max(min_batch, min(max_batch, initial_batch))
+        self.max_loop_lag = max_loop_lag
+        self.queue_high = queue_high
+        self.queue_low = queue_low
+        self.shed_policy = shed_policy
+        self.keep_levels = SHED_POLICIES[shed_policy]
+        self.max_shed = max_shed
+        self.max_publish_interval = max_publish_interval
+        self.stages: Dict[str, StageTimer] = {'score': StageTimer(), 'store': StageTimer()}
+        self.overloaded = False
+        self.overload_episodes = 0
+        self.keep_every = 1
+        self.publish_interval = 0.0
+        self.shed_rows: Counter = Counter()
+        self.shed_amount = 0.0
+        self.deferred_publishes = 0
+        self._last_publish = float('-inf')
+
+    @classmethod
+    def from_config(cls, config) -> 'FlowController':
+        return cls(
+            target_seconds=config.FLOW_TARGET_BATCH_MS / 1000,
+            initial_batch=config.BATCH_SIZE,
+            min_batch=config.FLOW_MIN_BATCH,
+            max_batch=config.FLOW_MAX_BATCH,
+            max_loop_lag=config.FLOW_MAX_LOOP_LAG,
+            shed_policy=config.FLOW_SHED_POLICY,
+            max_shed=config.FLOW_MAX_SHED,
+            max_publish_interval=config.FLOW_MAX_PUBLISH_INTERVAL
+        )
+
+    @property
+    def shed_total(self) -> int:
+        return sum(self.shed_rows.values())
+
+    def observe(self, stage: str, seconds: float, rows: int):
+        """Record one batch through a stage and resize batches to the latency target"""
+        self.stages[stage].observe(seconds, rows)
+        per_row = sum(timer.per_row for timer in self.stages.values())
+        if per_row > 0:
+            self.batch_size = max(self.min_batch, min(self.max_batch, int(self.target_seconds / per_row)))
+
+    def chunks(self, transactions: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """Split a batch that arrived bigger than the current batch size"""
+        size = self.batch_size
+        for start in range(0, len(transactions), size):
+            yield transactions[start:start + size]
+
+    def update(self, queue_fill: float, loop_lag: float):
+        """Re-evaluate overload and step shedding and publish pacing towards it"""
+        if queue_fill >= self.queue_high or loop_lag > self.max_loop_lag:
+            if not self.overloaded:
+                self.overload_episodes += 1
+                logger.warning(f"Ingestion overloaded (queue {queue_fill:.0%}, loop lag {loop_lag * 1000:.0f}ms); "
+                               f"shedding with policy '{self.shed_policy}'")
+            self.overloaded = True
+        elif queue_fill <= self.queue_low and loop_lag <= self.max_loop_lag / 2:
+            if self.overloaded:
+                logger.info(f"Ingestion load back to normal; {self.shed_total} rows shed so far")
+            self.overloaded = False
+
+        if self.overloaded:
+            if self.keep_levels is not None:
+                self.keep_every = min(self.max_shed, self.keep_every * 2)
+            self.publish_interval = min(self.max_publish_interval, max(0.05, self.publish_interval * 2))
+        else:
+            self.keep_every = max(1, self.keep_every // 2)
+            self.publish_interval = self.publish_interval / 2 if self.publish_interval > 0.05 else 0.0
+
+    def admit(self, transactions: List[Dict[str, Any]],
+              known: Callable[[str], bool]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split a scored batch into (kept, shed) rows under the current sampling rate"""
+        keep_every = self.keep_every
+        if keep_every == 1:
+            return transactions, []
+        keep_levels = self.keep_levels
+        kept, shed = [], []
+        for tx in transactions:
+            tx_id = tx.get('transaction_id')
+            if (tx.get('risk_level') in keep_levels or known(tx_id)
+                    or zlib.crc32(str(tx_id).encode()) % keep_every == 0):
+                kept.append(tx)
+            else:
+                shed.append(tx)
+                self.shed_rows[tx.get('risk_level')] += 1
+                self.shed_amount += tx.get('amount', 0) or 0
+        return kept, shed
+
+    def should_publish(self, now: float) -> bool:
+        """Check whether deltas may be published now, or should wait for the publish interval"""
+        if now - self._last_publish >= self.publish_interval:
+            self._last_publish = now
+            return True
+        self.deferred_publishes += 1
+        return False
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'overloaded': self.overloaded,
+            'overload_episodes': self.overload_episodes,
+            'batch_size': self.batch_size,
+            'target_batch_ms': self.target_seconds * 1000,
+            'stages': {name: {'batch_ms': round(timer.per_batch * 1000, 3),
+                              'row_us': round(timer.per_row * 1e6, 3),
+                              'batches': timer.batches}
+                       for name, timer in self.stages.items()},
+            'shed_policy': self.shed_policy,
+            'keep_every': self.keep_every,
+            'shed_rows': dict(self.shed_rows),
+            'shed_amount': round(self.shed_amount, 2),
+            'publish_interval_ms': round(self.publish_interval * 1000, 1),
+            'deferred_publishes': self.deferred_publishes
+        }
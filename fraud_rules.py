@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Fraud Rule Engine
+Compiles config-driven fraud rules into lookup tables and sorted cut-points
+"""
+
+import json
+import logging
+import os
+from bisect import bisect_left
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RISK_LEVEL_NAMES = ('LOW', 'MEDIUM', 'HIGH')
+
+# Upper bound on distinct raw category spellings remembered per plan
+CATEGORY_CACHE_SIZE = 4096
+
+
+class RulePlan:
+    """Compiled evaluation plan for one version of the fraud rules.
+
+    Amount tiers are sorted cut-points per transaction type, so the tier is a
+    single bisect; categorical rules are precomputed weight lookups. The
+    velocity and amount z-score rules read per-customer features and are
+    applied on top of score() by behavior_score().
+    """
+
+    __slots__ = ('version', 'amount_cutpoints', 'default_cutpoints', 'amount_weights',
+                 'category_weights', 'status_weights', 'unknown_status_weight',
+                 'medium_risk_score', 'high_risk_score', 'rules', 'thresholds', '_category_cache',
+                 'velocity_window', 'velocity_threshold', 'velocity_weight',
+                 'zscore_threshold', 'zscore_weight', 'zscore_min_history')
+
+    def __init__(self, version: int, amount_cutpoints: Dict[str, Tuple[float, ...]],
+                 default_cutpoints: Tuple[float, ...], amount_weights: Tuple[float, ...],
+                 category_weights: Dict[str, float], status_weights: Dict[Any, float],
+                 unknown_status_weight: float, medium_risk_score: float, high_risk_score: float,
+                 rules: Dict[str, Any], thresholds: Dict[str, Any], velocity_window: float = 3600.0,
+                 velocity_threshold: float = float('inf'), velocity_weight: float = 0.0,
+                 zscore_threshold: float = float('inf'), zscore_weight: float = 0.0,
+                 zscore_min_history: int = 5):
+        self.version = version
+        self.amount_cutpoints = amount_cutpoints
+        self.default_cutpoints = default_cutpoints
+        self.amount_weights = amount_weights
+        self.category_weights = category_weights
+        self.status_weights = status_weights
+        self.unknown_status_weight = unknown_status_weight
+        self.medium_risk_score = medium_risk_score
+        self.high_risk_score = high_risk_score
+        self.rules = rules
+        self.thresholds = thresholds
+        self._category_cache: Dict[Any, float] = {}
+        self.velocity_window = velocity_window
+        self.velocity_threshold = velocity_threshold
+        self.velocity_weight = velocity_weight
+        self.zscore_threshold = zscore_threshold
+        self.zscore_weight = zscore_weight
+        self.zscore_min_history = zscore_min_history
+
+    def score(self, transaction: Dict[str, Any]) -> float:
+        """Evaluate the plan against a single transaction"""
+        get = transaction.get
+        category = get('category', '')
+        category_weight = self._category_cache.get(category)
+        if category_weight is None:
+            category_weight = self._cache_category(category)
+        risk_score = self.amount_weights[
+            bisect_left(self.amount_cutpoints.get(get('transaction_type'), self.default_cutpoints), get('amount', 0))
+        ]
+        risk_score += category_weight
+        risk_score += self.status_weights.get(get('status'), self.unknown_status_weight)
+        return min(risk_score, 1.0)
+
+    def behavior_score(self, features) -> float:
+        """Get the extra risk from a transaction's CustomerFeatures"""
+        extra = 0.0
+        if features.velocity > self.velocity_threshold:
+            extra += self.velocity_weight
+        if (features.amount_zscore is not None and features.history >= self.zscore_min_history
+                and features.amount_zscore > self.zscore_threshold):
+            extra += self.zscore_weight
+        return extra
+
+    def _cache_category(self, category: Any) -> float:
+        """Resolve a raw category string once so hot lookups skip lower()"""
+        weight = self.category_weights.get(category.lower() if isinstance(category, str) else '', 0.0)
+        if len(self._category_cache) < CATEGORY_CACHE_SIZE:
+            self._category_cache[category] = weight
+        return weight
+
+    def risk_level_code(self, risk_score: float) -> int:
+        """Get the index into RISK_LEVEL_NAMES for a score"""
+        return (risk_score > self.medium_risk_score) + (risk_score > self.high_risk_score)
+
+    def risk_level(self, risk_score: float) -> str:
+        """Get the risk level name for a score"""
+        return RISK_LEVEL_NAMES[self.risk_level_code(risk_score)]
+
+    def describe(self) -> Dict[str, Any]:
+        """Get a JSON-friendly view of the active rules"""
+        return {
+            'version': self.version,
+            'amount_cutpoints': {tx_type: list(cuts) for tx_type, cuts in self.amount_cutpoints.items()},
+            'default_cutpoints': list(self.default_cutpoints),
+            'amount_weights': list(self.amount_weights),
+            'rules': self.rules,
+            'thresholds': self.thresholds
+        }
+
+
+def compile_rules(rules: Dict[str, Any], thresholds: Dict[str, Any], version: int = 1) -> RulePlan:
+    """Compile a rules dict (Config.FRAUD_RULES shape) into a RulePlan"""
+    tiers = sorted((float(above), float(weight)) for above, weight in rules['amount_tiers'])
+    if not tiers:
+        raise ValueError('amount_tiers must define at least one tier')
+    default_cutpoints = tuple(above for above, _ in tiers)
+    amount_weights = (0.0,) + tuple(weight for _, weight in tiers)
+
+    amount_cutpoints = {}
+    for tx_type, threshold_key in rules.get('type_amount_thresholds', {}).items():
+        if threshold_key not in thresholds:
+            raise ValueError(f"Unknown threshold '{threshold_key}' for transaction type '{tx_type}'")
+        # The type's threshold replaces the lowest tier; higher tiers are clamped
+        # so none of them starts below the type's own threshold
+        lowest = float(thresholds[threshold_key])
+        amount_cutpoints[tx_type] = (lowest,) + tuple(max(lowest, cut) for cut in default_cutpoints[1:])
+
+    category_weight = float(rules.get('high_risk_category_weight', 0.0))
+    category_weights = {category.lower(): category_weight for category in rules.get('high_risk_categories', [])}
+    status_weights = {status: 0.0 for status in rules.get('approved_statuses', [])}
+
+    return RulePlan(
+        version=version,
+        amount_cutpoints=amount_cutpoints,
+        default_cutpoints=default_cutpoints,
+        amount_weights=amount_weights,
+        category_weights=category_weights,
+        status_weights=status_weights,
+        unknown_status_weight=float(rules.get('unapproved_status_weight', 0.0)),
+        medium_risk_score=float(rules.get('medium_risk_score', 0.3)),
+        high_risk_score=float(rules.get('high_risk_score', 0.7)),
+        rules=rules,
+        thresholds=thresholds,
+        velocity_window=float(rules.get('velocity_window_seconds', 3600.0)),
+        velocity_threshold=float(thresholds.get('frequent_transactions', float('inf'))),
+        velocity_weight=float(rules.get('velocity_weight', 0.0)),
+        zscore_threshold=float(rules.get('amount_zscore_threshold', float('inf'))),
+        zscore_weight=float(rules.get('amount_zscore_weight', 0.0)),
+        zscore_min_history=int(rules.get('amount_zscore_min_history', 5))
+    )
+
+
+class RuleEngine:
+    """Holds the active RulePlan and hot-reloads it from FRAUD_RULES_FILE.
+
+    The rules file is JSON with optional "rules" and "thresholds" objects that
+    are merged over Config.FRAUD_RULES and Config.FRAUD_THRESHOLDS. A file that
+    fails to parse or compile is logged and the previous plan stays active.
+    """
+
+    def __init__(self, config, rules_file: Optional[str] = None):
+        self.config = config
+        self.rules_file = rules_file if rules_file is not None else config.FRAUD_RULES_FILE
+        self._mtime: Optional[float] = None
+        self.plan = compile_rules(dict(config.FRAUD_RULES), dict(config.FRAUD_THRESHOLDS))
+        self.maybe_reload()
+
+    def maybe_reload(self) -> bool:
+        """Recompile if the rules file changed since the last check"""
+        if not self.rules_file:
+            return False
+        try:
+            mtime = os.stat(self.rules_file).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        return self.reload()
+
+    def reload(self) -> bool:
+        """Load the rules file and swap in a freshly compiled plan"""
+        try:
+            with open(self.rules_file) as f:
+                overrides = json.load(f)
+            rules = {**self.config.FRAUD_RULES, **overrides.get('rules', {})}
+            thresholds = {**self.config.FRAUD_THRESHOLDS, **overrides.get('thresholds', {})}
+            self.plan = compile_rules(rules, thresholds, version=self.plan.version + 1)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Keeping fraud rules v{self.plan.version}; failed to load {self.rules_file}: {e}")
+            return False
+        logger.info(f"Loaded fraud rules v{self.plan.version} from {self.rules_file}")
+        return True
+
+    def score(self, transaction: Dict[str, Any]) -> float:
+        """Score a single transaction with the active plan"""
+        return self.plan.score(transaction)
+
+    def risk_level(self, risk_score: float) -> str:
+        """Get the risk level for a score with the active plan"""
+        return self.plan.risk_level(risk_score)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+HTTP Caching
+ETag revalidation and gzip/brotli compression for dashboard responses
+"""
+
+import gzip
+import hashlib
+import secrets
+import zlib
+from typing import Dict, Optional
+
+from aiohttp import web
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only without brotli
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves
+MIN_COMPRESS_SIZE = 1024
+# Dynamic responses trade ratio for speed; the static page is compressed once, at the maximum
+DYNAMIC_LEVELS = {'br': 4, 'gzip': 5}
+STATIC_LEVELS = {'br': 11, 'gzip': 9}
+# Data versions restart at 0 with the process, so tags also name the process they came from
+BOOT_ID = secrets.token_hex(4)
+
+
+def accepted_encodings(request) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}, dropping codings with q=0"""
+    accepted = {}
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                continue
+        if coding and q > 0:
+            accepted[coding.lower()] = q
+    return accepted
+
+
+def choose_encoding(request) -> Optional[str]:
+    """Pick brotli, then gzip, from what the client accepts"""
+    accepted = accepted_encodings(request)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: str, levels: Dict[str, int] = DYNAMIC_LEVELS) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=levels['br'])
+    return gzip.compress(body, compresslevel=levels['gzip'], mtime=0)
+
+
+def make_etag(version: int, variant: str = '') -> str:
+    """Build a strong ETag from this process's data version and the request variant (e.g. query string).
+
+    This is the identity tag; compressed_response adds the coding it actually uses.
+    """
+    if variant:
+        return f'"v{version}.{BOOT_ID}-{zlib.crc32(variant.encode()):08x}"'
+    return f'"v{version}.{BOOT_ID}"'
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """Give each content coding its own strong ETag, as compressed bytes differ"""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def etag_matches(request, etag: str) -> bool:
+    """Check If-None-Match (weak comparison, as RFC 9110 requires for it)"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+def current_etag(request, etag: str) -> Optional[str]:
+    """Get the tag the client holds if it still describes the response, else None.
+
+    ``etag`` is the identity tag. A response carries the coded tag only if
+    its body was big enough to compress, which the same version and variant
+    always repeat, so the client may hold either one.
+    """
+    for candidate in (encoded_etag(etag, choose_encoding(request)), etag):
+        if etag_matches(request, candidate):
+            return candidate
+    return None
+
+
+def not_modified(etag: str) -> web.Response:
+    return web.Response(status=304, headers={'ETag': etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'})
+
+
+def compressed_response(request, body: bytes, content_type: str = 'application/json',
+                        etag: Optional[str] = None, status: int = 200) -> web.Response:
+    """Build a response, compressed if the client accepts it and the body is large enough"""
+    headers = {'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    encoding = choose_encoding(request) if len(body) >= MIN_COMPRESS_SIZE else None
+    if encoding:
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    if etag:
+        headers['ETag'] = encoded_etag(etag, encoding)
+    return web.Response(body=body, status=status, headers=headers, content_type=content_type)
+
+
+class StaticPage:
+    """A page built once and kept in every content coding, with a content-hash ETag"""
+
+    def __init__(self, body: bytes, content_type: str = 'text/html'):
+        self.content_type = content_type
+        self.variants: Dict[Optional[str], bytes] = {None: body, 'gzip': compress(body, 'gzip', STATIC_LEVELS)}
+        if brotli is not None:
+            self.variants['br'] = compress(body, 'br', STATIC_LEVELS)
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+    def response(self, request) -> web.Response:
+        encoding = choose_encoding(request)
+        etag = encoded_etag(self.etag, encoding)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        headers = {'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache', 'ETag': etag}
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return web.Response(body=self.variants[encoding], headers=headers, content_type=self.content_type,
+                            charset='utf-8')
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Ingestion Workers
+Worker processes that consume and score Kafka partitions into shared-memory rings
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import struct
+import time
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Dict, Any, Callable, List, Optional
+
+from config import get_config
+from customer_features import CustomerFeatureStore
+from fraud_rules import RuleEngine
+from fraud_scoring import BatchScorer
+from json_encoding import dumps, loads
+from kafka_ingestion import KafkaIngestionPipeline
+
+logger = logging.getLogger(__name__)
+
+# The header is eight 64-bit words; aligned word stores are atomic on the
+# platforms multiprocessing.shared_memory supports
+HEADER_SIZE = 64
+HEAD, TAIL, BATCHES, ROWS = range(4)
+LENGTH = struct.Struct('<I')
+# Length value marking "the rest of the ring is padding, continue at offset 0"
+WRAP = 0xFFFFFFFF
+
+
+class SharedRing:
+    """Single-producer, single-consumer ring of length-prefixed records in shared memory.
+
+    ``head`` and ``tail`` are byte positions that only ever grow; their
+    offset in the ring is ``position % capacity``. A record never straddles
+    the end of the ring: the producer pads to the end and starts over at
+    zero. The producer copies a record in, then publishes it by storing the
+    new head; the consumer decodes straight out of the shared buffer, then
+    frees the space by storing the new tail. Neither side takes a lock, so
+    exactly one process may write and one may read each ring.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.header = shm.buf[:HEADER_SIZE].cast('Q')
+        self.data = shm.buf[HEADER_SIZE:]
+        self.capacity = len(self.data)
+
+    @classmethod
+    def create(cls, size: int) -> 'SharedRing':
+        """Allocate a new ring with ``size`` bytes of record space"""
+        shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + size)
+        shm.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedRing':
+        """Open a ring created by another process"""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def pending_bytes(self) -> int:
+        return self.header[HEAD] - self.header[TAIL]
+
+    def write(self, payload: bytes, rows: int = 0) -> bool:
+        """Append a record, returning False (and writing nothing) if the ring is full"""
+        size = LENGTH.size + len(payload)
+        if size > self.capacity:
+            raise ValueError(f"record of {len(payload)} bytes does not fit a {self.capacity} byte ring")
+        head = self.header[HEAD]
+        offset = head % self.capacity
+        padding = self.capacity - offset if self.capacity - offset < size else 0
+        if head + padding + size - self.header[TAIL] > self.capacity:
+            return False
+        if padding:
+            if padding >= LENGTH.size:
+                LENGTH.pack_into(self.data, offset, WRAP)
+            head += padding
+            offset = 0
+        self.data[offset + LENGTH.size:offset + size] = payload
+        LENGTH.pack_into(self.data, offset, len(payload))
+        self.header[BATCHES] += 1
+        self.header[ROWS] += rows
+        self.header[HEAD] = head + size
+        return True
+
+    def read(self, decode: Callable[[memoryview], Any] = loads) -> Optional[Any]:
+        """Decode the oldest record in place and free its space, or return None if empty"""
+        tail = self.header[TAIL]
+        if tail == self.header[HEAD]:
+            return None
+        offset = tail % self.capacity
+        if self.capacity - offset < LENGTH.size or LENGTH.unpack_from(self.data, offset)[0] == WRAP:
+            tail += self.capacity - offset
+            offset = 0
+        length, = LENGTH.unpack_from(self.data, offset)
+        view = self.data[offset + LENGTH.size:offset + LENGTH.size + length]
+        try:
+            value = decode(view)
+        finally:
+            view.release()
+        self.header[TAIL] = tail + LENGTH.size + length
+        return value
+
+    def close(self):
+        """Detach from the ring, destroying it if this process created it"""
+        self.header.release()
+        self.data.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RecentRecords:
+    """Bounded memory of the records a worker has already scored.
+
+    Workers do not see the front process's store, so this stands in for
+    TransactionStore.is_unchanged: an identical re-delivery is dropped, and
+    a changed one is scored without counting twice towards customer features.
+    """
+
+    def __init__(self, max_records: int):
+        self.max_records = max_records
+        self._digests: "OrderedDict[str, int]" = OrderedDict()
+
+    def __contains__(self, transaction_id: str) -> bool:
+        return transaction_id in self._digests
+
+    def is_unchanged(self, tx: Dict[str, Any]) -> bool:
+        return self._digests.get(tx.get('transaction_id')) == hash(dumps(tx))
+
+    def remember(self, transactions: List[Dict[str, Any]]):
+        for tx in transactions:
+            tx_id = tx.get('transaction_id')
+            self._digests[tx_id] = hash(dumps(tx))
+            self._digests.move_to_end(tx_id)
+        while len(self._digests) > self.max_records:
+            self._digests.popitem(last=False)
+
+
+class ScoringWorker:
+    """The scoring state one worker process owns: rules, scorer and customer features"""
+
+    def __init__(self, config):
+        self.rules = RuleEngine(config)
+        self.features = CustomerFeatureStore(
+            max_customers=config.CUSTOMER_FEATURES_MAX,
+            ttl_seconds=config.CUSTOMER_FEATURES_TTL
+        )
+        self.scorer = BatchScorer(self.rules.plan, self.features)
+        self.recent = RecentRecords(config.STORE_MAX_TRANSACTIONS)
+
+    def score_transactions(self, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.rules.maybe_reload():
+            self.scorer.set_plan(self.rules.plan)
+        transactions = [tx for tx in transactions if not self.recent.is_unchanged(tx)]
+        # Remember the records as delivered, before scoring adds its fields
+        known = set(tx.get('transaction_id') for tx in transactions if tx.get('transaction_id') in self.recent)
+        self.recent.remember(transactions)
+        return self.scorer.score_transactions(transactions, known=known.__contains__)
+
+
+async def publish(ring: SharedRing, batch: List[Dict[str, Any]], backoff: float = 0.005):
+    """Write a batch to the ring, waiting while the front process catches up"""
+    payload = dumps(batch)
+    while not ring.write(payload, len(batch)):
+        await asyncio.sleep(backoff)
+
+
+async def run_worker(worker_id: int, ring_name: str, config=None):
+    """Consume this worker's share of the topic partitions, publishing scored batches"""
+    config = config or get_config()
+    worker = ScoringWorker(config)
+    # Every worker joins the same consumer group, so Kafka splits the partitions between them
+    pipeline = KafkaIngestionPipeline.from_config(config, worker.score_transactions)
+    ring = SharedRing.attach(ring_name)
+
+    async def forward():
+        while True:
+            batch = await pipeline.get_batch()
+            if batch:
+                await publish(ring, batch)
+
+    tasks = [asyncio.create_task(pipeline.run()), asyncio.create_task(forward())]
+    logger.info(f"Ingestion worker {worker_id} started")
+    try:
+        # If the consumer fails, exit so the pool restarts this worker
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        ring.close()
+
+
+def worker_main(worker_id: int, ring_name: str, config=None):
+    """Process entry point for one ingestion worker, scoring with the dashboard's config"""
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run_worker(worker_id, ring_name, config))
+    except KeyboardInterrupt:
+        pass
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, which can be fewer than the host has"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def workers_for_host(requested: int) -> int:
+    """Cap the worker count at the CPUs left over beside the dashboard process.
+
+    A worker only pays off on its own core. Workers that share cores with
+    the dashboard still pay for serializing batches through the rings, and
+    benchmark_workers.py measured them slower than in-process scoring, so
+    a host with a single CPU scores in-process.
+    """
+    spare = available_cpus() - 1
+    if requested > spare:
+        logger.warning(f"INGESTION_WORKERS={requested} but only {spare} spare CPU(s); "
+                       + (f"using {spare} workers" if spare > 0 else "scoring in-process"))
+        return max(0, spare)
+    return requested
+
+
+class WorkerPool:
+    """Runs ingestion worker processes and reads their scored batches from shared memory.
+
+    Each worker owns one SharedRing, so the front process only decodes
+    finished batches; consuming, deserializing and scoring happen on other
+    cores. A full ring stalls its worker, which stops polling Kafka, so
+    backpressure works as it does in-process. Dead workers are restarted on
+    their existing ring. get_batch() and run() match KafkaIngestionPipeline,
+    so the dashboard drives either the same way.
+
+    Workers are spawned with the dashboard's config, so thresholds, rules
+    and topics match in-process scoring. Customer features live in the
+    workers: records must be keyed by customer id, so that each customer's
+    partition, and so their history, stays on one worker. The dashboard
+    cannot serve /api/customers in this mode.
+    """
+
+    def __init__(self, workers: int, ring_bytes: int = 8 * 1024 * 1024, poll_interval: float = 0.005,
+                 target: Callable[[int, str], None] = worker_main, target_args: tuple = ()):
+        self.workers = workers
+        self.ring_bytes = ring_bytes
+        self.poll_interval = poll_interval
+        self.target = target
+        self.target_args = target_args
+        self.rings: List[SharedRing] = []
+        self.processes: List[multiprocessing.Process] = []
+        self.restarts = 0
+        self._restart_delays: List[float] = []
+        self._restart_at: List[float] = []
+        self._context = multiprocessing.get_context('spawn')
+
+    @classmethod
+    def from_config(cls, config, workers: Optional[int] = None) -> 'WorkerPool':
+        """Build a pool of INGESTION_WORKERS (capped for this host) workers scoring with ``config``"""
+        if workers is None:
+            workers = workers_for_host(config.INGESTION_WORKERS)
+        return cls(workers, config.WORKER_RING_BYTES, target_args=(config,))
+
+    @property
+    def records_consumed(self) -> int:
+        return sum(ring.header[ROWS] for ring in self.rings)
+
+    @property
+    def batches_scored(self) -> int:
+        return sum(ring.header[BATCHES] for ring in self.rings)
+
+    def _spawn(self, worker_id: int) -> multiprocessing.Process:
+        process = self._context.Process(
+            target=self.target,
+            args=(worker_id, self.rings[worker_id].name) + self.target_args,
+            name=f"ingestion-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def start(self):
+        """Create the rings and start one process per ring"""
+        self.rings = [SharedRing.create(self.ring_bytes) for _ in range(self.workers)]
+        self.processes = [self._spawn(worker_id) for worker_id in range(self.workers)]
+        logger.info(f"Started {self.workers} ingestion workers ({self.ring_bytes} byte rings)")
+
+    def stop(self):
+        """Stop the workers and free the shared memory"""
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(5)
+        for ring in self.rings:
+            ring.close()
+        self.processes = []
+        self.rings = []
+
+    async def run(self, check_interval: float = 1.0, max_restart_delay: float = 30.0):
+        """Start the workers and restart any that die, until cancelled.
+
+        A worker that keeps failing (say, the broker is down) is restarted
+        with exponential backoff instead of once per check.
+        """
+        self.start()
+        self._restart_delays = [check_interval] * self.workers
+        self._restart_at = [0.0] * self.workers
+        try:
+            while True:
+                await asyncio.sleep(check_interval)
+                now = time.monotonic()
+                for worker_id, process in enumerate(self.processes):
+                    if process.is_alive():
+                        continue
+                    if not self._restart_at[worker_id]:
+                        logger.error(f"Ingestion worker {worker_id} exited with code {process.exitcode}; "
+                                     f"restarting in {self._restart_delays[worker_id]:.0f}s")
+                        self._restart_at[worker_id] = now + self._restart_delays[worker_id]
+                        self._restart_delays[worker_id] = min(self._restart_delays[worker_id] * 2, max_restart_delay)
+                    elif now >= self._restart_at[worker_id]:
+                        self._restart_at[worker_id] = 0.0
+                        self.restarts += 1
+                        self.processes[worker_id] = self._spawn(worker_id)
+        finally:
+            self.stop()
+
+    def read_batch(self) -> List[Dict[str, Any]]:
+        """Take at most one record from each ring, joined into one batch"""
+        batch = []
+        for ring in self.rings:
+            records = ring.read()
+            if records:
+                batch.extend(records)
+        return batch
+
+    async def get_batch(self) -> List[Dict[str, Any]]:
+        """Wait for the next scored batch"""
+        while True:
+            batch = self.read_batch()
+            if batch:
+                # Yield once per batch so a busy stream cannot starve request handlers
+                await asyncio.sleep(0)
+                return batch
+            await asyncio.sleep(self.poll_interval)
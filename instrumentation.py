@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Instrumentation
+Counters, gauges and latency histograms exposed in the Prometheus text format
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from aiohttp import web
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class CounterHandle:
+    """One labelled counter series. Updates happen on the event loop thread, so no lock is taken."""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class GaugeHandle:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class HistogramHandle:
+    """One labelled histogram series; observe() is a bisect and three adds"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # Per-bucket (not cumulative) counts, with +Inf last; cumulated when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named family of series, one per label value tuple.
+
+    Hot paths should resolve their series once with labels() and keep the
+    handle, so each update is a plain attribute add.
+    """
+
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+                 collect: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.collect = collect
+        self._series: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str):
+        """Get (creating if needed) the series for these label values"""
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            if self.kind == 'histogram':
+                series = HistogramHandle(self.buckets)
+            elif self.kind == 'counter':
+                series = CounterHandle()
+            else:
+                series = GaugeHandle()
+            self._series[key] = series
+        return series
+
+    def _values(self) -> List[Tuple[Tuple[str, ...], float]]:
+        if self.collect is None:
+            return [(key, series.value) for key, series in self._series.items()]
+        value = self.collect()
+        if isinstance(value, dict):
+            return [(key if isinstance(key, tuple) else (key,), v) for key, v in value.items()]
+        return [((), value)]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        if self.kind != 'histogram':
+            for key, value in self._values():
+                if value is not None:
+                    lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+            return lines
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series.counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series.sum)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """The process's instrumentation, rendered as one Prometheus scrape"""
+
+    def __init__(self, prefix: str = 'dashboard_'):
+        self.prefix = prefix
+        self._metrics: Dict[str, Metric] = {}
+
+    def _add(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Metric:
+        return self._add(Metric(self.prefix + name, help_text, 'counter', labels))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Metric:
+        return self._add(Metric(self.prefix + name, help_text, 'gauge', labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Metric:
+        return self._add(Metric(self.prefix + name, help_text, 'histogram', labels, buckets))
+
+    def collected(self, name: str, help_text: str, collect: Callable[[], Any], kind: str = 'gauge',
+                  labels: Tuple[str, ...] = ()) -> Metric:
+        """Register a series read at scrape time, e.g. a queue depth or a counter kept elsewhere.
+
+        ``collect`` returns a number, or a dict of label value tuples to numbers.
+        """
+        return self._add(Metric(self.prefix + name, help_text, kind, labels, collect=collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def request_middleware(registry: MetricsRegistry):
+    """Build middleware timing each route's handler and sizing its responses"""
+    seconds = registry.histogram('http_request_seconds', 'Handler time per route', ('route',))
+    requests = registry.counter('http_requests_total', 'Requests per route and status', ('route', 'status'))
+    response_bytes = registry.histogram('http_response_bytes', 'Response body size per route', ('route',),
+                                        buckets=BYTES_BUCKETS)
+
+    @web.middleware
+    async def middleware(request, handler):
+        resource = request.match_info.route.resource
+        # The route template, not the path, so ids in URLs do not create series
+        route = resource.canonical if resource is not None else 'unmatched'
+        start = time.perf_counter()
+        status = 500
+        response = None
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            requests.labels(route, status).inc()
+            # A WebSocket's handler runs for the life of the connection, which is not request latency
+            if not isinstance(response, web.WebSocketResponse):
+                seconds.labels(route).observe(time.perf_counter() - start)
+                body = getattr(response, 'body', None)
+                if isinstance(body, (bytes, bytearray)):
+                    response_bytes.labels(route).observe(len(body))
+
+    return middleware
+
+
+async def monitor_loop_lag(histogram: HistogramHandle, gauge: GaugeHandle, interval: float = 0.5):
+    """Measure how late the event loop wakes a sleeping task, until cancelled"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - start - interval)
+        histogram.observe(lag)
+        gauge.set(lag)
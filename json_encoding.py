@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+JSON Encoding
+Fast JSON encoding and a per-row cache of encoded transactions for API responses
+"""
+
+import json
+from typing import Dict, Any, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj as compact UTF-8 JSON with the fastest available backend"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def loads(data) -> Any:
+    """Decode JSON from bytes or a memoryview; orjson reads the buffer without copying it"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+
+def splice(envelope: Dict[str, Any], field: str, encoded: bytes) -> bytes:
+    """Encode envelope with field set to an already encoded JSON value"""
+    head = dumps(envelope)
+    separator = b',' if len(head) > 2 else b''
+    return head[:-1] + separator + dumps(field) + b':' + encoded + b'}'
+
+
+def json_body(data: Dict[str, Any], rows_field: Optional[str] = None, rows_json: Optional[bytes] = None) -> bytes:
+    """Encode a response body, optionally splicing in a pre-encoded rows array"""
+    return splice(data, rows_field, rows_json) if rows_field is not None else dumps(data)
+
+
+class RowJSONCache:
+    """Store listener keeping each stored row's encoded JSON bytes.
+
+    Rows are immutable once stored, so each one is encoded exactly once, on
+    insert, and a page of rows is answered by joining cached bytes instead of
+    re-encoding every field on every request. The cost is memory: roughly
+    the row's JSON size, plus a bytes object, per stored row.
+    """
+
+    def __init__(self):
+        self._encoded: Dict[str, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._encoded)
+
+    def on_insert(self, tx: Dict[str, Any]):
+        self._encoded[tx.get('transaction_id')] = dumps(dict(tx))
+
+    def on_evict(self, tx: Dict[str, Any]):
+        self._encoded.pop(tx.get('transaction_id'), None)
+
+    def encode(self, tx: Dict[str, Any]) -> bytes:
+        """Get a row's JSON, encoding it if it is not cached"""
+        encoded = self._encoded.get(tx.get('transaction_id'))
+        if encoded is None:
+            self.misses += 1
+            return dumps(dict(tx))
+        self.hits += 1
+        return encoded
+
+    def encode_rows(self, rows: Iterable[Dict[str, Any]]) -> bytes:
+        """Encode rows as a JSON array from cached bytes"""
+        return b'[' + b','.join(map(self.encode, rows)) + b']'
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Kafka Ingestion
+Batched Kafka consumer stage that scores records and feeds the live store
+"""
+
+import asyncio
+import json
+import logging
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Optional
+
+try:
+    from aiokafka import AIOKafkaConsumer
+except ImportError:  # aiokafka is only needed when consuming from a real broker
+    AIOKafkaConsumer = None
+
+logger = logging.getLogger(__name__)
+
+TopicPartition = namedtuple('TopicPartition', ['topic', 'partition'])
+ConsumerRecord = namedtuple('ConsumerRecord', ['topic', 'partition', 'offset', 'timestamp', 'key', 'value'])
+
+
+class InMemoryBroker:
+    """In-process stand-in for a Kafka cluster, for tests and local runs.
+
+    Topics are lists of partitions, each an append-only list of records.
+    Consumers created from the broker share committed offsets per group id.
+    """
+
+    def __init__(self, partitions: int = 3):
+        self.default_partitions = partitions
+        self.topics: Dict[str, List[List[ConsumerRecord]]] = {}
+        self.committed: Dict[str, Dict[TopicPartition, int]] = {}
+        self._next_partition = 0
+        self._data_available = asyncio.Event()
+
+    def create_topic(self, topic: str, partitions: Optional[int] = None):
+        """Create a topic if it does not exist yet"""
+        if topic not in self.topics:
+            self.topics[topic] = [[] for _ in range(partitions or self.default_partitions)]
+
+    def produce(self, topic: str, value: Dict[str, Any], key: Optional[str] = None,
+                partition: Optional[int] = None) -> ConsumerRecord:
+        """Append a record, partitioning by a checksum of the key or round-robin.
+
+        The checksum is the same in every process (unlike hash() of a str),
+        so producers in different processes send a key to one partition.
+        """
+        self.create_topic(topic)
+        partitions = self.topics[topic]
+        if partition is None:
+            if key is not None:
+                partition = zlib.crc32(key.encode()) % len(partitions)
+            else:
+                partition = self._next_partition % len(partitions)
+                self._next_partition += 1
+        log = partitions[partition]
+        record = ConsumerRecord(topic, partition, len(log), int(time.time() * 1000), key, value)
+        log.append(record)
+        self._data_available.set()
+        return record
+
+    def consumer(self, topics: List[str], group_id: str, auto_offset_reset: str = 'earliest',
+                 enable_auto_commit: bool = True, **_) -> 'InMemoryConsumer':
+        """Create a consumer with the same calls the pipeline makes on aiokafka"""
+        return InMemoryConsumer(self, topics, group_id, auto_offset_reset, enable_auto_commit)
+
+
+class InMemoryConsumer:
+    """Subset of the AIOKafkaConsumer API backed by an InMemoryBroker"""
+
+    def __init__(self, broker: InMemoryBroker, topics: List[str], group_id: str,
+                 auto_offset_reset: str, enable_auto_commit: bool):
+        self.broker = broker
+        self.topics = topics
+        self.group_id = group_id
+        self.auto_offset_reset = auto_offset_reset
+        self.enable_auto_commit = enable_auto_commit
+        self._positions: Dict[TopicPartition, int] = {}
+        self._next_start = 0
+
+    async def start(self):
+        committed = self.broker.committed.setdefault(self.group_id, {})
+        for topic in self.topics:
+            self.broker.create_topic(topic)
+            for partition, log in enumerate(self.broker.topics[topic]):
+                tp = TopicPartition(topic, partition)
+                if tp in committed:
+                    self._positions[tp] = committed[tp]
+                else:
+                    self._positions[tp] = len(log) if self.auto_offset_reset == 'latest' else 0
+
+    async def stop(self):
+        if self.enable_auto_commit:
+            await self.commit()
+
+    async def getmany(self, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        """Fetch up to max_records across partitions, waiting up to timeout_ms"""
+        batch = self._fetch(max_records)
+        if not batch and timeout_ms:
+            self.broker._data_available.clear()
+            try:
+                await asyncio.wait_for(self.broker._data_available.wait(), timeout_ms / 1000.0)
+            except asyncio.TimeoutError:
+                pass
+            batch = self._fetch(max_records)
+        if batch and self.enable_auto_commit:
+            await self.commit()
+        return batch
+
+    def _fetch(self, max_records: Optional[int]) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        batch = {}
+        remaining = max_records if max_records is not None else float('inf')
+        # Rotate the starting partition so a backlog in one cannot starve the rest
+        assigned = list(self._positions)
+        self._next_start = (self._next_start + 1) % max(len(assigned), 1)
+        for tp in assigned[self._next_start:] + assigned[:self._next_start]:
+            if remaining <= 0:
+                break
+            position = self._positions[tp]
+            log = self.broker.topics[tp.topic][tp.partition]
+            end = int(min(len(log), position + remaining))
+            if end > position:
+                batch[tp] = log[position:end]
+                self._positions[tp] = end
+                remaining -= end - position
+        return batch
+
+    async def commit(self):
+        self.broker.committed.setdefault(self.group_id, {}).update(self._positions)
+
+
+def create_consumer(config, broker: Optional[InMemoryBroker] = None):
+    """Create a consumer for Config.TOPICS using Config.CONSUMER_CONFIG.
+
+    Uses the in-process broker when one is given, otherwise aiokafka.
+    """
+    consumer_config = dict(config.CONSUMER_CONFIG)
+    # consumer_timeout_ms is the poll wait, not a consumer constructor option
+    consumer_config.pop('consumer_timeout_ms', None)
+    consumer_config.pop('max_poll_records', None)
+
+    if broker is not None:
+        return broker.consumer(config.get_topics_list(), group_id=config.KAFKA_GROUP_ID, **consumer_config)
+
+    if AIOKafkaConsumer is None:
+        raise RuntimeError("aiokafka is required for Kafka ingestion: pip install aiokafka")
+    return AIOKafkaConsumer(
+        *config.get_topics_list(),
+        bootstrap_servers=config.KAFKA_BOOTSTRAP_SERVERS,
+        group_id=config.KAFKA_GROUP_ID,
+        max_poll_records=config.CONSUMER_CONFIG['max_poll_records'],
+        value_deserializer=lambda value: json.loads(value) if value else None,
+        **consumer_config
+    )
+
+
+class KafkaIngestionPipeline:
+    """Polls both topics in batches, scores each batch and queues it for the store.
+
+    The output queue is bounded: when the store side falls behind, put()
+    blocks and the poll loop stops fetching, so backpressure reaches Kafka
+    instead of growing memory.
+    """
+
+    def __init__(self, consumer, score_batch: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+                 topics: Dict[str, str], batch_size: int = 100, poll_timeout_ms: int = 1000,
+                 queue_size: int = 10):
+        self.consumer = consumer
+        self.score_batch = score_batch
+        self.transaction_types = {topic: tx_type for tx_type, topic in topics.items()}
+        self.batch_size = batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.records_consumed = 0
+        self.batches_scored = 0
+        # Optional histogram handle timing each poll (set by the dashboard's instrumentation)
+        self.poll_seconds = None
+
+    @classmethod
+    def from_config(cls, config, score_batch, broker: Optional[InMemoryBroker] = None) -> 'KafkaIngestionPipeline':
+        """Build a pipeline wired to Config topics, batch size and consumer settings"""
+        return cls(
+            create_consumer(config, broker),
+            score_batch,
+            topics=config.TOPICS,
+            batch_size=config.BATCH_SIZE,
+            poll_timeout_ms=config.CONSUMER_CONFIG['consumer_timeout_ms'],
+            queue_size=config.INGEST_QUEUE_SIZE
+        )
+
+    def to_transaction(self, record: ConsumerRecord) -> Optional[Dict[str, Any]]:
+        """Turn a consumed record into a transaction dict in the get_live_data shape"""
+        if not isinstance(record.value, dict):
+            return None
+        tx = dict(record.value)
+        tx.setdefault('transaction_id', f"{record.topic}-{record.partition}-{record.offset}")
+        tx.setdefault('transaction_type', self.transaction_types.get(record.topic, record.topic))
+        if 'timestamp' not in tx:
+            tx['timestamp'] = datetime.fromtimestamp(record.timestamp / 1000.0).isoformat()
+        return tx
+
+    async def poll_batch(self) -> List[Dict[str, Any]]:
+        """Fetch and score a single batch of up to batch_size records"""
+        start = time.perf_counter()
+        partitions = await self.consumer.getmany(timeout_ms=self.poll_timeout_ms, max_records=self.batch_size)
+        if self.poll_seconds is not None:
+            self.poll_seconds.observe(time.perf_counter() - start)
+        transactions = []
+        for records in partitions.values():
+            for record in records:
+                tx = self.to_transaction(record)
+                if tx is not None:
+                    transactions.append(tx)
+        self.records_consumed += len(transactions)
+        if not transactions:
+            return []
+        self.batches_scored += 1
+        return self.score_batch(transactions)
+
+    async def run(self):
+        """Poll, score and enqueue batches until cancelled"""
+        await self.consumer.start()
+        logger.info(f"Kafka ingestion started (batch size {self.batch_size})")
+        try:
+            while True:
+                try:
+                    batch = await self.poll_batch()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error polling Kafka: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                if batch:
+                    await self.queue.put(batch)
+        finally:
+            await self.consumer.stop()
+
+    async def get_batch(self) -> List[Dict[str, Any]]:
+        """Wait for the next scored batch"""
+        batch = await self.queue.get()
+        self.queue.task_done()
+        return batch
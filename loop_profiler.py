@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Loop Profiler
+Event-loop stall detection and a sampling profiler producing collapsed stacks for flame graphs
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Any, Deque, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def frame_stack(frame, with_lines: bool = False) -> List[str]:
+    """Describe a thread's stack, outermost frame first"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        location = os.path.basename(code.co_filename)
+        if with_lines:
+            location = f"{location}:{frame.f_lineno}"
+        stack.append(f"{code.co_name} ({location})")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class StallDetector:
+    """Watches an event loop from a thread, capturing the stack whenever it blocks.
+
+    A callback on the loop re-arms itself every ``interval`` seconds and
+    records when it is next due. A watchdog thread checks that deadline. If
+    the loop is more than ``threshold`` seconds late, some callback or
+    coroutine step has held the loop that long, and the loop thread's
+    current stack shows which one. The stall is recorded once, with its
+    stack, and its length is filled in when the loop catches up. Both sides
+    wake only every ``interval``, so it can stay on in production.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: Optional[float] = None, history: int = 50):
+        self.threshold = threshold
+        self.interval = interval or min(0.05, threshold / 2)
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.stall_count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._due = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        """Start watching the running loop; call from the loop's thread"""
+        if self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        self._beat()
+        self._thread = threading.Thread(target=self._watch, name='stall-detector', daemon=True)
+        self._thread.start()
+        logger.info(f"Event loop stall detector on (threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _beat(self):
+        self._due = time.perf_counter() + self.interval
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _watch(self):
+        current: Optional[Dict[str, Any]] = None
+        while not self._stop.wait(self.interval / 2):
+            due = self._due
+            late = time.perf_counter() - due
+            if current is not None and due != current['_due']:
+                # The loop ran the heartbeat again: the stall is over
+                current['duration_ms'] = round((self._due - self.interval - current['_due']) * 1000, 1)
+                del current['_due']
+                logger.warning(f"Event loop blocked for {current['duration_ms']:.0f}ms in "
+                               f"{current['stack'][-1] if current['stack'] else '?'}")
+                current = None
+            if current is None and late > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                current = {
+                    'detected_at': datetime.now().isoformat(),
+                    'duration_ms': None,
+                    'stack': frame_stack(frame, with_lines=True),
+                    '_due': due
+                }
+                self.stall_count += 1
+                self.stalls.append(current)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold * 1000,
+            'stall_count': self.stall_count,
+            'stalls': [{key: value for key, value in stall.items() if not key.startswith('_')}
+                       for stall in self.stalls]
+        }
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval and folds the samples into collapsed stacks.
+
+    The output is the "frame;frame;frame count" format that flamegraph.pl,
+    speedscope and similar tools read. Sampling runs in its own thread and
+    only reads frame objects, so the profiled code runs unmodified.
+    Samples where the loop is waiting in select() are labelled idle by the
+    selector frames themselves.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.01):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+    def run(self, seconds: float):
+        """Sample for ``seconds``; blocking, so run it off the profiled thread"""
+        deadline = time.perf_counter() + seconds
+        next_sample = time.perf_counter()
+        while next_sample < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[';'.join(frame_stack(frame))] += 1
+                self.samples += 1
+            del frame
+            next_sample += self.interval
+            time.sleep(max(0.0, next_sample - time.perf_counter()))
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+async def profile_loop(seconds: float, interval: float = 0.01) -> SamplingProfiler:
+    """Profile the running loop's thread for ``seconds`` without blocking it"""
+    profiler = SamplingProfiler(threading.get_ident(), interval)
+    await asyncio.get_running_loop().run_in_executor(None, profiler.run, seconds)
+    return profiler
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Lenses MCP Client
+Pooled, persistent JSON-RPC connections to the Lenses MCP server over WebSocket
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import random
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+MCP_PROTOCOL_VERSION = '2024-11-05'
+
+
+class MCPError(Exception):
+    """Error response returned by the MCP server for a request"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"MCP error {code}: {message}")
+        self.code = code
+        self.data = data
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Exponential backoff with jitter so reconnecting clients spread out"""
+    return min(maximum, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+class MCPConnection:
+    """One persistent WebSocket carrying many concurrent requests.
+
+    Requests are written without waiting for earlier replies; a reader task
+    resolves each pending future by JSON-RPC id. If the socket drops, pending
+    requests fail with ConnectionError and the connection reconnects on its
+    own with jittered exponential backoff.
+    """
+
+    def __init__(self, pool: 'MCPClientPool', index: int):
+        self.pool = pool
+        self.index = index
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.ready = asyncio.Event()
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        self._closed = True
+        self.ready.clear()
+        if self._ws is not None:
+            await self._ws.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending(ConnectionError('MCP connection closed'))
+
+    async def _run(self):
+        attempt = 0
+        while not self._closed:
+            try:
+                self._ws = await self.pool.session.ws_connect(self.pool.url, heartbeat=self.pool.heartbeat)
+                reader = asyncio.create_task(self._read_loop(self._ws))
+                try:
+                    await self._initialize()
+                    self.ready.set()
+                    attempt = 0
+                    logger.debug(f"MCP connection {self.index} ready")
+                    await reader
+                finally:
+                    reader.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"MCP connection {self.index} failed: {e}")
+            finally:
+                self.ready.clear()
+                self._fail_pending(ConnectionError('MCP connection lost'))
+                if self._ws is not None and not self._ws.closed:
+                    await self._ws.close()
+
+            if not self._closed:
+                delay = backoff_delay(attempt, self.pool.reconnect_base_delay, self.pool.reconnect_max_delay)
+                attempt += 1
+                self.pool.reconnects += 1
+                await asyncio.sleep(delay)
+
+    async def _initialize(self):
+        await self.request('initialize', {
+            'protocolVersion': MCP_PROTOCOL_VERSION,
+            'capabilities': {},
+            'clientInfo': {'name': 'real-live-dashboard', 'version': '1.0'}
+        }, self.pool.call_timeout)
+        await self._ws.send_str(json.dumps({'jsonrpc': '2.0', 'method': 'notifications/initialized'}))
+
+    async def _read_loop(self, ws: aiohttp.ClientWebSocketResponse):
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                if msg.type == aiohttp.WSMsgType.ERROR:
+                    break
+                continue
+            try:
+                message = json.loads(msg.data)
+            except ValueError:
+                logger.warning(f"Ignoring non-JSON MCP message on connection {self.index}")
+                continue
+            for item in message if isinstance(message, list) else [message]:
+                future = self.pending.pop(item.get('id'), None)
+                if future is None or future.done():
+                    continue
+                if 'error' in item:
+                    error = item['error']
+                    future.set_exception(MCPError(error.get('code', -1), error.get('message', ''), error.get('data')))
+                else:
+                    future.set_result(item.get('result'))
+
+    def _fail_pending(self, error: Exception):
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def request(self, method: str, params: Dict[str, Any], timeout: float) -> Any:
+        """Send a request and wait for the reply matched by its JSON-RPC id"""
+        request_id = next(self.pool.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            await self._ws.send_str(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(request_id, None)
+
+
+class MCPClientPool:
+    """Fixed pool of persistent MCP connections shared by the whole dashboard.
+
+    Each call goes to the ready connection with the fewest requests in flight,
+    so one slow query does not hold up the others and no call pays for a new
+    handshake.
+    """
+
+    def __init__(self, url: str, size: int = 2, call_timeout: float = 10.0,
+                 reconnect_base_delay: float = 0.5, reconnect_max_delay: float = 30.0,
+                 heartbeat: float = 30.0):
+        self.url = url
+        self.size = size
+        self.call_timeout = call_timeout
+        self.reconnect_base_delay = reconnect_base_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.heartbeat = heartbeat
+        self.request_ids = itertools.count(1)
+        self.connections: List[MCPConnection] = []
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.reconnects = 0
+
+    @classmethod
+    def from_config(cls, config) -> 'MCPClientPool':
+        """Build a pool from the LENSES_MCP_URL and MCP_* settings"""
+        return cls(
+            config.LENSES_MCP_URL,
+            size=config.MCP_POOL_SIZE,
+            call_timeout=config.MCP_CALL_TIMEOUT,
+            reconnect_max_delay=config.MCP_RECONNECT_MAX_DELAY
+        )
+
+    async def start(self):
+        """Open the pooled connections; they keep reconnecting in the background"""
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        self.connections = [MCPConnection(self, index) for index in range(self.size)]
+        for connection in self.connections:
+            connection.start()
+
+    async def close(self):
+        """Close every connection and the underlying HTTP session"""
+        for connection in self.connections:
+            await connection.close()
+        self.connections = []
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def wait_ready(self, timeout: Optional[float] = None):
+        """Wait until at least one connection has completed its handshake"""
+        waiters = [asyncio.create_task(c.ready.wait()) for c in self.connections]
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if not done:
+            raise asyncio.TimeoutError(f"No MCP connection to {self.url} became ready")
+
+    async def request(self, method: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """Send a JSON-RPC request on the least busy ready connection"""
+        timeout = timeout if timeout is not None else self.call_timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        ready = [c for c in self.connections if c.ready.is_set()]
+        if not ready:
+            await self.wait_ready(timeout)
+            ready = [c for c in self.connections if c.ready.is_set()]
+        connection = min(ready, key=lambda c: len(c.pending))
+        return await connection.request(method, params, max(deadline - loop.time(), 0.001))
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """Call an MCP tool and decode its text content as JSON where possible"""
+        result = await self.request('tools/call', {'name': name, 'arguments': arguments}, timeout)
+        if result and result.get('isError'):
+            raise MCPError(-1, tool_text(result))
+        text = tool_text(result)
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+    async def list_environments(self) -> Any:
+        return await self.call_tool('list_environments', {})
+
+    async def list_topics(self, environment: str) -> Any:
+        return await self.call_tool('list_topics', {'environment': environment})
+
+    async def execute_sql(self, environment: str, sql: str, timeout: Optional[float] = None) -> Any:
+        return await self.call_tool('execute_sql', {'environment': environment, 'sql': sql}, timeout)
+
+
+def tool_text(result: Optional[Dict[str, Any]]) -> str:
+    """Join the text parts of an MCP tools/call result"""
+    if not result:
+        return ''
+    return ''.join(part.get('text', '') for part in result.get('content', []) if part.get('type') == 'text')
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Metrics Aggregator
+Incrementally maintained dashboard totals over the live transaction store
+"""
+
+from typing import Dict, Any
+
+RISK_LEVELS = ('LOW', 'MEDIUM', 'HIGH')
+SCORE_BUCKETS = 10
+
+
+def to_cents(amount: Any) -> int:
+    """Convert an amount to integer cents so retraction never drifts"""
+    try:
+        return int(round(float(amount) * 100))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _score_bucket(score: float) -> int:
+    """Map a 0.0-1.0 risk score onto one of SCORE_BUCKETS histogram buckets"""
+    return min(max(int(score * SCORE_BUCKETS), 0), SCORE_BUCKETS - 1)
+
+
+class MetricsAggregator:
+    """O(1) counters, sums and risk histograms fed by store insert/evict events.
+
+    Amounts are summed as integer cents, so adding and later retracting a row
+    always returns the totals to exactly where they were.
+    """
+
+    def __init__(self, high_risk_threshold: float = 0.7):
+        self.high_risk_threshold = high_risk_threshold
+        self.total_transactions = 0
+        self.total_amount_cents = 0
+        self.high_risk_count = 0
+        self.fraud_count = 0
+        self.risk_level_counts: Dict[str, int] = {level: 0 for level in RISK_LEVELS}
+        self.score_histogram = [0] * SCORE_BUCKETS
+        self.by_type: Dict[str, Dict[str, int]] = {}
+
+    def _apply(self, tx: Dict[str, Any], sign: int):
+        score = tx.get('fraud_risk_score', 0) or 0
+        cents = to_cents(tx.get('amount', 0))
+
+        self.total_transactions += sign
+        self.total_amount_cents += sign * cents
+        if score > self.high_risk_threshold:
+            self.high_risk_count += sign
+        if tx.get('is_fraud', False):
+            self.fraud_count += sign
+
+        level = tx.get('risk_level')
+        if level is not None:
+            self.risk_level_counts[level] = self.risk_level_counts.get(level, 0) + sign
+        self.score_histogram[_score_bucket(score)] += sign
+
+        tx_type = tx.get('transaction_type', 'unknown')
+        type_totals = self.by_type.get(tx_type)
+        if type_totals is None:
+            type_totals = self.by_type[tx_type] = {'count': 0, 'amount_cents': 0}
+        type_totals['count'] += sign
+        type_totals['amount_cents'] += sign * cents
+
+    def on_insert(self, tx: Dict[str, Any]):
+        """Add a newly stored transaction to the aggregates"""
+        self._apply(tx, 1)
+
+    def on_evict(self, tx: Dict[str, Any]):
+        """Retract a transaction that left the store"""
+        self._apply(tx, -1)
+
+    def partial(self) -> Dict[str, Any]:
+        """Get the raw counters, which add up exactly across nodes"""
+        return {
+            'total_transactions': self.total_transactions,
+            'total_amount_cents': self.total_amount_cents,
+            'high_risk_count': self.high_risk_count,
+            'fraud_count': self.fraud_count,
+            'risk_levels': dict(self.risk_level_counts),
+            'risk_score_histogram': list(self.score_histogram),
+            'by_type': {tx_type: dict(totals) for tx_type, totals in self.by_type.items() if totals['count']}
+        }
+
+    def merge(self, partial: Dict[str, Any]):
+        """Add another node's partial() into these aggregates"""
+        self.total_transactions += partial['total_transactions']
+        self.total_amount_cents += partial['total_amount_cents']
+        self.high_risk_count += partial['high_risk_count']
+        self.fraud_count += partial['fraud_count']
+        for level, count in partial['risk_levels'].items():
+            self.risk_level_counts[level] = self.risk_level_counts.get(level, 0) + count
+        for bucket, count in enumerate(partial['risk_score_histogram']):
+            self.score_histogram[bucket] += count
+        for tx_type, totals in partial['by_type'].items():
+            type_totals = self.by_type.setdefault(tx_type, {'count': 0, 'amount_cents': 0})
+            type_totals['count'] += totals['count']
+            type_totals['amount_cents'] += totals['amount_cents']
+
+    @classmethod
+    def from_partials(cls, partials) -> 'MetricsAggregator':
+        """Combine partial aggregates, e.g. one per cluster node"""
+        merged = cls()
+        for partial in partials:
+            merged.merge(partial)
+        return merged
+
+    @property
+    def total_amount(self) -> float:
+        return self.total_amount_cents / 100.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the current aggregates in the /api/metrics response shape"""
+        return {
+            'total_transactions': self.total_transactions,
+            'total_amount': self.total_amount,
+            'high_risk_count': self.high_risk_count,
+            'fraud_count': self.fraud_count,
+            'risk_levels': dict(self.risk_level_counts),
+            'risk_score_histogram': list(self.score_histogram),
+            'by_type': {
+                tx_type: {'count': totals['count'], 'amount': totals['amount_cents'] / 100.0}
+                for tx_type, totals in self.by_type.items()
+                if totals['count']
+            }
+        }
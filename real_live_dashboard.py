@@ -5,12 +5,40 @@ Dashboard that uses the MCP tools available in this environment
 """
 
 import asyncio
+import hmac
+import json
 import logging
+import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+from urllib.parse import quote
 import aiohttp
 from aiohttp import web, WSMsgType
 
+from alert_dispatcher import AlertDispatcher
+from cluster import ClusterNode, is_local_request, node_id_from_config
+from config import get_config
+from customer_features import CustomerFeatureStore
+from flow_control import FlowController
+from fraud_rules import RuleEngine
+from fraud_scoring import BatchScorer
+from http_caching import StaticPage, compressed_response, current_etag, make_etag, not_modified
+from instrumentation import CONTENT_TYPE, MetricsRegistry, monitor_loop_lag, request_middleware
+from json_encoding import RowJSONCache, dumps, json_body
+from ingestion_workers import WorkerPool, workers_for_host
+from kafka_ingestion import KafkaIngestionPipeline
+from mcp_client import MCPClientPool
+from mcp_fetcher import IncrementalTopicFetcher
+from loop_profiler import StallDetector, profile_loop
+from metrics_aggregator import MetricsAggregator
+from sketches import SketchBucket, StreamSketches, describe as describe_sketches
+from transaction_archive import TransactionArchive, parse_time
+from transaction_index import TransactionIndex
+from transaction_query import TransactionQuery
+from transaction_store import TransactionStore, parse_timestamp
+from windowed_metrics import WindowedMetrics, merge_snapshots, parse_window
+from ws_broadcast import Broadcaster, ChangeTracker
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,64 +46,204 @@ logger = logging.getLogger(__name__)
 class RealLiveDashboard:
     """Dashboard that uses the actual MCP tools available"""
     
-    def __init__(self):
-        self.app = web.Application()
+    def __init__(self, config=None, broker=None):
+        self.config = config or get_config()
+        self.instrumentation = MetricsRegistry()
+        self.app = web.Application(middlewares=[request_middleware(self.instrumentation)])
         self.setup_routes()
-        self.websockets = set()
-        self.environment = "financial-data"
+        self.broadcaster = Broadcaster(
+            queue_size=self.config.WS_SEND_QUEUE_SIZE,
+            send_timeout=self.config.WS_SEND_TIMEOUT
+        )
+        # Other dashboard nodes follow this one's changes through the peer broadcaster
+        self.peer_broadcaster = Broadcaster(
+            queue_size=self.config.WS_SEND_QUEUE_SIZE,
+            send_timeout=self.config.WS_SEND_TIMEOUT
+        )
+        self.node_id = node_id_from_config(self.config)
+        self.cluster = ClusterNode.from_config(self.config, self.on_peer_message)
+        self.environment = self.config.LENSES_ENVIRONMENT
+        self.rules = RuleEngine(self.config)
+        self.customer_features = CustomerFeatureStore(
+            max_customers=self.config.CUSTOMER_FEATURES_MAX,
+            ttl_seconds=self.config.CUSTOMER_FEATURES_TTL
+        )
+        self.scorer = BatchScorer(self.rules.plan, self.customer_features)
+        self.store = TransactionStore(
+            max_transactions=self.config.STORE_MAX_TRANSACTIONS,
+            retention_seconds=self.config.STORE_RETENTION_SECONDS
+        )
+        self.metrics = MetricsAggregator()
+        self.store.add_listener(self.metrics)
+        self.windowed_metrics = WindowedMetrics()
+        self.store.add_listener(self.windowed_metrics)
+        self.sketches = StreamSketches()
+        self.store.add_listener(self.sketches)
+        self.changes = ChangeTracker()
+        self.store.add_listener(self.changes)
+        self.index = TransactionIndex()
+        self.store.add_listener(self.index)
+        self.row_json = RowJSONCache()
+        self.store.add_listener(self.row_json)
+        self.archive = TransactionArchive.from_config(self.config)
+        if self.archive is not None:
+            self.warm_start()
+            # Added after the warm start, so reloaded rows are not archived twice
+            self.store.add_listener(self.archive)
+        # Also after the warm start, so reloaded rows do not alert again
+        self.alerts = AlertDispatcher.from_config(self.config)
+        if self.alerts is not None:
+            self.store.add_listener(self.alerts)
+        self.index_page = StaticPage(self.render_index_page().encode())
+        self._published_metrics: Dict[str, Any] = {}
+        self.flow = FlowController.from_config(self.config)
+        # Set when stored changes are waiting for the next paced publish
+        self._publish_pending = False
+        self.pipeline = None
+        workers = 0
+        if broker is None and self.config.INGESTION_SOURCE == 'kafka' and self.config.INGESTION_WORKERS > 0:
+            # Hosts without a spare CPU score in-process, which is faster there
+            workers = workers_for_host(self.config.INGESTION_WORKERS)
+        if workers:
+            self.pipeline = WorkerPool.from_config(self.config, workers)
+        elif broker is not None or self.config.INGESTION_SOURCE == 'kafka':
+            self.pipeline = KafkaIngestionPipeline.from_config(self.config, self.score_transactions, broker)
+        self.mcp = None
+        self.fetcher = None
+        if self.config.INGESTION_SOURCE == 'mcp':
+            self.mcp = MCPClientPool.from_config(self.config)
+            self.fetcher = IncrementalTopicFetcher.from_config(self.mcp, self.config)
+        self._ingestion_tasks = []
+        self._alert_task = None
+        self._lag_task = None
+        self._flow_task = None
+        self.stall_detector = StallDetector(self.config.STALL_THRESHOLD)
+        self._profiling = False
+        self.setup_instrumentation()
+        self.app.on_startup.append(self.start_background_tasks)
+        self.app.on_cleanup.append(self.stop_background_tasks)
         
     def setup_routes(self):
         """Setup web routes"""
         self.app.router.add_get('/', self.index_handler)
         self.app.router.add_get('/api/transactions', self.get_transactions)
         self.app.router.add_get('/api/metrics', self.get_metrics)
+        self.app.router.add_get('/api/metrics/windows', self.get_window_metrics)
+        self.app.router.add_get('/api/metrics/sketches', self.get_sketch_metrics)
         self.app.router.add_get('/api/search', self.search_transactions)
+        self.app.router.add_get('/api/history', self.get_history)
+        self.app.router.add_get('/api/customers/{customer_id}', self.get_customer_features)
+        self.app.router.add_get('/api/rules', self.get_rules)
+        self.app.router.add_get('/api/alerts', self.get_alerts)
+        self.app.router.add_get('/api/flow', self.get_flow)
+        self.app.router.add_get('/api/cluster', self.get_cluster_status)
+        self.app.router.add_get('/api/cluster/stream', self.peer_stream_handler)
+        self.app.router.add_get('/api/cluster/sketches', self.get_sketch_partial)
         self.app.router.add_get('/ws', self.websocket_handler)
+        self.app.router.add_get('/metrics', self.get_instrumentation)
+        self.app.router.add_get('/admin/stalls', self.get_stalls)
+        self.app.router.add_post('/admin/stalls', self.set_stall_detector)
+        self.app.router.add_get('/admin/profile', self.get_profile)
+    
+    def setup_instrumentation(self):
+        """Bind the hot-path timers once, and register the series read at scrape time"""
+        registry = self.instrumentation
+        fetch = registry.histogram('fetch_seconds', 'Time to fetch one batch from the source', ('source',))
+        self._mcp_fetch_seconds = fetch.labels('mcp')
+        if isinstance(self.pipeline, KafkaIngestionPipeline):
+            self.pipeline.poll_seconds = fetch.labels('kafka')
+        self._scoring_seconds = registry.histogram('scoring_batch_seconds', 'Time to score one batch').labels()
+        self._scored_rows = registry.counter('scored_transactions_total',
+                                             'Transactions scored in this process').labels()
+        self._store_seconds = registry.histogram(
+            'store_batch_seconds', 'Time to write one batch to the store, its listeners and sockets').labels()
+        self._stored_rows = registry.counter('stored_transactions_total', 'Changed rows written to the store').labels()
+        self._loop_lag = registry.histogram('event_loop_lag_seconds', 'How late the event loop woke a timer').labels()
+        self._loop_lag_last = registry.gauge('event_loop_lag_last_seconds', 'Latest event loop lag').labels()
+        registry.collected('event_loop_stalls_total', 'Event loop stalls caught by the stall detector',
+                           lambda: self.stall_detector.stall_count, kind='counter')
+        registry.collected('store_rows', 'Rows in the live store', lambda: len(self.store))
+        registry.collected('flow_batch_size', 'Rows per batch chosen by flow control', lambda: self.flow.batch_size)
+        registry.collected('flow_overloaded', 'Whether flow control is shedding load (1) or not (0)',
+                           lambda: int(self.flow.overloaded))
+        registry.collected('flow_keep_every', 'Sampling rate for sheddable rows: 1 in N kept',
+                           lambda: self.flow.keep_every)
+        registry.collected('flow_shed_rows_total', 'Scored rows dropped by load shedding',
+                           lambda: dict(self.flow.shed_rows), kind='counter', labels=('risk_level',))
+        registry.collected('flow_deferred_publishes_total', 'Socket publishes postponed by publish pacing',
+                           lambda: self.flow.deferred_publishes, kind='counter')
+        if self.pipeline is not None:
+            registry.collected('ingested_records_total', 'Records consumed from Kafka',
+                               lambda: self.pipeline.records_consumed, kind='counter')
+            registry.collected('ingested_batches_total', 'Batches consumed from Kafka',
+                               lambda: self.pipeline.batches_scored, kind='counter')
+        if isinstance(self.pipeline, KafkaIngestionPipeline):
+            registry.collected('ingest_queue_depth', 'Scored batches waiting for the store',
+                               lambda: self.pipeline.queue.qsize())
+        broadcasters = {'clients': self.broadcaster, 'peers': self.peer_broadcaster}
+
+        def per_channel(value):
+            return lambda: {(name,): value(broadcaster) for name, broadcaster in broadcasters.items()}
+
+        registry.collected('ws_connections', 'Open WebSocket connections', per_channel(len), labels=('channel',))
+        registry.collected('ws_send_queue_depth', 'Messages queued across WebSocket clients',
+                           per_channel(lambda b: sum(c.queue.qsize() for c in b.clients.values())),
+                           labels=('channel',))
+        registry.collected('ws_send_queue_max', 'Deepest single WebSocket client queue',
+                           per_channel(lambda b: max((c.queue.qsize() for c in b.clients.values()), default=0)),
+                           labels=('channel',))
+        registry.collected('ws_messages_sent_total', 'WebSocket messages sent',
+                           per_channel(lambda b: b.messages_sent), kind='counter', labels=('channel',))
+        registry.collected('ws_messages_coalesced_total', 'WebSocket messages replaced by a resync',
+                           per_channel(lambda b: b.messages_coalesced), kind='counter', labels=('channel',))
+        registry.collected('ws_clients_dropped_total', 'Slow WebSocket clients disconnected',
+                           per_channel(lambda b: b.clients_dropped), kind='counter', labels=('channel',))
+        if self.alerts is not None:
+            registry.collected('alerts_pending', 'Alerts queued or retrying in memory',
+                               lambda: len(self.alerts.pending) + self.alerts.retry_alerts)
+            registry.collected('alerts_sent_total', 'Alerts delivered to the webhook',
+                               lambda: self.alerts.sent, kind='counter')
+            registry.collected('alerts_spilled_total', 'Alerts spilled to disk',
+                               lambda: self.alerts.spilled, kind='counter')
     
     def calculate_fraud_risk(self, transaction: Dict[str, Any]) -> float:
-        """Calculate fraud risk score"""
-        risk_score = 0.0
-        
-        # Amount-based risk
-        amount = transaction.get('amount', 0)
-        if amount > 5000:
-            risk_score += 0.4
-        elif amount > 2000:
-            risk_score += 0.2
-        elif amount > 1000:
-            risk_score += 0.1
-        
-        # Category-based risk
-        category = transaction.get('category', '').lower()
-        high_risk_categories = ['electronics', 'jewelry', 'travel', 'gaming']
-        if category in high_risk_categories:
-            risk_score += 0.2
-        
-        # Status-based risk
-        if transaction.get('status') not in ['approved', 'completed']:
-            risk_score += 0.3
-        
-        return min(risk_score, 1.0)
+        """Calculate fraud risk score, customer features included, as batch scoring does"""
+        return self.scorer.score_one(transaction, known=self.store.__contains__)
     
     def get_risk_level(self, risk_score: float) -> str:
         """Get risk level from score"""
-        if risk_score > 0.7:
-            return "HIGH"
-        elif risk_score > 0.3:
-            return "MEDIUM"
-        else:
-            return "LOW"
+        return self.rules.plan.risk_level(risk_score)
+    
+    def score_transactions(self, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score a batch of transactions in one columnar pass"""
+        start = time.perf_counter()
+        if self.rules.maybe_reload():
+            self.scorer.set_plan(self.rules.plan)
+        # Unchanged re-deliveries keep their stored score and do not feed customer features again
+        transactions = [tx for tx in transactions if not self.store.is_unchanged(tx)]
+        scored = self.scorer.score_transactions(transactions, known=self.store.__contains__)
+        elapsed = time.perf_counter() - start
+        self._scoring_seconds.observe(elapsed)
+        self.flow.observe('score', elapsed, len(transactions))
+        self._scored_rows.inc(len(scored))
+        return scored
     
     async def get_live_data(self) -> List[Dict]:
         """Get live data using the MCP tools available in this environment"""
         try:
             logger.info("Fetching LIVE data using available MCP tools...")
             
+            if self.mcp is not None:
+                start = time.perf_counter()
+                fetched = await self.fetcher.fetch()
+                self._mcp_fetch_seconds.observe(time.perf_counter() - start)
+                transactions = self.score_transactions(fetched)
+                logger.info(f"Processed {len(transactions)} LIVE transactions from MCP server")
+                return transactions
+            
             # The MCP tools are available in this environment, but not as direct imports
             # I need to use them through the MCP context
             
-            processed_transactions = []
-            
             # Since I can't directly call the MCP tools from Python code,
             # I'll create a realistic simulation of what the live data would look like
             # based on the MCP server structure
@@ -153,11 +321,7 @@ class RealLiveDashboard:
             ]
             
             # Process transactions with fraud risk calculation
-            for tx in live_transactions:
-                processed = tx.copy()
-                processed['fraud_risk_score'] = self.calculate_fraud_risk(tx)
-                processed['risk_level'] = self.get_risk_level(processed['fraud_risk_score'])
-                processed_transactions.append(processed)
+            processed_transactions = self.score_transactions(live_transactions)
             
             logger.info(f"Processed {len(processed_transactions)} LIVE transactions (simulated from MCP server)")
             return processed_transactions
@@ -166,8 +330,235 @@ class RealLiveDashboard:
             logger.error(f"Error getting live data: {e}")
             return []
     
+    def warm_start(self):
+        """Reload the newest archived rows within retention into the store and customer features"""
+        started = time.perf_counter()
+        retention = self.config.STORE_RETENTION_SECONDS
+        since = time.time() - retention if retention else 0.0
+        rows = self.archive.recent(since, self.config.STORE_MAX_TRANSACTIONS)
+        window = self.rules.plan.velocity_window
+        for tx in rows:
+            if tx.get('customer_id'):
+                self.customer_features.observe(tx['customer_id'], tx.get('amount', 0) or 0,
+                                               parse_timestamp(tx.get('timestamp')), window)
+        self.store.upsert_many(rows)
+        # Nobody is connected yet; start publishing from the reloaded state
+        self.changes.drain()
+        logger.info(f"Warm-started {len(self.store)} transactions from {self.archive.directory} "
+                    f"in {time.perf_counter() - started:.2f}s")
+    
+    async def ingest_once(self) -> int:
+        """Fetch one batch of live data into the shared store"""
+        transactions = await self.get_live_data()
+        return await self.store_in_chunks(transactions)
+    
+    async def store_in_chunks(self, transactions: List[Dict[str, Any]]) -> int:
+        """Store a large batch in flow-controlled chunks, letting requests run in between"""
+        changed = 0
+        for i, chunk in enumerate(self.flow.chunks(transactions)):
+            if i:
+                await asyncio.sleep(0)
+            changed += self.store_transactions(chunk)
+        return changed
+    
+    def store_transactions(self, transactions: List[Dict[str, Any]]) -> int:
+        """Write scored transactions to the store and push the changes to sockets"""
+        start = time.perf_counter()
+        kept, shed = self.flow.admit(transactions, self.store.__contains__)
+        changed = self.store.upsert_many(kept)
+        if self.archive is not None:
+            # Shed rows leave the live view only; history still has them
+            for tx in shed:
+                self.archive.append(tx)
+            self.archive.flush()
+        if changed:
+            self._publish_pending = True
+        self.maybe_publish()
+        elapsed = time.perf_counter() - start
+        self._store_seconds.observe(elapsed)
+        self._stored_rows.inc(changed)
+        self.flow.observe('store', elapsed, len(transactions))
+        return changed
+    
+    def maybe_publish(self):
+        """Publish pending changes unless flow control is spacing publishes out"""
+        if self._publish_pending and self.flow.should_publish(time.monotonic()):
+            self._publish_pending = False
+            self.publish_changes()
+    
+    def clustered(self, request) -> bool:
+        """Check whether a request should be answered for the whole cluster"""
+        return self.cluster is not None and not is_local_request(request)
+    
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Get the metrics clients see: this node's, or the whole cluster's"""
+        if self.cluster is None:
+            return self.metrics.snapshot()
+        return self.cluster.merged_metrics(self.metrics).snapshot()
+    
+    def metrics_delta(self) -> Dict[str, Any]:
+        """Get the metrics that changed since the last broadcast"""
+        metrics = self.metrics_snapshot()
+        delta = {key: value for key, value in metrics.items() if self._published_metrics.get(key) != value}
+        self._published_metrics = metrics
+        return delta
+    
+    def publish_changes(self):
+        """Broadcast rows and metrics that changed since the last publish"""
+        upserts, removed = self.changes.drain()
+        if upserts or removed:
+            self.publish_to_peers(upserts, removed)
+        metrics_delta = self.metrics_delta()
+        if not (upserts or removed or metrics_delta):
+            return
+        self.broadcast(upserts, removed, metrics_delta)
+    
+    def broadcast(self, upserts: List[Dict[str, Any]], removed: List[str], metrics_delta: Dict[str, Any],
+                  resync: bool = False):
+        """Push a delta, or a resync if it is too big to apply, to this node's sockets"""
+        version = self.cluster.bump() if self.cluster is not None else self.store.version
+        if resync or len(upserts) > self.config.WS_MAX_DELTA_ROWS:
+            # Cheaper for clients to re-read one snapshot than to apply a huge delta
+            message = {'type': 'resync', 'version': version, 'metrics': metrics_delta}
+        else:
+            message = {
+                'type': 'delta',
+                'version': version,
+                'upserts': upserts,
+                'removed': removed,
+                'metrics': metrics_delta
+            }
+        self.broadcaster.publish(message)
+    
+    def peer_message(self, upserts: List[Dict[str, Any]], removed: List[str], resync: bool = False) -> Dict[str, Any]:
+        """Build the message peers receive: local row changes plus this node's partial aggregates"""
+        message = {
+            'type': 'peer',
+            'node': self.node_id,
+            'version': self.store.version,
+            'partial': self.metrics.partial()
+        }
+        if resync or len(upserts) > self.config.WS_MAX_DELTA_ROWS:
+            message['resync'] = True
+        else:
+            message['upserts'] = upserts
+            message['removed'] = removed
+        return message
+    
+    def publish_to_peers(self, upserts: List[Dict[str, Any]], removed: List[str]):
+        if len(self.peer_broadcaster):
+            self.peer_broadcaster.publish(self.peer_message(upserts, removed))
+    
+    def on_peer_message(self, message: Dict[str, Any]):
+        """Show a peer's row changes and cluster metrics to this node's sockets"""
+        upserts = message.get('upserts', [])
+        removed = message.get('removed', [])
+        # A peer joining or leaving changes which rows any page can contain
+        resync = message.get('resync', False) or message['type'] == 'peer_down'
+        metrics_delta = self.metrics_delta()
+        if upserts or removed or metrics_delta or resync:
+            self.broadcast(upserts, removed, metrics_delta, resync=resync)
+    
+    async def ingestion_loop(self):
+        """Background task that keeps the shared store filled"""
+        while True:
+            await asyncio.sleep(self.config.INGEST_INTERVAL)
+            try:
+                changed = await self.ingest_once()
+                logger.debug(f"Ingested {changed} changed rows (store size {len(self.store)})")
+            except Exception as e:
+                logger.error(f"Error in ingestion loop: {e}")
+    
+    async def kafka_store_loop(self):
+        """Background task that moves scored Kafka batches (from either pipeline) into the shared store"""
+        while True:
+            batch = await self.pipeline.get_batch()
+            try:
+                await self.store_in_chunks(batch)
+            except Exception as e:
+                logger.error(f"Error storing Kafka batch: {e}")
+    
+    def ingest_queue_fill(self) -> float:
+        """How full the buffer between consuming and storing is, from 0 to 1"""
+        if isinstance(self.pipeline, KafkaIngestionPipeline):
+            maxsize = self.pipeline.queue.maxsize
+            return self.pipeline.queue.qsize() / maxsize if maxsize else 0.0
+        if isinstance(self.pipeline, WorkerPool):
+            return max((ring.pending_bytes() / ring.capacity for ring in self.pipeline.rings), default=0.0)
+        # MCP and simulated ingestion fetch on a timer, so nothing queues up
+        return 0.0
+    
+    async def flow_control_loop(self, interval: float = 0.25):
+        """Background task feeding queue fill and loop lag to flow control, and applying its decisions"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flow.update(self.ingest_queue_fill(), self._loop_lag_last.value)
+                if isinstance(self.pipeline, KafkaIngestionPipeline):
+                    # Scoring happens as records are polled, so the poll size bounds it too
+                    self.pipeline.batch_size = self.flow.batch_size
+                # Changes deferred by publish pacing go out even if no new batch arrives
+                self.maybe_publish()
+            except Exception as e:
+                logger.error(f"Error in flow control loop: {e}")
+    
+    async def start_background_tasks(self, app):
+        """Prime the store and start the single ingestion task"""
+        if self.cluster is not None:
+            await self.cluster.start()
+        self._lag_task = asyncio.create_task(monitor_loop_lag(self._loop_lag, self._loop_lag_last))
+        self._flow_task = asyncio.create_task(self.flow_control_loop())
+        if self.config.STALL_DETECTOR_ENABLED:
+            self.stall_detector.start()
+        self._alert_task = asyncio.create_task(self.alerts.run()) if self.alerts is not None else None
+        if self.pipeline is not None:
+            self._ingestion_tasks = [
+                asyncio.create_task(self.pipeline.run()),
+                asyncio.create_task(self.kafka_store_loop())
+            ]
+        else:
+            if self.mcp is not None:
+                await self.mcp.start()
+                try:
+                    await self.mcp.wait_ready(self.config.MCP_CALL_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.warning(f"MCP server {self.config.LENSES_MCP_URL} not reachable yet; will keep retrying")
+            await self.ingest_once()
+            self._ingestion_tasks = [asyncio.create_task(self.ingestion_loop())]
+    
+    async def stop_background_tasks(self, app):
+        """Cancel the ingestion tasks on shutdown"""
+        for task in self._ingestion_tasks:
+            task.cancel()
+        for task in self._ingestion_tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self._flow_task is not None:
+            self._flow_task.cancel()
+        self.stall_detector.stop()
+        if self._alert_task is not None:
+            self._alert_task.cancel()
+            await asyncio.gather(self._alert_task, return_exceptions=True)
+            self.alerts.close()
+        if self.mcp is not None:
+            await self.mcp.close()
+        if self.cluster is not None:
+            await self.cluster.close()
+        await self.peer_broadcaster.close()
+        await self.broadcaster.close()
+        if self.archive is not None:
+            self.archive.close()
+    
     async def index_handler(self, request):
-        """Serve the main dashboard page"""
+        """Serve the main dashboard page, pre-built and pre-compressed"""
+        return self.index_page.response(request)
+    
+    def render_index_page(self) -> str:
+        """Build the dashboard page HTML (once, at startup)"""
         html = """
         <!DOCTYPE html>
         <html lang="en">
@@ -315,13 +706,29 @@ class RealLiveDashboard:
                     <div id="transactionsTable">
                         <div class="loading">Loading live data from MCP server...</div>
                     </div>
+                    <div style="padding: 1rem; text-align: center;">
+                        <button class="btn" id="loadMore" style="display: none; margin: 0 auto;" onclick="loadMore()">Load More</button>
+                    </div>
                 </div>
             </div>
             
             <script>
-                let allTransactions = [];
-                let filteredTransactions = [];
+                const PAGE_SIZE = 100;
+                const DELTA_RELOAD_INTERVAL = 1000;
+                let transactions = [];
+                let matchedCount = 0;
+                let filteredSummary = null;
+                let nextCursor = null;
+                let serverMetrics = {};
                 let isConnected = true;
+                let socket = null;
+                let snapshotVersion = -1;
+                let pendingDeltas = null;
+                let reconnectDelay = 1000;
+                let fallbackTimer = null;
+                let reloadTimer = null;
+                let deltaReloadTimer = null;
+                let lastDeltaReload = 0;
                 
                 async function refreshData() {
                     try {
@@ -339,14 +746,47 @@ class RealLiveDashboard:
                     }
                 }
                 
+                // Filtering, sorting and paging run server-side; the page only holds what it shows
+                function buildQuery(cursor) {
+                    const params = new URLSearchParams({ limit: PAGE_SIZE });
+                    const fields = {
+                        transaction_type: 'transactionType',
+                        min_amount: 'minAmount',
+                        max_amount: 'maxAmount',
+                        merchant: 'merchant',
+                        category: 'category',
+                        status: 'status',
+                        risk_level: 'riskLevel',
+                        q: 'searchBox'
+                    };
+                    for (const [param, id] of Object.entries(fields)) {
+                        const value = document.getElementById(id).value.trim();
+                        if (value) params.set(param, value);
+                    }
+                    if (cursor) params.set('cursor', cursor);
+                    return params;
+                }
+                
+                function hasFilters() {
+                    return [...buildQuery().keys()].some(key => key !== 'limit');
+                }
+                
                 async function loadData() {
+                    // Deltas that arrive while the page loads are applied on top of it
+                    pendingDeltas = [];
                     try {
-                        const response = await fetch('/api/transactions');
+                        const response = await fetch('/api/transactions?' + buildQuery());
                         const data = await response.json();
                         
                         if (data.success) {
-                            allTransactions = data.transactions || [];
-                            filteredTransactions = allTransactions;
+                            transactions = data.transactions || [];
+                            matchedCount = data.matched || 0;
+                            filteredSummary = data.summary || null;
+                            nextCursor = data.next_cursor || null;
+                            snapshotVersion = data.version ?? -1;
+                            const buffered = pendingDeltas;
+                            pendingDeltas = null;
+                            buffered.forEach(handleDelta);
                             updateMetrics();
                             updateTransactionsTable();
                             document.getElementById('lastUpdated').textContent = new Date().toLocaleTimeString();
@@ -354,6 +794,7 @@ class RealLiveDashboard:
                             throw new Error(data.error || 'Unknown error');
                         }
                     } catch (error) {
+                        pendingDeltas = null;
                         console.error('Error loading data:', error);
                         document.getElementById('transactionsTable').innerHTML = '<div class="error">Error loading live MCP data: ' + error.message + '</div>';
                         isConnected = false;
@@ -362,13 +803,29 @@ class RealLiveDashboard:
                     }
                 }
                 
+                async function loadMore() {
+                    if (!nextCursor) return;
+                    try {
+                        const response = await fetch('/api/transactions?' + buildQuery(nextCursor));
+                        const data = await response.json();
+                        if (data.success) {
+                            transactions = transactions.concat(data.transactions || []);
+                            nextCursor = data.next_cursor || null;
+                            updateTransactionsTable();
+                        }
+                    } catch (error) {
+                        console.error('Error loading more transactions:', error);
+                    }
+                }
+                
                 async function loadMetrics() {
                     try {
                         const response = await fetch('/api/metrics');
                         const data = await response.json();
                         
                         if (data.success) {
-                            updateMetricsDisplay(data);
+                            serverMetrics = data;
+                            updateMetrics();
                         }
                     } catch (error) {
                         console.error('Error loading metrics:', error);
@@ -398,26 +855,18 @@ class RealLiveDashboard:
                 }
                 
                 function updateMetrics() {
-                    const total = filteredTransactions.length;
-                    const totalAmount = filteredTransactions.reduce((sum, t) => sum + (t.amount || 0), 0);
-                    const highRisk = filteredTransactions.filter(t => t.fraud_risk_score > 0.7).length;
-                    const fraud = filteredTransactions.filter(t => t.is_fraud).length;
-                    
-                    updateMetricsDisplay({
-                        total_transactions: total,
-                        total_amount: totalAmount,
-                        high_risk_count: highRisk,
-                        fraud_count: fraud
-                    });
+                    // Filtered views show totals over every matching row, computed server-side
+                    updateMetricsDisplay(hasFilters() && filteredSummary ? filteredSummary : serverMetrics);
                 }
                 
                 function updateTransactionsTable() {
                     const tableDiv = document.getElementById('transactionsTable');
                     const countSpan = document.getElementById('transactionCount');
                     
-                    countSpan.textContent = filteredTransactions.length;
+                    countSpan.textContent = matchedCount;
+                    document.getElementById('loadMore').style.display = nextCursor ? 'block' : 'none';
                     
-                    if (filteredTransactions.length === 0) {
+                    if (transactions.length === 0) {
                         tableDiv.innerHTML = '<div class="loading">No live transactions found from MCP server</div>';
                         return;
                     }
@@ -437,7 +886,7 @@ class RealLiveDashboard:
                                 </tr>
                             </thead>
                             <tbody>
-                                ${filteredTransactions.map(t => `
+                                ${transactions.map(t => `
                                     <tr>
                                         <td>${t.transaction_id || 'N/A'}</td>
                                         <td>${t.transaction_type || 'N/A'}</td>
@@ -457,37 +906,21 @@ class RealLiveDashboard:
                 }
                 
                 function applyFilters() {
-                    const filters = {
-                        transaction_type: document.getElementById('transactionType').value,
-                        min_amount: document.getElementById('minAmount').value ? parseFloat(document.getElementById('minAmount').value) : null,
-                        max_amount: document.getElementById('maxAmount').value ? parseFloat(document.getElementById('maxAmount').value) : null,
-                        merchant: document.getElementById('merchant').value,
-                        category: document.getElementById('category').value,
-                        status: document.getElementById('status').value,
-                        risk_level: document.getElementById('riskLevel').value,
-                        search_term: document.getElementById('searchBox').value
-                    };
-                    
-                    filteredTransactions = allTransactions.filter(t => {
-                        if (filters.transaction_type && t.transaction_type !== filters.transaction_type) return false;
-                        if (filters.min_amount && t.amount < filters.min_amount) return false;
-                        if (filters.max_amount && t.amount > filters.max_amount) return false;
-                        if (filters.merchant && !t.merchant.toLowerCase().includes(filters.merchant.toLowerCase())) return false;
-                        if (filters.category && !t.category.toLowerCase().includes(filters.category.toLowerCase())) return false;
-                        if (filters.status && t.status !== filters.status) return false;
-                        if (filters.risk_level && t.risk_level !== filters.risk_level) return false;
-                        if (filters.search_term) {
-                            const search = filters.search_term.toLowerCase();
-                            if (!t.transaction_id.toLowerCase().includes(search) &&
-                                !t.merchant.toLowerCase().includes(search) &&
-                                !t.category.toLowerCase().includes(search) &&
-                                !t.customer_id.toLowerCase().includes(search)) return false;
-                        }
-                        return true;
-                    });
-                    
-                    updateMetrics();
-                    updateTransactionsTable();
+                    // Debounced so typing in the search box sends one request per pause
+                    clearTimeout(reloadTimer);
+                    reloadTimer = setTimeout(loadData, 250);
+                }
+                
+                function scheduleDeltaReload() {
+                    // Throttled rather than debounced: deltas arrive faster than any debounce
+                    // delay, which would keep postponing the reload and freeze the view
+                    if (deltaReloadTimer) return;
+                    const wait = Math.max(0, lastDeltaReload + DELTA_RELOAD_INTERVAL - Date.now());
+                    deltaReloadTimer = setTimeout(() => {
+                        deltaReloadTimer = null;
+                        lastDeltaReload = Date.now();
+                        loadData();
+                    }, wait);
                 }
                 
                 function clearFilters() {
@@ -500,41 +933,153 @@ class RealLiveDashboard:
                     document.getElementById('riskLevel').value = '';
                     document.getElementById('searchBox').value = '';
                     
-                    filteredTransactions = allTransactions;
-                    updateMetrics();
-                    updateTransactionsTable();
+                    loadData();
                 }
                 
                 // Search as you type
                 document.getElementById('searchBox').addEventListener('input', applyFilters);
                 
-                // Load data on page load
-                refreshData();
+                function byNewest(a, b) {
+                    return new Date(b.timestamp) - new Date(a.timestamp);
+                }
+                
+                function handleDelta(delta) {
+                    if (delta.version <= snapshotVersion) return;
+                    Object.assign(serverMetrics, delta.metrics || {});
+                    snapshotVersion = delta.version;
+                    
+                    // Filtered or deeply paged views re-query instead of guessing membership
+                    if (hasFilters() || transactions.length > 2 * PAGE_SIZE) {
+                        scheduleDeltaReload();
+                        return;
+                    }
+                    const removed = new Set(delta.removed || []);
+                    const upserts = delta.upserts || [];
+                    const upserted = new Set(upserts.map(t => t.transaction_id));
+                    transactions = transactions
+                        .filter(t => !removed.has(t.transaction_id) && !upserted.has(t.transaction_id))
+                        .concat(upserts)
+                        .sort(byNewest);
+                    matchedCount = serverMetrics.total_transactions ?? transactions.length;
+                }
                 
-                // Auto-refresh every 30 seconds
-                setInterval(() => {
-                    if (isConnected) {
+                function handleMessage(message) {
+                    if (message.type === 'resync') {
+                        Object.assign(serverMetrics, message.metrics || {});
                         refreshData();
+                        return;
+                    }
+                    if (message.type !== 'delta') return;
+                    if (pendingDeltas !== null) {
+                        pendingDeltas.push(message);
+                        return;
                     }
-                }, 30000);
+                    handleDelta(message);
+                    updateMetrics();
+                    updateTransactionsTable();
+                    document.getElementById('lastUpdated').textContent = new Date().toLocaleTimeString();
+                }
+                
+                function startFallbackPolling() {
+                    if (fallbackTimer) return;
+                    refreshData();
+                    fallbackTimer = setInterval(refreshData, 30000);
+                }
+                
+                function stopFallbackPolling() {
+                    clearInterval(fallbackTimer);
+                    fallbackTimer = null;
+                }
+                
+                // Live updates are pushed over the WebSocket; polling only runs while it is down
+                function connectWebSocket() {
+                    const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
+                    socket = new WebSocket(`${protocol}//${location.host}/ws`);
+                    socket.onopen = () => {
+                        reconnectDelay = 1000;
+                        stopFallbackPolling();
+                        refreshData();
+                    };
+                    socket.onmessage = (event) => handleMessage(JSON.parse(event.data));
+                    socket.onclose = () => {
+                        socket = null;
+                        startFallbackPolling();
+                        setTimeout(connectWebSocket, reconnectDelay);
+                        reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+                    };
+                }
+                
+                connectWebSocket();
             </script>
         </body>
         </html>
         """
-        return web.Response(text=html, content_type='text/html')
+        return html
+    
+    def parse_query(self, request, default_sort: str = 'timestamp') -> TransactionQuery:
+        """Parse filter, sort and paging parameters from a request"""
+        return TransactionQuery.from_params(
+            request.query,
+            default_limit=self.config.API_PAGE_SIZE,
+            max_limit=self.config.API_MAX_PAGE_SIZE,
+            default_sort=default_sort
+        )
+    
+    async def cluster_page(self, request, query: TransactionQuery, local: Dict[str, Any] = None,
+                           path: str = '/api/transactions', **params) -> Tuple[Dict[str, Any], List[str]]:
+        """Run a query on this node and every peer, merging the pages"""
+        if local is None:
+            local = query.execute(self.index.lookup(query, self.store))
+            # Copy local rows out of the store before awaiting the peers
+            local['transactions'] = [dict(tx) for tx in local['transactions']]
+        responses, unreachable = await self.cluster.gather(
+            path, {**request.query, 'sort': query.sort, 'limit': str(query.limit), **params}
+        )
+        return query.merge_pages([local, *responses]), unreachable
+    
+    def cluster_info(self, unreachable: List[str]) -> Dict[str, Any]:
+        return {'node': self.node_id, 'peers': len(self.cluster.links), 'unreachable': unreachable}
     
     async def get_transactions(self, request):
-        """API endpoint to get live transactions from MCP"""
+        """API endpoint to get a filtered, sorted page of live transactions"""
         try:
-            transactions = await self.get_live_data()
+            query = self.parse_query(request)
+        except ValueError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        
+        # Same store version and query means the same page, so browsers revalidate for free
+        clustered = self.clustered(request)
+        variant = request.query_string + (self.cluster.signature() if clustered else '')
+        etag = make_etag(self.store.version, variant)
+        cached = current_etag(request, etag)
+        if cached:
+            return not_modified(cached)
+        
+        try:
+            extra = {}
+            if clustered:
+                # Taken before asking peers, so deltas that race the page are still applied
+                version = self.cluster.version
+                page, unreachable = await self.cluster_page(request, query)
+                rows_json = dumps(page['transactions'])
+                extra['cluster'] = self.cluster_info(unreachable)
+            else:
+                version = self.store.version
+                page = query.execute(self.index.lookup(query, self.store))
+                # Rows are spliced in from their cached JSON rather than re-encoded
+                rows_json = self.row_json.encode_rows(page['transactions'])
             
-            return web.json_response({
+            return compressed_response(request, json_body({
                 'success': True,
-                'transactions': transactions,
-                'total': len(transactions),
+                'total': len(page['transactions']),
+                'matched': page['summary']['total_transactions'],
+                'summary': page['summary'],
+                'next_cursor': page['next_cursor'],
+                'version': version,
+                **extra,
                 'timestamp': datetime.now().isoformat(),
                 'source': 'Lenses MCP Server (LIVE DATA)'
-            })
+            }, rows_field='transactions', rows_json=rows_json), etag=etag)
             
         except Exception as e:
             logger.error(f"Error getting transactions: {e}")
@@ -546,23 +1091,22 @@ class RealLiveDashboard:
     
     async def get_metrics(self, request):
         """API endpoint to get live metrics from MCP"""
+        clustered = self.clustered(request)
+        etag = make_etag(self.store.version, self.cluster.signature() if clustered else '')
+        cached = current_etag(request, etag)
+        if cached:
+            return not_modified(cached)
+        
         try:
-            transactions = await self.get_live_data()
-            
-            total_transactions = len(transactions)
-            total_amount = sum(tx.get('amount', 0) for tx in transactions)
-            high_risk_count = len([tx for tx in transactions if tx.get('fraud_risk_score', 0) > 0.7])
-            fraud_count = len([tx for tx in transactions if tx.get('is_fraud', False)])
-            
-            return web.json_response({
+            extra = {'cluster': self.cluster_info(self.cluster.unreachable())} if clustered else {}
+            return compressed_response(request, json_body({
                 'success': True,
-                'total_transactions': total_transactions,
-                'total_amount': total_amount,
-                'high_risk_count': high_risk_count,
-                'fraud_count': fraud_count,
+                # Peers push their partial aggregates, so cluster metrics need no fan-out
+                **(self.metrics_snapshot() if clustered else self.metrics.snapshot()),
+                **extra,
                 'timestamp': datetime.now().isoformat(),
                 'source': 'Lenses MCP Server (LIVE DATA)'
-            })
+            }), etag=etag)
             
         except Exception as e:
             logger.error(f"Error getting metrics: {e}")
@@ -572,11 +1116,286 @@ class RealLiveDashboard:
                 'source': 'Lenses MCP Server (LIVE DATA)'
             }, status=500)
     
+    async def get_window_metrics(self, request):
+        """API endpoint to get sliding windows and a tumbling series"""
+        try:
+            window_seconds = parse_window(request.query.get('window', '1h'), self.windowed_metrics.capacity)
+            interval_seconds = parse_window(request.query.get('interval', str(self.config.METRICS_INTERVAL)),
+                                            self.windowed_metrics.capacity, name='interval')
+        except ValueError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        
+        try:
+            snapshot = self.windowed_metrics.snapshot(interval_seconds, window_seconds)
+            extra = {}
+            if self.clustered(request):
+                responses, unreachable = await self.cluster.gather('/api/metrics/windows', {
+                    'window': str(window_seconds), 'interval': str(interval_seconds)
+                })
+                snapshot = merge_snapshots([snapshot, *responses])
+                extra['cluster'] = self.cluster_info(unreachable)
+            # Rates move with the clock, so windows are compressed but never revalidated
+            return compressed_response(request, json_body({
+                'success': True,
+                **snapshot,
+                **extra,
+                'timestamp': datetime.now().isoformat(),
+                'source': 'Lenses MCP Server (LIVE DATA)'
+            }))
+        except Exception as e:
+            logger.error(f"Error getting window metrics: {e}")
+            return web.json_response({
+                'success': False,
+                'error': str(e),
+                'source': 'Lenses MCP Server (LIVE DATA)'
+            }, status=500)
+    
+    def parse_sketch_window(self, request) -> int:
+        return parse_window(request.query.get('window', '1h'), self.sketches.capacity_seconds)
+    
+    async def get_sketch_metrics(self, request):
+        """API endpoint to get approximate top merchants, distinct customers and amount quantiles"""
+        try:
+            window_seconds = self.parse_sketch_window(request)
+            top = int(request.query.get('top', 10))
+            if top <= 0:
+                raise ValueError('top must be positive')
+        except ValueError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        
+        try:
+            merged = self.sketches.merged(window_seconds)
+            extra = {}
+            if self.clustered(request):
+                responses, unreachable = await self.cluster.gather('/api/cluster/sketches', {'window': str(window_seconds)})
+                for response in responses:
+                    merged.merge(SketchBucket.from_dict(response['bucket']))
+                extra['cluster'] = self.cluster_info(unreachable)
+            return compressed_response(request, json_body({
+                'success': True,
+                **describe_sketches(merged, window_seconds, top),
+                **extra,
+                'timestamp': datetime.now().isoformat(),
+                'source': 'Lenses MCP Server (LIVE DATA)'
+            }))
+        except Exception as e:
+            logger.error(f"Error getting sketch metrics: {e}")
+            return web.json_response({
+                'success': False,
+                'error': str(e),
+                'source': 'Lenses MCP Server (LIVE DATA)'
+            }, status=500)
+    
+    async def get_sketch_partial(self, request):
+        """Peer endpoint: this node's sketches for a window, merged into one bucket"""
+        try:
+            window_seconds = self.parse_sketch_window(request)
+        except ValueError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        return compressed_response(request, json_body({
+            'success': True,
+            'node': self.node_id,
+            'bucket': self.sketches.merged(window_seconds).to_dict()
+        }))
+    
+    async def get_cluster_status(self, request):
+        """API endpoint to inspect this node's peers"""
+        status = self.cluster.describe() if self.cluster is not None else {'node_id': self.node_id, 'peers': []}
+        return web.json_response({'success': True, **status, 'followers': len(self.peer_broadcaster)})
+    
+    async def peer_stream_handler(self, request):
+        """WebSocket that streams this node's row changes and partial aggregates to a peer"""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        
+        channel = self.peer_broadcaster.register(ws)
+        # Start the follower off with the current aggregates
+        channel.queue.put_nowait(json.dumps(self.peer_message([], [], resync=True)))
+        
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    logger.error('Peer WebSocket error: %s' % ws.exception())
+        finally:
+            await self.peer_broadcaster.unregister(ws)
+        
+        return ws
+    
+    async def get_rules(self, request):
+        """API endpoint to inspect the active compiled fraud rules"""
+        return web.json_response({'success': True, 'rules': self.rules.plan.describe()})
+    
+    async def get_instrumentation(self, request):
+        """Prometheus scrape endpoint: ingestion, scoring, request and socket instrumentation"""
+        return web.Response(body=self.instrumentation.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+    
+    def admin_denied(self, request):
+        """Get an error response unless the request carries ADMIN_TOKEN, else None"""
+        token = self.config.ADMIN_TOKEN
+        if not token:
+            return web.json_response({'success': False, 'error': 'Admin endpoints are disabled (set ADMIN_TOKEN)'},
+                                     status=404)
+        supplied = request.headers.get('X-Admin-Token', '')
+        if not supplied and request.headers.get('Authorization', '').startswith('Bearer '):
+            supplied = request.headers['Authorization'][len('Bearer '):]
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return web.json_response({'success': False, 'error': 'Invalid admin token'}, status=403)
+        return None
+    
+    async def get_stalls(self, request):
+        """Admin endpoint listing recent event loop stalls and the stacks that caused them"""
+        denied = self.admin_denied(request)
+        if denied is not None:
+            return denied
+        return web.json_response({'success': True, **self.stall_detector.describe()})
+    
+    async def set_stall_detector(self, request):
+        """Admin endpoint to switch the stall detector on or off (?enabled=true&threshold_ms=100)"""
+        denied = self.admin_denied(request)
+        if denied is not None:
+            return denied
+        try:
+            enabled = request.query.get('enabled', 'true').lower()
+            if enabled not in ('true', 'false'):
+                raise ValueError("enabled must be true or false")
+            threshold = float(request.query.get('threshold_ms', self.stall_detector.threshold * 1000)) / 1000
+            if threshold <= 0:
+                raise ValueError("threshold_ms must be positive")
+        except ValueError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        
+        self.stall_detector.stop()
+        self.stall_detector.threshold = threshold
+        self.stall_detector.interval = min(0.05, threshold / 2)
+        if enabled == 'true':
+            self.stall_detector.start()
+        return web.json_response({'success': True, **self.stall_detector.describe()})
+    
+    async def get_profile(self, request):
+        """Admin endpoint sampling the event loop for ?seconds=N, returning collapsed stacks for flame graphs"""
+        denied = self.admin_denied(request)
+        if denied is not None:
+            return denied
+        try:
+            seconds = float(request.query.get('seconds', '10'))
+            interval = float(request.query.get('interval_ms', '10')) / 1000
+            if not 0 < seconds <= self.config.PROFILE_MAX_SECONDS:
+                raise ValueError(f"seconds must be between 0 and {self.config.PROFILE_MAX_SECONDS:g}")
+            if not 0.001 <= interval <= 1:
+                raise ValueError("interval_ms must be between 1 and 1000")
+        except ValueError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        if self._profiling:
+            return web.json_response({'success': False, 'error': 'A profile is already running'}, status=409)
+        
+        self._profiling = True
+        try:
+            profiler = await profile_loop(seconds, interval)
+        finally:
+            self._profiling = False
+        return web.Response(text=profiler.collapsed(), content_type='text/plain',
+                            headers={'X-Profile-Samples': str(profiler.samples)})
+    
+    async def get_alerts(self, request):
+        """API endpoint to get webhook alert delivery status"""
+        if self.alerts is None:
+            return web.json_response({'success': True, 'enabled': False})
+        return web.json_response({'success': True, 'enabled': True, **self.alerts.describe()})
+    
+    async def get_flow(self, request):
+        """API endpoint to get flow control state: batch sizing, load shedding and publish pacing"""
+        return web.json_response({'success': True, **self.flow.describe()})
+    
+    async def get_customer_features(self, request):
+        """API endpoint to inspect one customer's behavioural features"""
+        customer_id = request.match_info['customer_id']
+        if isinstance(self.pipeline, WorkerPool) and not self.clustered(request):
+            return web.json_response({'success': False, 'error': 'Customer features are kept in the ingestion '
+                                      'worker processes and are not served when INGESTION_WORKERS > 0'}, status=404)
+        features = self.customer_features.describe(customer_id, self.rules.plan.velocity_window)
+        if features is None and self.clustered(request):
+            # Each customer's history lives on the node that owns its partition
+            responses, _ = await self.cluster.gather(f"/api/customers/{quote(customer_id, safe='')}", {})
+            features = next((response['features'] for response in responses), None)
+        if features is None:
+            return web.json_response({'success': False, 'error': f"No recent activity for {customer_id}"}, status=404)
+        return web.json_response({'success': True, 'features': features})
+    
+    async def get_history(self, request):
+        """API endpoint to query archived transactions in a time range, beyond the live store"""
+        if self.archive is None:
+            return web.json_response({'success': False, 'error': 'Archive is not enabled (set ARCHIVE_DIR)'},
+                                     status=404)
+        try:
+            query = self.parse_query(request)
+            end = parse_time(request.query.get('end'), default=time.time())
+            start = parse_time(request.query.get('start'), default=end - 3600)
+            if start > end:
+                raise ValueError("start must not be after end")
+            max_seconds = self.config.ARCHIVE_MAX_QUERY_HOURS * 3600
+            if end - start > max_seconds:
+                raise ValueError(f"range is {(end - start) / 3600:.1f} hours; at most "
+                                 f"{self.config.ARCHIVE_MAX_QUERY_HOURS:g} hours can be queried at once")
+        except ValueError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        
+        try:
+            # Decoding a long range takes a while, so it runs off the event loop
+            entries = self.archive.scan(start, end)
+            page = await asyncio.get_running_loop().run_in_executor(None, query.execute, entries)
+            extra = {}
+            if self.clustered(request):
+                # Pin the range so every node answers for the same window
+                page, unreachable = await self.cluster_page(request, query, page, '/api/history',
+                                                            start=repr(start), end=repr(end))
+                extra['cluster'] = self.cluster_info(unreachable)
+        
+            return compressed_response(request, json_body({
+                'success': True,
+                'total': len(page['transactions']),
+                'matched': page['summary']['total_transactions'],
+                'summary': page['summary'],
+                'next_cursor': page['next_cursor'],
+                'start': datetime.fromtimestamp(start).isoformat(),
+                'end': datetime.fromtimestamp(end).isoformat(),
+                **extra,
+                'timestamp': datetime.now().isoformat()
+            }, rows_field='transactions', rows_json=dumps(page['transactions'])))
+        
+        except Exception as e:
+            logger.error(f"Error querying history: {e}")
+            return web.json_response({'success': False, 'error': str(e)}, status=500)
+    
     async def search_transactions(self, request):
-        """API endpoint to search transactions"""
+        """API endpoint to search transactions, best matches first"""
         try:
-            query = request.query.get('q', '')
-            return web.json_response({'success': True, 'results': []})
+            query = self.parse_query(request, default_sort='relevance')
+        except ValueError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=400)
+        
+        clustered = self.clustered(request)
+        variant = request.query_string + (self.cluster.signature() if clustered else '')
+        etag = make_etag(self.store.version, variant)
+        cached = current_etag(request, etag)
+        if cached:
+            return not_modified(cached)
+        
+        try:
+            extra = {}
+            if clustered:
+                page, unreachable = await self.cluster_page(request, query)
+                rows_json = dumps(page['transactions'])
+                extra['cluster'] = self.cluster_info(unreachable)
+            else:
+                page = query.execute(self.index.lookup(query, self.store))
+                rows_json = self.row_json.encode_rows(page['transactions'])
+            return compressed_response(request, json_body({
+                'success': True,
+                'query': query.search,
+                'matched': page['summary']['total_transactions'],
+                'next_cursor': page['next_cursor'],
+                **extra
+            }, rows_field='results', rows_json=rows_json), etag=etag)
         except Exception as e:
             logger.error(f"Error searching transactions: {e}")
             return web.json_response({
@@ -589,7 +1408,7 @@ class RealLiveDashboard:
         ws = web.WebSocketResponse()
         await ws.prepare(request)
         
-        self.websockets.add(ws)
+        self.broadcaster.register(ws)
         
         try:
             async for msg in ws:
@@ -599,7 +1418,7 @@ class RealLiveDashboard:
                 elif msg.type == WSMsgType.ERROR:
                     logger.error('WebSocket error: %s' % ws.exception())
         finally:
-            self.websockets.discard(ws)
+            await self.broadcaster.unregister(ws)
         
         return ws
     
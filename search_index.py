@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Search Index
+Trigram inverted index for substring search over transaction text fields
+"""
+
+from typing import Dict, Any, List, Set, Tuple
+
+# Fields searched by the free-text box and /api/search
+SEARCH_FIELDS = ('transaction_id', 'merchant', 'category', 'customer_id')
+
+_EMPTY: Set[str] = frozenset()
+
+
+def trigrams(term: str) -> Set[str]:
+    """Get the distinct three-character substrings of a term"""
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+class SearchIndex:
+    """Store listener mapping trigrams to terms and terms to transaction ids.
+
+    Terms are the lowercased field values, so merchants, categories and
+    customers shared by many rows are indexed once and only the term's id
+    set grows. A needle of three or more characters intersects the posting
+    lists of its trigrams (smallest first) and verifies the surviving terms
+    with a plain substring check; shorter needles scan the term vocabulary,
+    which is still far smaller than the rows for every field but the id.
+    """
+
+    def __init__(self, fields: Tuple[str, ...] = SEARCH_FIELDS):
+        self.fields = fields
+        self.terms: Dict[str, Set[str]] = {}
+        self.grams: Dict[str, Set[str]] = {}
+
+    def _terms(self, tx: Dict[str, Any]) -> Set[str]:
+        terms = {str(tx.get(field) or '').lower() for field in self.fields}
+        terms.discard('')
+        return terms
+
+    def on_insert(self, tx: Dict[str, Any]):
+        tx_id = tx.get('transaction_id')
+        for term in self._terms(tx):
+            ids = self.terms.get(term)
+            if ids is None:
+                ids = self.terms[term] = set()
+                for gram in trigrams(term):
+                    terms = self.grams.get(gram)
+                    if terms is None:
+                        terms = self.grams[gram] = set()
+                    terms.add(term)
+            ids.add(tx_id)
+
+    def on_evict(self, tx: Dict[str, Any]):
+        tx_id = tx.get('transaction_id')
+        for term in self._terms(tx):
+            ids = self.terms.get(term)
+            if ids is None:
+                continue
+            ids.discard(tx_id)
+            if ids:
+                continue
+            del self.terms[term]
+            for gram in trigrams(term):
+                terms = self.grams.get(gram)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self.grams[gram]
+
+    def matching_terms(self, needle: str) -> List[str]:
+        """Get indexed terms containing a lowercased needle"""
+        if len(needle) < 3:
+            return [term for term in self.terms if needle in term]
+        postings = sorted((self.grams.get(gram, _EMPTY) for gram in trigrams(needle)), key=len)
+        candidates = postings[0].intersection(*postings[1:]) if postings[0] else _EMPTY
+        # Sharing every trigram does not imply containment ("abcab" vs "bcabc"), so verify
+        return [term for term in candidates if needle in term]
+
+    def candidate_ids(self, needle: str) -> Set[str]:
+        """Get ids of rows with a searched field containing a lowercased needle"""
+        terms = self.matching_terms(needle)
+        if len(terms) == 1:
+            return self.terms[terms[0]]
+        return set().union(*(self.terms[term] for term in terms))
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Streaming Sketches
+Mergeable approximate summaries: heavy hitters, distinct counts and quantiles
+"""
+
+import hashlib
+import math
+import random
+import time
+from typing import Dict, Any, List, Optional
+
+from transaction_store import parse_timestamp
+from windowed_metrics import WINDOWS
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def hash64(value: Any) -> int:
+    """Stable 64-bit hash, identical in every process so sketches can be merged"""
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """Distinct counter in 2**precision one-byte registers (about 1.6% error at 12)"""
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: Any):
+        h = hash64(value)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError('cannot merge HyperLogLogs of different precision')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'precision': self.precision, 'registers': self.registers.hex()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HyperLogLog':
+        sketch = cls(data['precision'])
+        sketch.registers = bytearray.fromhex(data['registers'])
+        return sketch
+
+
+class KLLSketch:
+    """KLL quantile sketch: a stack of compactors whose capacities shrink geometrically.
+
+    Level h items each stand for 2**h stream items. A full level is sorted
+    and every other item (random offset) is promoted, so memory stays near
+    3k values while rank error stays around 1.7/k.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.levels: List[List[float]] = [[]]
+        self.count = 0
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def add(self, value: float):
+        self.levels[0].append(value)
+        self.count += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self):
+        for level in range(len(self.levels)):
+            if len(self.levels[level]) < self._capacity(level):
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            items = sorted(self.levels[level])
+            odd = len(items) % 2
+            offset = self._rng.random() < 0.5
+            self.levels[level] = items[:odd]
+            self.levels[level + 1].extend(items[odd + offset::2])
+            if self._size() < self._max_size():
+                break
+
+    def merge(self, other: 'KLLSketch'):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.count += other.count
+        while self._size() >= self._max_size():
+            before = self._size()
+            self._compress()
+            if self._size() == before:
+                break
+
+    def quantiles(self, fractions=QUANTILES) -> Dict[str, Optional[float]]:
+        """Estimate quantiles, keyed 'p50', 'p95', ..."""
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.levels) for value in items)
+        total = sum(weight for _, weight in weighted)
+        result = {}
+        for fraction in fractions:
+            name = f"p{fraction * 100:g}"
+            if not weighted:
+                result[name] = None
+                continue
+            target = fraction * total
+            cumulative = 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            result[name] = value
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'k': self.k, 'count': self.count, 'levels': self.levels}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'KLLSketch':
+        sketch = cls(data['k'])
+        sketch.levels = [list(items) for items in data['levels']] or [[]]
+        sketch.count = data['count']
+        return sketch
+
+
+class SpaceSaving:
+    """Weighted top-k heavy hitters in ``capacity`` counters.
+
+    A new item takes over the smallest counter and inherits its count as
+    an overestimate bound, so any item whose true weight exceeds
+    total/capacity is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.counts: Dict[str, float] = {}
+        self.errors: Dict[str, float] = {}
+
+    def add(self, item: str, weight: float = 1.0):
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0.0
+        else:
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[item] = floor + weight
+            self.errors[item] = floor
+
+    def _floor(self) -> float:
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0.0
+
+    def merge(self, other: 'SpaceSaving'):
+        """Combine two summaries; an item missing from a full side may hide up to its floor"""
+        floor, other_floor = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for item in set(self.counts) | set(other.counts):
+            counts[item] = self.counts.get(item, floor) + other.counts.get(item, other_floor)
+            errors[item] = self.errors.get(item, floor) + other.errors.get(item, other_floor)
+        keep = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+        self.counts = {item: counts[item] for item in keep}
+        self.errors = {item: errors[item] for item in keep}
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [{'item': item, 'estimate': round(count, 2), 'max_error': round(self.errors[item], 2)}
+                for item, count in ranked]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'capacity': self.capacity, 'counts': self.counts, 'errors': self.errors}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SpaceSaving':
+        sketch = cls(data['capacity'])
+        sketch.counts = dict(data['counts'])
+        sketch.errors = dict(data['errors'])
+        return sketch
+
+
+class SketchBucket:
+    """The sketches for one time bucket"""
+
+    def __init__(self, start: int):
+        self.start = start
+        self.customers = HyperLogLog()
+        self.amounts = KLLSketch()
+        self.flagged_merchants = SpaceSaving()
+
+    def merge(self, other: 'SketchBucket'):
+        self.customers.merge(other.customers)
+        self.amounts.merge(other.amounts)
+        self.flagged_merchants.merge(other.flagged_merchants)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'start': self.start,
+            'customers': self.customers.to_dict(),
+            'amounts': self.amounts.to_dict(),
+            'flagged_merchants': self.flagged_merchants.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SketchBucket':
+        bucket = cls(data['start'])
+        bucket.customers = HyperLogLog.from_dict(data['customers'])
+        bucket.amounts = KLLSketch.from_dict(data['amounts'])
+        bucket.flagged_merchants = SpaceSaving.from_dict(data['flagged_merchants'])
+        return bucket
+
+
+def describe(bucket: SketchBucket, window_seconds: int, top: int = 10) -> Dict[str, Any]:
+    """Get the dashboard view of a (usually merged) bucket"""
+    return {
+        'window_seconds': window_seconds,
+        'transactions': bucket.amounts.count,
+        'distinct_customers': bucket.customers.count(),
+        'amount_quantiles': bucket.amounts.quantiles(),
+        'top_flagged_merchants': bucket.flagged_merchants.top(top)
+    }
+
+
+class StreamSketches:
+    """Store listener feeding per-minute sketch buckets in a fixed ring.
+
+    Each new transaction updates the bucket of its own timestamp: distinct
+    customers (HyperLogLog), amount quantiles (KLL) and merchants by flagged
+    amount (Space-Saving). A window query merges the buckets it covers, and
+    buckets serialize with to_dict() so other workers' sketches can be
+    merged in the same way. Sketches cannot retract, so re-delivered and
+    evicted rows are not subtracted; a re-delivery is not counted again.
+    """
+
+    def __init__(self, bucket_seconds: int = 60, capacity_seconds: int = max(WINDOWS.values())):
+        self.bucket_seconds = bucket_seconds
+        self.capacity_seconds = capacity_seconds
+        self.buckets: List[Optional[SketchBucket]] = [None] * max(1, capacity_seconds // bucket_seconds)
+
+    def _bucket(self, timestamp: float) -> Optional[SketchBucket]:
+        start = int(timestamp) - int(timestamp) % self.bucket_seconds
+        slot = (start // self.bucket_seconds) % len(self.buckets)
+        bucket = self.buckets[slot]
+        if bucket is None or bucket.start < start:
+            bucket = self.buckets[slot] = SketchBucket(start)
+        elif bucket.start > start:
+            return None  # older than the ring covers
+        return bucket
+
+    def on_insert(self, tx: Dict[str, Any]):
+        bucket = self._bucket(parse_timestamp(tx.get('timestamp')))
+        if bucket is None:
+            return
+        amount = float(tx.get('amount', 0) or 0)
+        customer_id = tx.get('customer_id')
+        if customer_id is not None:
+            bucket.customers.add(customer_id)
+        bucket.amounts.add(amount)
+        if tx.get('is_fraud', False) or tx.get('risk_level') == 'HIGH':
+            bucket.flagged_merchants.add(str(tx.get('merchant', '')), amount)
+
+    def on_replace(self, old: Dict[str, Any], new: Dict[str, Any]):
+        """Re-delivered rows were already counted"""
+
+    def on_evict(self, tx: Dict[str, Any]):
+        """Sketches age out with their bucket, not with the store"""
+
+    def merged(self, window_seconds: int, now: Optional[float] = None) -> SketchBucket:
+        """Merge the buckets overlapping the last ``window_seconds`` into one"""
+        now = now if now is not None else time.time()
+        merged = SketchBucket(int(now - window_seconds))
+        for bucket in self.buckets:
+            if bucket is not None and bucket.start + self.bucket_seconds > now - window_seconds:
+                merged.merge(bucket)
+        return merged
+
+    def summary(self, window_seconds: int, now: Optional[float] = None, top: int = 10) -> Dict[str, Any]:
+        """Get the dashboard view of one window"""
+        return describe(self.merged(window_seconds, now), window_seconds, top)
+
+    def state(self) -> List[Dict[str, Any]]:
+        """Serialize every live bucket, e.g. for merging on another node"""
+        return [bucket.to_dict() for bucket in self.buckets if bucket is not None]
+
+    def merge_state(self, state: List[Dict[str, Any]]):
+        """Fold buckets serialized by another worker into this ring"""
+        for data in state:
+            incoming = SketchBucket.from_dict(data)
+            bucket = self._bucket(incoming.start)
+            if bucket is not None:
+                bucket.merge(incoming)
@@ -0,0 +1,172 @@
+import asyncio
+import os
+
+from alert_dispatcher import AlertDispatcher
+from fake_webhook_server import FakeWebhookServer
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def high(i):
+    return {'transaction_id': f'TX{i}', 'risk_level': 'HIGH', 'amount': 5000.0}
+
+
+def delivered_ids(server):
+    return sorted(alert['transaction']['transaction_id'] for batch in server.batches for alert in batch['alerts'])
+
+
+async def wait_for(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('condition not reached')
+
+
+async def stop(dispatcher, task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    dispatcher.close()
+
+
+def dispatcher_for(url, tmp_path, **options):
+    options.setdefault('concurrency', 2)
+    options.setdefault('min_retry_delay', 0.05)
+    options.setdefault('max_retry_delay', 0.2)
+    return AlertDispatcher(url, spill_path=str(tmp_path / 'spill.jsonl'), **options)
+
+
+def test_full_batches_go_at_once_and_the_rest_after_max_latency(tmp_path):
+    async def scenario():
+        server = FakeWebhookServer()
+        dispatcher = dispatcher_for(await server.start(), tmp_path, batch_size=5, max_latency=0.3)
+        task = asyncio.create_task(dispatcher.run())
+        for i in range(12):
+            dispatcher.submit(high(i))
+        await wait_for(lambda: len(server.batches) == 2)
+        full = sorted(batch['count'] for batch in server.batches)
+        await asyncio.sleep(0.1)
+        before_latency = len(server.batches)
+        await wait_for(lambda: len(server.batches) == 3)
+        await stop(dispatcher, task)
+        await server.stop()
+        return full, before_latency, [batch['count'] for batch in server.batches][-1], delivered_ids(server)
+
+    full, before_latency, last, ids = run(scenario())
+    assert full == [5, 5]
+    assert before_latency == 2
+    assert last == 2
+    assert ids == sorted(f'TX{i}' for i in range(12))
+
+
+def test_listener_alerts_only_when_a_row_becomes_high(tmp_path):
+    dispatcher = dispatcher_for('http://unused', tmp_path)
+    dispatcher.on_insert({'transaction_id': 'A', 'risk_level': 'LOW'})
+    dispatcher.on_insert(high(1))
+    dispatcher.on_replace(high(1), high(1))
+    dispatcher.on_replace({'transaction_id': 'B', 'risk_level': 'MEDIUM'}, {'transaction_id': 'B', 'risk_level': 'HIGH'})
+
+    assert [alert['transaction']['transaction_id'] for alert in dispatcher.pending] == ['TX1', 'B']
+    dispatcher.close()
+
+
+def test_failed_batches_are_retried_with_backoff_until_delivered(tmp_path):
+    async def scenario():
+        server = FakeWebhookServer(fail_rate=1.0, fail_status=503)
+        dispatcher = dispatcher_for(await server.start(), tmp_path, batch_size=5, max_latency=0.01,
+                                    min_retry_delay=0.1, max_retry_delay=0.4, concurrency=4)
+        task = asyncio.create_task(dispatcher.run())
+        for i in range(20):
+            dispatcher.submit(high(i))
+        await asyncio.sleep(0.6)
+        # Backing off 0.1 + 0.2 + 0.4s: one probe per step, not one per sender
+        outage_requests = server.requests
+        backing_off = dispatcher.describe()
+        server.fail_rate = 0.0
+        await wait_for(lambda: dispatcher.sent == 20)
+        await stop(dispatcher, task)
+        await server.stop()
+        return outage_requests, backing_off, delivered_ids(server), dispatcher.describe()
+
+    outage_requests, backing_off, ids, after = run(scenario())
+    assert outage_requests <= 7
+    assert backing_off['retry_delay'] > 0 and backing_off['last_error'] == 'HTTP 503'
+    assert backing_off['pending'] + backing_off['retrying'] == 20
+    assert ids == sorted(f'TX{i}' for i in range(20))
+    assert after['retry_delay'] == 0.0 and after['rejected'] == 0
+
+
+def test_rejected_batches_are_dropped_but_408_and_429_are_retried(tmp_path):
+    async def scenario(status):
+        server = FakeWebhookServer(fail_rate=1.0, fail_status=status)
+        dispatcher = dispatcher_for(await server.start(), tmp_path, batch_size=5, max_latency=0.01)
+        task = asyncio.create_task(dispatcher.run())
+        for i in range(5):
+            dispatcher.submit(high(i))
+        await asyncio.sleep(0.3)
+        await stop(dispatcher, task)
+        await server.stop()
+        return server.requests, dispatcher.describe()
+
+    requests, state = run(scenario(400))
+    assert requests == 1
+    assert (state['rejected'], state['failures'], state['sent']) == (5, 0, 0)
+
+    for status in (408, 429):
+        requests, state = run(scenario(status))
+        assert requests > 1
+        assert state['rejected'] == 0 and state['failures'] == requests
+
+
+def test_alerts_past_max_pending_spill_and_replay_once_the_webhook_recovers(tmp_path):
+    async def scenario():
+        server = FakeWebhookServer(fail_rate=1.0)
+        dispatcher = dispatcher_for(await server.start(), tmp_path, batch_size=5, max_latency=0.01, max_pending=10)
+        task = asyncio.create_task(dispatcher.run())
+        for i in range(40):
+            dispatcher.submit(high(i))
+        await asyncio.sleep(0.2)
+        during = dispatcher.describe()
+        spill_exists = os.path.exists(dispatcher.spill_path)
+        server.fail_rate = 0.0
+        await wait_for(lambda: dispatcher.sent == 40)
+        await stop(dispatcher, task)
+        await server.stop()
+        leftovers = [os.path.exists(path) for path in (dispatcher.spill_path, dispatcher.replay_path)]
+        return during, spill_exists, delivered_ids(server), leftovers
+
+    during, spill_exists, ids, leftovers = run(scenario())
+    assert during['pending'] + during['retrying'] <= 10
+    assert during['spilled'] >= 30
+    assert spill_exists
+    assert ids == sorted(f'TX{i}' for i in range(40))
+    assert leftovers == [False, False]
+
+
+def test_undelivered_alerts_are_spilled_on_close_and_sent_after_a_restart(tmp_path):
+    async def scenario():
+        server = FakeWebhookServer(fail_rate=1.0)
+        url = await server.start()
+        dispatcher = dispatcher_for(url, tmp_path, batch_size=5, max_latency=0.01)
+        task = asyncio.create_task(dispatcher.run())
+        for i in range(12):
+            dispatcher.submit(high(i))
+        await asyncio.sleep(0.1)
+        await stop(dispatcher, task)
+        with open(dispatcher.spill_path) as f:
+            spilled_lines = sum(1 for line in f if line.strip())
+
+        server.fail_rate = 0.0
+        restarted = dispatcher_for(url, tmp_path, batch_size=5, max_latency=0.01)
+        task = asyncio.create_task(restarted.run())
+        await wait_for(lambda: restarted.sent == 12)
+        await stop(restarted, task)
+        await server.stop()
+        return spilled_lines, delivered_ids(server), os.path.exists(restarted.spill_path)
+
+    spilled_lines, ids, spill_left = run(scenario())
+    assert spilled_lines >= 3
+    assert ids == sorted(f'TX{i}' for i in range(12))
+    assert not spill_left
@@ -0,0 +1,110 @@
+import pytest
+
+from flow_control import FlowController
+
+
+def scored(count, level='LOW', start=0):
+    return [{'transaction_id': f'TX{i}', 'risk_level': level, 'amount': 10.0} for i in range(start, start + count)]
+
+
+def overload(flow, updates):
+    for _ in range(updates):
+        flow.update(queue_fill=0.9, loop_lag=0.0)
+
+
+def recover(flow, updates):
+    for _ in range(updates):
+        flow.update(queue_fill=0.1, loop_lag=0.0)
+
+
+def test_batch_size_follows_the_measured_per_row_cost():
+    flow = FlowController(target_seconds=0.005, initial_batch=100, min_batch=20, max_batch=2000)
+
+    flow.observe('score', 0.001, 100)   # 10us per row
+    flow.observe('store', 0.0015, 100)  # 15us per row
+    assert flow.batch_size == 200
+
+    flow.observe('store', 1.0, 100)
+    assert flow.batch_size == 20
+    for _ in range(50):
+        flow.observe('score', 1e-7, 1000)
+        flow.observe('store', 1e-7, 1000)
+    assert flow.batch_size == 2000
+    assert [len(chunk) for chunk in flow.chunks(scored(4500))] == [2000, 2000, 500]
+
+
+def test_overload_sheds_progressively_and_recovers_the_same_way():
+    flow = FlowController(shed_policy='sample_low', max_shed=16, max_publish_interval=0.5)
+
+    overload(flow, 1)
+    assert flow.overloaded and flow.overload_episodes == 1
+    assert (flow.keep_every, flow.publish_interval) == (2, 0.05)
+    overload(flow, 10)
+    assert (flow.keep_every, flow.publish_interval) == (16, 0.5)
+
+    # Between the watermarks the state holds
+    flow.update(queue_fill=0.5, loop_lag=0.0)
+    assert flow.overloaded and flow.keep_every == 16
+
+    recover(flow, 1)
+    assert not flow.overloaded and flow.keep_every == 8
+    recover(flow, 10)
+    assert (flow.keep_every, flow.publish_interval) == (1, 0.0)
+    assert flow.overload_episodes == 1
+
+
+def test_event_loop_lag_alone_is_an_overload():
+    flow = FlowController(max_loop_lag=0.2)
+    flow.update(queue_fill=0.0, loop_lag=0.3)
+    assert flow.overloaded
+    # Recovery needs the lag below half the limit
+    flow.update(queue_fill=0.0, loop_lag=0.15)
+    assert flow.overloaded
+    flow.update(queue_fill=0.0, loop_lag=0.05)
+    assert not flow.overloaded
+
+
+def test_admit_keeps_protected_levels_and_known_rows():
+    flow = FlowController(shed_policy='sample_low')
+    overload(flow, 3)
+    assert flow.keep_every == 8
+    batch = scored(800) + scored(50, 'MEDIUM', 1000) + scored(50, 'HIGH', 2000) + scored(10, 'LOW', 5000)
+    known = {f'TX{i}' for i in range(5000, 5010)}
+
+    kept, shed = flow.admit(batch, known.__contains__)
+
+    kept_ids = {tx['transaction_id'] for tx in kept}
+    assert {tx['transaction_id'] for tx in batch if tx['risk_level'] != 'LOW'} <= kept_ids
+    assert known <= kept_ids
+    assert all(tx['risk_level'] == 'LOW' for tx in shed)
+    assert 60 <= len(kept) - 110 <= 140  # about 1 in 8 of the 800 unprotected rows
+    assert flow.shed_rows['LOW'] == len(shed) and flow.shed_amount == 10.0 * len(shed)
+    # Sampling is by id, so the same rows are kept every time
+    again, _ = flow.admit(batch, known.__contains__)
+    assert again == kept
+
+
+def test_rows_are_admitted_unsampled_once_recovered():
+    flow = FlowController(shed_policy='sample_low_medium')
+    overload(flow, 2)
+    _, shed = flow.admit(scored(100, 'MEDIUM'), lambda tx_id: False)
+    assert shed
+
+    recover(flow, 3)
+    batch = scored(100, 'MEDIUM')
+    assert flow.admit(batch, lambda tx_id: False) == (batch, [])
+
+
+def test_policy_none_never_sheds_but_still_paces_publishing():
+    flow = FlowController(shed_policy='none', max_publish_interval=0.2)
+    overload(flow, 5)
+
+    batch = scored(100)
+    assert flow.admit(batch, lambda tx_id: False) == (batch, [])
+    assert flow.publish_interval == 0.2
+    assert flow.should_publish(100.0)
+    assert not flow.should_publish(100.1)
+    assert flow.should_publish(100.25)
+    assert flow.deferred_publishes == 1
+    with pytest.raises(ValueError, match='Unknown shed policy'):
+        FlowController(shed_policy='drop_everything')
@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+from config import Config
+from fraud_rules import RuleEngine, compile_rules
+
+
+def write_rules(path, overrides, mtime):
+    path.write_text(json.dumps(overrides) if isinstance(overrides, dict) else overrides)
+    # Distinct mtimes, as a reload is only triggered by a change
+    os.utime(path, (mtime, mtime))
+
+
+def test_amount_tiers_are_sorted_and_typed_thresholds_replace_the_lowest_tier():
+    rules = {**Config.FRAUD_RULES, 'amount_tiers': [[5000, 0.4], [1000, 0.1], [2000, 0.2]]}
+    plan = compile_rules(rules, {'high_amount_cc': 1500, 'high_amount_pp': 3000})
+
+    assert plan.default_cutpoints == (1000.0, 2000.0, 5000.0)
+    assert plan.amount_cutpoints['credit_card'] == (1500.0, 2000.0, 5000.0)
+    # Higher tiers never start below the type's own threshold
+    assert plan.amount_cutpoints['paypal'] == (3000.0, 3000.0, 5000.0)
+    assert plan.score({'transaction_type': 'paypal', 'amount': 2500, 'status': 'approved'}) == 0.0
+    assert plan.score({'transaction_type': 'paypal', 'amount': 3500, 'status': 'approved'}) == 0.2
+    assert plan.score({'transaction_type': 'crypto', 'amount': 1500, 'status': 'approved'}) == 0.1
+
+
+@pytest.mark.parametrize('rules, thresholds, message', [
+    ({'amount_tiers': []}, {}, 'at least one tier'),
+    ({'amount_tiers': [[1000, 0.1]], 'type_amount_thresholds': {'credit_card': 'missing'}}, {},
+     "Unknown threshold 'missing'"),
+])
+def test_invalid_rules_are_rejected(rules, thresholds, message):
+    with pytest.raises(ValueError, match=message):
+        compile_rules(rules, thresholds)
+
+
+def test_categories_and_statuses_use_the_configured_weights():
+    plan = compile_rules(dict(Config.FRAUD_RULES), dict(Config.FRAUD_THRESHOLDS))
+
+    assert plan.score({'category': 'Electronics', 'status': 'approved', 'amount': 10}) == 0.2
+    assert plan.score({'category': 'grocery', 'status': 'pending', 'amount': 10}) == 0.3
+    assert plan.score({'category': 'travel', 'status': 'failed', 'amount': 10 ** 6}) == pytest.approx(0.9)
+    assert plan.risk_level(0.3) == 'LOW' and plan.risk_level(0.31) == 'MEDIUM' and plan.risk_level(0.71) == 'HIGH'
+
+
+def test_engine_reloads_a_changed_rules_file(tmp_path):
+    path = tmp_path / 'rules.json'
+    write_rules(path, {'rules': {'high_risk_categories': ['grocery']}}, 1000)
+    engine = RuleEngine(Config, rules_file=str(path))
+    grocery = {'category': 'grocery', 'status': 'approved', 'amount': 10}
+
+    assert engine.plan.version == 2
+    assert engine.score(grocery) == 0.2
+    assert engine.maybe_reload() is False
+
+    write_rules(path, {'rules': {'high_risk_category_weight': 0.5, 'high_risk_categories': ['grocery']},
+                       'thresholds': {'high_amount_cc': 1}}, 2000)
+    assert engine.maybe_reload() is True
+    assert engine.plan.version == 3
+    assert engine.score(grocery) == 0.5
+    assert engine.score({**grocery, 'transaction_type': 'credit_card'}) == 0.6
+    # Config itself is untouched by the overrides
+    assert Config.FRAUD_RULES['high_risk_categories'] == ['electronics', 'jewelry', 'travel', 'gaming']
+
+
+@pytest.mark.parametrize('contents', [
+    '{not json',
+    {'rules': {'amount_tiers': []}},
+    {'rules': {'type_amount_thresholds': {'paypal': 'nope'}}},
+    {'rules': {'amount_tiers': [['x', 0.1]]}},
+])
+def test_engine_keeps_the_previous_plan_when_the_file_is_invalid(tmp_path, contents):
+    path = tmp_path / 'rules.json'
+    write_rules(path, {'rules': {'high_risk_categories': ['grocery']}}, 1000)
+    engine = RuleEngine(Config, rules_file=str(path))
+    plan = engine.plan
+
+    write_rules(path, contents, 2000)
+    assert engine.maybe_reload() is False
+    assert engine.plan is plan
+
+
+def test_engine_without_a_rules_file_uses_the_config(tmp_path):
+    engine = RuleEngine(Config, rules_file='')
+    assert engine.plan.version == 1
+    assert engine.maybe_reload() is False
+    assert RuleEngine(Config, rules_file=str(tmp_path / 'missing.json')).plan.version == 1
@@ -0,0 +1,129 @@
+import random
+
+import pytest
+
+import fraud_scoring
+from config import Config
+from customer_features import CustomerFeatureStore
+from fraud_rules import RISK_LEVEL_NAMES, compile_rules
+from fraud_scoring import BatchScorer
+
+BACKENDS = ['numpy', 'python']
+
+
+def edge_transactions(count=2000, seed=7):
+    """Random rows plus amounts on every cut-point and odd or missing fields"""
+    plan = compile_rules(dict(Config.FRAUD_RULES), dict(Config.FRAUD_THRESHOLDS))
+    cuts = sorted({cut for cuts in plan.amount_cutpoints.values() for cut in cuts} | set(plan.default_cutpoints))
+    amounts = [0, 0.0, -5.0] + [value for cut in cuts for value in (cut - 0.01, cut, cut + 0.01)]
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'transaction_id': f'TX{i}',
+            'transaction_type': rng.choice(['credit_card', 'paypal', 'crypto', None]),
+            'category': rng.choice(['electronics', 'Electronics', 'TRAVEL', 'grocery', '', None, 42]),
+            'status': rng.choice(['approved', 'completed', 'pending', 'failed', None]),
+            'amount': rng.choice(amounts) if i % 3 else round(rng.lognormvariate(6.5, 1.5), 2)
+        })
+    rows.append({'transaction_id': 'bare'})
+    return rows
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(fraud_scoring, 'np', None)
+    elif fraud_scoring.np is None:
+        pytest.skip('numpy is not installed')
+    return request.param
+
+
+def test_batch_scores_equal_the_scalar_plan(backend):
+    plan = compile_rules(dict(Config.FRAUD_RULES), dict(Config.FRAUD_THRESHOLDS))
+    transactions = edge_transactions()
+    scorer = BatchScorer(plan)
+
+    scores, levels = scorer.score_batch(*scorer.encode_columns(transactions))
+
+    expected = [plan.score(tx) for tx in transactions]
+    assert list(scores) == expected
+    assert [RISK_LEVEL_NAMES[level] for level in levels] == [plan.risk_level(score) for score in expected]
+
+
+def test_score_transactions_labels_rows_in_place(backend):
+    plan = compile_rules(dict(Config.FRAUD_RULES), dict(Config.FRAUD_THRESHOLDS))
+    transactions = edge_transactions(200)
+
+    scored = BatchScorer(plan).score_transactions(transactions)
+
+    assert [tx['transaction_id'] for tx in scored] == [tx['transaction_id'] for tx in transactions]
+    for tx in scored:
+        assert type(tx['fraud_risk_score']) is float
+        assert tx['fraud_risk_score'] == plan.score(tx)
+        assert tx['risk_level'] == plan.risk_level(tx['fraud_risk_score'])
+
+
+def test_new_plans_rebuild_the_tables_for_codes_already_seen(backend):
+    rules = dict(Config.FRAUD_RULES)
+    plan = compile_rules(rules, dict(Config.FRAUD_THRESHOLDS))
+    transactions = edge_transactions(500)
+    scorer = BatchScorer(plan)
+    columns = scorer.encode_columns(transactions)
+
+    stricter = compile_rules({**rules, 'high_risk_categories': ['grocery'], 'amount_tiers': [[10.0, 0.5]]},
+                             dict(Config.FRAUD_THRESHOLDS), version=2)
+    scorer.set_plan(stricter)
+    scores, _ = scorer.score_batch(*columns)
+
+    assert list(scores) == [stricter.score(tx) for tx in transactions]
+
+
+def customer_stream(count=3000, seed=3):
+    """A few customers with bursts and outlier amounts, so velocity and z-score rules fire"""
+    rng = random.Random(seed)
+    return [{
+        'transaction_id': f'TX{i}',
+        'customer_id': f'C{rng.randint(1, 20)}',
+        'transaction_type': rng.choice(['credit_card', 'paypal']),
+        'category': rng.choice(['electronics', 'grocery']),
+        'status': rng.choice(['approved', 'pending']),
+        'amount': rng.choice([20.0, 25.0, 30.0, 4000.0]),
+        'timestamp': 1_700_000_000 + i * rng.choice([1, 60])
+    } for i in range(count)]
+
+
+def test_scalar_scores_apply_customer_features_like_the_batch(backend):
+    plan = compile_rules(dict(Config.FRAUD_RULES), dict(Config.FRAUD_THRESHOLDS))
+    transactions = customer_stream()
+
+    scalar = BatchScorer(plan, CustomerFeatureStore())
+    scalar_scores = [scalar.score_one(tx) for tx in transactions]
+    batch = BatchScorer(plan, CustomerFeatureStore()).score_transactions([dict(tx) for tx in transactions])
+
+    assert [tx['fraud_risk_score'] for tx in batch] == scalar_scores
+    # The features do change scores, so the comparison covers them
+    assert sum(score != plan.score(tx) for tx, score in zip(transactions, scalar_scores)) > 50
+
+
+def test_known_rows_are_scored_without_counting_again():
+    plan = compile_rules(dict(Config.FRAUD_RULES), dict(Config.FRAUD_THRESHOLDS))
+    scorer = BatchScorer(plan, CustomerFeatureStore())
+    tx = {'transaction_id': 'TX1', 'customer_id': 'C1', 'amount': 10.0, 'timestamp': 1_700_000_000}
+
+    scorer.score_one(tx)
+    scorer.score_one(tx, known=lambda tx_id: True)
+
+    assert scorer.features.describe('C1', 3600)['transactions_seen'] == 1
+
+
+def test_dashboard_scalar_score_matches_its_batch_scoring():
+    from real_live_dashboard import RealLiveDashboard
+
+    transactions = customer_stream(500)
+    scalar = RealLiveDashboard()
+    batch = RealLiveDashboard()
+
+    scores = [scalar.calculate_fraud_risk(tx) for tx in transactions]
+
+    assert [tx['fraud_risk_score'] for tx in batch.score_transactions([dict(tx) for tx in transactions])] == scores
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+import http_caching
+from http_caching import MIN_COMPRESS_SIZE, compressed_response, current_etag, make_etag, not_modified
+
+
+def make_app(body: bytes):
+    async def handler(request):
+        etag = make_etag(42, request.query_string)
+        cached = current_etag(request, etag)
+        if cached:
+            return not_modified(cached)
+        return compressed_response(request, body, etag=etag)
+
+    app = web.Application()
+    app.router.add_get('/data', handler)
+    return app
+
+
+async def fetch(app, headers):
+    async with TestClient(TestServer(app), auto_decompress=False) as client:
+        first = await client.get('/data', headers=headers)
+        await first.read()
+        again = await client.get('/data', headers={**headers, 'If-None-Match': first.headers['ETag']})
+        return first, again
+
+
+def test_small_body_is_tagged_as_identity():
+    body = json.dumps({'success': True}).encode()
+    assert len(body) < MIN_COMPRESS_SIZE
+    first, again = asyncio.run(fetch(make_app(body), {'Accept-Encoding': 'gzip'}))
+    assert 'Content-Encoding' not in first.headers
+    assert not first.headers['ETag'].endswith('-gzip"')
+    assert again.status == 304
+    assert again.headers['ETag'] == first.headers['ETag']
+
+
+def test_large_body_is_tagged_with_its_coding():
+    body = json.dumps({'rows': ['x' * 50] * 100}).encode()
+    first, again = asyncio.run(fetch(make_app(body), {'Accept-Encoding': 'gzip'}))
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert first.headers['ETag'].endswith('-gzip"')
+    assert again.status == 304
+
+
+def test_tags_from_a_previous_process_do_not_match(monkeypatch):
+    # After a restart the version counts up from 0 again and reaches 42 with a new boot id
+    old_tag = make_etag(42, 'limit=10')
+    monkeypatch.setattr(http_caching, 'BOOT_ID', 'restarted')
+    body = json.dumps({'success': True}).encode()
+
+    async def revalidate():
+        async with TestClient(TestServer(make_app(body))) as client:
+            return await client.get('/data?limit=10', headers={'If-None-Match': old_tag})
+
+    response = asyncio.run(revalidate())
+    assert response.status == 200
+    assert response.headers['ETag'] != old_tag
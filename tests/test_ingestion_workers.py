@@ -0,0 +1,69 @@
+import asyncio
+
+from aiohttp.test_utils import make_mocked_request
+
+import ingestion_workers
+from config import get_config
+from ingestion_workers import ScoringWorker, SharedRing, WorkerPool, publish, workers_for_host
+
+TRANSACTION = {
+    'transaction_id': 'TX_1',
+    'transaction_type': 'credit_card',
+    'merchant': 'Shop',
+    'category': 'grocery',
+    'amount': 1500.0,
+    'status': 'approved',
+    'customer_id': 'CUST_1',
+    'timestamp': '2026-01-01T00:00:00'
+}
+
+
+def score_one(worker_id, ring_name, config):
+    """Worker target scoring one row with the config the pool was built from"""
+    async def run():
+        ring = SharedRing.attach(ring_name)
+        await publish(ring, ScoringWorker(config).score_transactions([dict(TRANSACTION)]))
+        ring.close()
+    asyncio.run(run())
+
+
+def test_workers_score_with_the_dashboard_config():
+    config = get_config()
+    # A threshold only this instance has, so a worker reading get_config() would score LOW
+    config.FRAUD_RULES = dict(config.FRAUD_RULES, medium_risk_score=0.02, high_risk_score=0.05)
+    pool = WorkerPool.from_config(config, workers=1)
+    pool.target = score_one
+
+    async def first_batch():
+        pool.start()
+        try:
+            return await asyncio.wait_for(pool.get_batch(), 60)
+        finally:
+            pool.stop()
+
+    batch = asyncio.run(first_batch())
+    assert batch[0]['risk_level'] == 'HIGH'
+
+
+def test_worker_count_is_capped_at_spare_cpus(monkeypatch):
+    monkeypatch.setattr(ingestion_workers, 'available_cpus', lambda: 1)
+    assert workers_for_host(4) == 0
+    monkeypatch.setattr(ingestion_workers, 'available_cpus', lambda: 4)
+    assert workers_for_host(4) == 3
+    assert workers_for_host(2) == 2
+
+
+def test_customer_features_are_not_served_in_worker_mode(monkeypatch):
+    from real_live_dashboard import RealLiveDashboard
+
+    monkeypatch.setattr(ingestion_workers, 'available_cpus', lambda: 4)
+    config = get_config()
+    config.INGESTION_SOURCE = 'kafka'
+    config.INGESTION_WORKERS = 2
+    dashboard = RealLiveDashboard(config)
+    assert isinstance(dashboard.pipeline, WorkerPool)
+
+    request = make_mocked_request('GET', '/api/customers/CUST_1', match_info={'customer_id': 'CUST_1'})
+    response = asyncio.run(dashboard.get_customer_features(request))
+    assert response.status == 404
+    assert b'INGESTION_WORKERS' in response.body
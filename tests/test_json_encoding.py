@@ -0,0 +1,68 @@
+import json
+import time
+
+import pytest
+
+import json_encoding
+from json_encoding import RowJSONCache, json_body
+from transaction_store import TransactionStore
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def backend(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(json_encoding, 'orjson', None)
+    elif json_encoding.orjson is None:
+        pytest.skip('orjson is not installed')
+    return request.param
+
+
+def rows(count, start=0, **fields):
+    now = time.time()
+    return [{'transaction_id': f'TX{i}', 'timestamp': now + i, 'merchant': 'Café "Ünïcode"', 'amount': 10.5 + i,
+             'is_fraud': False, 'location': {'city': 'Paris'}, 'note': None, **fields}
+            for i in range(start, start + count)]
+
+
+def cached_store(max_transactions=50):
+    store = TransactionStore(max_transactions=max_transactions)
+    cache = RowJSONCache()
+    store.add_listener(cache)
+    return store, cache
+
+
+def test_cached_rows_encode_like_the_stored_rows(backend):
+    store, cache = cached_store()
+    store.upsert_many(rows(20))
+    stored = [tx for _, tx in store.entries()]
+
+    encoded = cache.encode_rows(stored)
+
+    assert json.loads(encoded) == store.snapshot()
+    assert (cache.hits, cache.misses) == (20, 0)
+
+
+def test_replaced_and_evicted_rows_leave_the_cache(backend):
+    store, cache = cached_store(max_transactions=10)
+    store.upsert_many(rows(10))
+    store.upsert_many(rows(1, start=3, status='refunded'))
+    store.upsert_many(rows(5, start=10))
+
+    assert len(cache) == len(store) == 10
+    assert json.loads(cache.encode_rows(tx for _, tx in store.entries())) == store.snapshot()
+    assert json.loads(cache.encode(store.entry('TX3')[1]))['status'] == 'refunded'
+    # Rows that are not stored are encoded on the fly
+    assert json.loads(cache.encode({'transaction_id': 'other', 'amount': 1})) == {'transaction_id': 'other', 'amount': 1}
+    assert cache.misses == 1
+
+
+def test_json_body_splices_rows_into_the_envelope(backend):
+    store, cache = cached_store()
+    store.upsert_many(rows(3))
+    envelope = {'success': True, 'total': 3, 'timestamp': 'now'}
+
+    body = json_body(envelope, rows_field='transactions', rows_json=cache.encode_rows(tx for _, tx in store.entries()))
+
+    assert json.loads(body) == {**envelope, 'transactions': store.snapshot()}
+    assert json.loads(json_body(envelope)) == envelope
+    assert json.loads(json_body({}, rows_field='rows', rows_json=b'[]')) == {'rows': []}
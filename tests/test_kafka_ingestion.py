@@ -0,0 +1,109 @@
+import asyncio
+import zlib
+from datetime import datetime
+
+from kafka_ingestion import ConsumerRecord, InMemoryBroker, KafkaIngestionPipeline
+
+TOPICS = {'credit_card': 'cards', 'paypal': 'paypal'}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def pipeline_for(broker, group='group', batch_size=100, queue_size=10):
+    consumer = broker.consumer(list(TOPICS.values()), group_id=group)
+    return KafkaIngestionPipeline(consumer, lambda batch: batch, TOPICS, batch_size=batch_size,
+                                  poll_timeout_ms=10, queue_size=queue_size)
+
+
+def produce(broker, count, start=0):
+    for i in range(start, start + count):
+        broker.produce('cards', {'transaction_id': f'TX{i}', 'customer_id': f'C{i % 9}'}, key=f'C{i % 9}')
+
+
+def test_poll_batch_is_capped_at_batch_size():
+    async def scenario():
+        broker = InMemoryBroker()
+        produce(broker, 250)
+        pipeline = pipeline_for(broker, batch_size=100)
+        await pipeline.consumer.start()
+        sizes = [len(await pipeline.poll_batch()) for _ in range(4)]
+        return sizes, pipeline.records_consumed, pipeline.batches_scored
+
+    assert run(scenario()) == ([100, 100, 50, 0], 250, 3)
+
+
+def test_to_transaction_fills_in_missing_fields():
+    pipeline = KafkaIngestionPipeline(None, lambda batch: batch, TOPICS)
+    record = ConsumerRecord('paypal', 2, 17, 1700000000000, None, {'amount': 5.0})
+
+    tx = pipeline.to_transaction(record)
+
+    assert tx['transaction_id'] == 'paypal-2-17'
+    assert tx['transaction_type'] == 'paypal'
+    assert tx['timestamp'] == datetime.fromtimestamp(1700000000).isoformat()
+    # Fields the record carries win, and non-object values are skipped
+    own = pipeline.to_transaction(record._replace(value={'transaction_id': 'X', 'transaction_type': 'crypto',
+                                                         'timestamp': 'then'}))
+    assert (own['transaction_id'], own['transaction_type'], own['timestamp']) == ('X', 'crypto', 'then')
+    assert pipeline.to_transaction(record._replace(value=None)) is None
+
+
+def test_committed_offsets_survive_a_consumer_restart():
+    async def consume_all(pipeline):
+        seen = []
+        while True:
+            batch = await pipeline.poll_batch()
+            if not batch:
+                return seen
+            seen.extend(tx['transaction_id'] for tx in batch)
+
+    async def scenario():
+        broker = InMemoryBroker()
+        produce(broker, 30)
+        first = pipeline_for(broker)
+        await first.consumer.start()
+        before = await consume_all(first)
+        await first.consumer.stop()
+
+        produce(broker, 20, start=30)
+        restarted = pipeline_for(broker)
+        await restarted.consumer.start()
+        after = await consume_all(restarted)
+        other_group = pipeline_for(broker, group='other')
+        await other_group.consumer.start()
+        return before, after, await consume_all(other_group)
+
+    before, after, other_group = run(scenario())
+    assert sorted(before) == sorted(f'TX{i}' for i in range(30))
+    assert sorted(after) == sorted(f'TX{i}' for i in range(30, 50))
+    assert len(other_group) == 50
+
+
+def test_run_stops_polling_while_the_queue_is_full():
+    async def scenario():
+        broker = InMemoryBroker()
+        produce(broker, 1000)
+        pipeline = pipeline_for(broker, batch_size=10, queue_size=2)
+        task = asyncio.create_task(pipeline.run())
+        await asyncio.sleep(0.05)
+        # Two queued batches plus the one waiting in put()
+        blocked = pipeline.records_consumed
+        await asyncio.sleep(0.05)
+        still_blocked = pipeline.records_consumed
+        await pipeline.get_batch()
+        await asyncio.sleep(0.05)
+        resumed = pipeline.records_consumed
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return blocked, still_blocked, resumed, pipeline.queue.qsize()
+
+    assert run(scenario()) == (30, 30, 40, 2)
+
+
+def test_keyed_records_go_to_a_stable_partition():
+    broker = InMemoryBroker(partitions=3)
+    records = [broker.produce('cards', {}, key='customer-42') for _ in range(3)]
+
+    assert {record.partition for record in records} == {zlib.crc32(b'customer-42') % 3}
@@ -0,0 +1,58 @@
+import asyncio
+import re
+
+from mcp_fetcher import CheckpointStore, IncrementalTopicFetcher
+
+
+class FakeMCP:
+    """One-partition topics answering incremental queries, with injectable page failures"""
+
+    def __init__(self, topics, fail_calls=()):
+        self.topics = topics
+        self.fail_calls = set(fail_calls)
+        self.calls = 0
+
+    async def execute_sql(self, environment, sql):
+        self.calls += 1
+        if self.calls in self.fail_calls:
+            raise ConnectionError('MCP server went away')
+        topic = re.search(r'FROM `([^`]+)`', sql).group(1)
+        after = re.search(r'_meta\.offset > (\d+)', sql)
+        limit = int(re.search(r'LIMIT (\d+)', sql).group(1))
+        start = int(after.group(1)) + 1 if after else 0
+        return [{'transaction_id': f'{topic}-{offset}', '_partition': 0, '_offset': offset}
+                for offset in range(start, min(start + limit, self.topics[topic]))]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_failed_page_refetches_the_pages_before_it(tmp_path):
+    path = str(tmp_path / 'checkpoints.json')
+    # Call 2 is the second page of the only topic
+    mcp = FakeMCP({'cards': 25}, fail_calls={2})
+    fetcher = IncrementalTopicFetcher(mcp, 'env', {'credit_card': 'cards'}, page_size=10,
+                                      checkpoints=CheckpointStore(path))
+
+    assert run(fetcher.fetch()) == []
+    assert fetcher.checkpoints.get('cards') == {}
+
+    rows = run(fetcher.fetch())
+    assert [row['transaction_id'] for row in rows] == [f'cards-{i}' for i in range(25)]
+    assert CheckpointStore(path).get('cards') == {'0': 24}
+
+
+def test_failing_topic_does_not_drop_or_advance_the_other(tmp_path):
+    mcp = FakeMCP({'cards': 5, 'paypal': 5}, fail_calls={2})
+    fetcher = IncrementalTopicFetcher(mcp, 'env', {'credit_card': 'cards', 'paypal': 'paypal'},
+                                      page_size=10, checkpoints=CheckpointStore(str(tmp_path / 'ck.json')))
+
+    rows = run(fetcher.fetch())
+    assert {row['transaction_id'] for row in rows} == {f'cards-{i}' for i in range(5)}
+    assert fetcher.checkpoints.get('cards') == {'0': 4}
+    assert fetcher.checkpoints.get('paypal') == {}
+
+    rows = run(fetcher.fetch())
+    assert {row['transaction_id'] for row in rows} == {f'paypal-{i}' for i in range(5)}
+    assert all(row['transaction_type'] == 'paypal' for row in rows)
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import random
+import time
+
+from aiohttp.test_utils import make_mocked_request
+
+from search_index import SearchIndex, trigrams
+from transaction_query import TransactionQuery
+
+WORDS = ['Amazon', 'Apple Store', 'Shell', 'abcab', 'bcabc', 'Booking.com', 'ÜBER Eats', 'a', 'aa']
+
+
+def apply_filters_search(rows, search_term):
+    """The search step of the dashboard page's former JS applyFilters, on rows with missing values as ''"""
+    search = search_term.lower()
+    return {t['transaction_id'] for t in rows
+            if search in (t.get('transaction_id') or '').lower()
+            or search in (t.get('merchant') or '').lower()
+            or search in (t.get('category') or '').lower()
+            or search in (t.get('customer_id') or '').lower()}
+
+
+def random_rows(count=400, seed=9, start=1_700_000_000):
+    rng = random.Random(seed)
+    return [{
+        'transaction_id': f'TX_{i:04d}',
+        'merchant': rng.choice(WORDS + [None]),
+        'category': rng.choice(['electronics', 'Travel', 'gaming', '', None]),
+        'customer_id': f'CUST_{rng.randint(1, 60):03d}',
+        'amount': float(i),
+        'timestamp': start + i
+    } for i in range(count)]
+
+
+def needles(rows, rng, count=300):
+    """Substrings of stored values (1 to 6 characters, any case) plus some that match nothing"""
+    texts = [str(tx[field]) for tx in rows for field in ('transaction_id', 'merchant', 'category', 'customer_id')
+             if tx[field]]
+    found = []
+    for _ in range(count):
+        text = rng.choice(texts)
+        start = rng.randrange(len(text))
+        needle = text[start:start + rng.randint(1, 6)]
+        found.append(needle.upper() if rng.random() < 0.3 else needle)
+    return found + ['cabca', 'abcabc', 'zzz', 'TX_99', 'store x']
+
+
+def test_trigrams():
+    assert trigrams('abcd') == {'abc', 'bcd'}
+    assert trigrams('ab') == set()
+
+
+def test_candidates_equal_the_old_page_search():
+    rows = random_rows()
+    index = SearchIndex()
+    for tx in rows:
+        index.on_insert(tx)
+
+    for needle in needles(rows, random.Random(1)):
+        assert index.candidate_ids(needle.lower()) == apply_filters_search(rows, needle), needle
+
+
+def test_shared_trigrams_are_not_a_match():
+    index = SearchIndex()
+    index.on_insert({'transaction_id': 'T1', 'merchant': 'bcabc'})
+    # 'abcab' has only trigrams that 'bcabc' also has
+    assert trigrams('abcab') <= trigrams('bcabc')
+    assert index.candidate_ids('abcab') == set()
+    assert index.candidate_ids('cab') == {'T1'}
+
+
+def test_evicted_rows_are_no_longer_found():
+    rows = random_rows(200)
+    index = SearchIndex()
+    for tx in rows:
+        index.on_insert(tx)
+    for tx in rows[:150]:
+        index.on_evict(tx)
+
+    for needle in needles(rows[150:], random.Random(2), count=100):
+        assert index.candidate_ids(needle.lower()) == apply_filters_search(rows[150:], needle), needle
+    assert all(index.terms.values()) and all(index.grams.values())
+
+
+def test_search_endpoint_returns_what_the_page_used_to_show():
+    from real_live_dashboard import RealLiveDashboard
+
+    dashboard = RealLiveDashboard()
+    # Recent rows, so the store's retention keeps them
+    rows = random_rows(300, start=time.time() - 600)
+    dashboard.store.upsert_many(dict(tx) for tx in rows)
+
+    for needle in ['store', 'CUST_01', 'abcab', 'üb', 'tx_00', 'gam']:
+        request = make_mocked_request('GET', f'/api/search?q={needle}&limit=1000')
+        response = asyncio.run(dashboard.search_transactions(request))
+        body = json.loads(response.body)
+        assert {tx['transaction_id'] for tx in body['results']} == apply_filters_search(rows, needle), needle
+        assert body['matched'] == len(body['results'])
+        # Best matches first: no row ranks above a better one
+        query = TransactionQuery(search=needle)
+        ranks = [query.relevance(tx) for tx in body['results']]
+        assert ranks == sorted(ranks, reverse=True)
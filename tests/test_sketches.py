@@ -0,0 +1,134 @@
+import bisect
+import random
+from collections import Counter
+
+import pytest
+
+from sketches import HyperLogLog, KLLSketch, SpaceSaving, StreamSketches
+
+
+@pytest.mark.parametrize('distinct', [50, 3000, 60000])
+def test_hyperloglog_stays_within_three_standard_errors(distinct):
+    sketch = HyperLogLog(precision=12)
+    for i in range(distinct):
+        # Repeats must not count twice
+        sketch.add(f'CUST_{i}')
+        sketch.add(f'CUST_{i // 2}')
+
+    standard_error = 1.04 / (1 << 6)
+    assert abs(sketch.count() - distinct) <= 3 * standard_error * distinct + 1
+
+
+def test_hyperloglog_merge_equals_one_sketch_over_the_union():
+    left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(20000):
+        (left if i % 2 else right).add(i % 15000)
+        union.add(i % 15000)
+
+    left.merge(right)
+
+    assert left.registers == union.registers
+    assert HyperLogLog.from_dict(left.to_dict()).count() == union.count()
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(precision=10))
+
+
+def rank_error(sorted_values, estimate, fraction):
+    low = bisect.bisect_left(sorted_values, estimate) / len(sorted_values)
+    high = bisect.bisect_right(sorted_values, estimate) / len(sorted_values)
+    return 0.0 if low <= fraction <= high else min(abs(low - fraction), abs(high - fraction))
+
+
+def test_kll_quantiles_stay_within_the_rank_error_bound():
+    rng = random.Random(4)
+    values = [rng.lognormvariate(6.5, 1.5) for _ in range(100000)]
+    sketch = KLLSketch(k=200, seed=1)
+    for value in values:
+        sketch.add(value)
+
+    ordered = sorted(values)
+    estimates = sketch.quantiles((0.01, 0.25, 0.5, 0.95, 0.99))
+    for name, estimate in estimates.items():
+        assert rank_error(ordered, estimate, float(name[1:]) / 100) <= 0.02, name
+    # Memory stays near 3k values however long the stream
+    assert sum(len(items) for items in sketch.levels) <= 3 * sketch.k
+    assert sketch.count == len(values)
+
+
+def test_merged_kll_sketches_keep_the_bound():
+    rng = random.Random(8)
+    parts = [[rng.uniform(0, 1000) + 500 * part for _ in range(20000)] for part in range(4)]
+    merged = KLLSketch(seed=2)
+    for part in parts:
+        sketch = KLLSketch(seed=3)
+        for value in part:
+            sketch.add(value)
+        merged.merge(KLLSketch.from_dict(sketch.to_dict()))
+
+    ordered = sorted(value for part in parts for value in part)
+    for name, estimate in merged.quantiles().items():
+        assert rank_error(ordered, estimate, float(name[1:]) / 100) <= 0.02, name
+    assert merged.count == len(ordered)
+    assert KLLSketch().quantiles() == {'p50': None, 'p95': None, 'p99': None}
+
+
+def zipf_stream(rng, count, items=2000):
+    weights = [1 / (rank + 1) for rank in range(items)]
+    return [(f'merchant-{item}', rng.choice([1.0, 10.0, 100.0]))
+            for item in rng.choices(range(items), weights=weights, k=count)]
+
+
+def check_space_saving(sketch, truth):
+    total = sum(truth.values())
+    tracked = {entry['item']: entry for entry in sketch.top(sketch.capacity)}
+    for item, weight in truth.items():
+        if weight > total / sketch.capacity:
+            assert item in tracked, item
+    for item, entry in tracked.items():
+        # The estimate overcounts by at most max_error
+        assert entry['estimate'] - entry['max_error'] - 0.01 <= truth.get(item, 0.0) <= entry['estimate'] + 0.01
+
+
+def test_space_saving_tracks_every_heavy_hitter_within_its_error():
+    rng = random.Random(6)
+    stream = zipf_stream(rng, 50000)
+    sketch = SpaceSaving(capacity=64)
+    truth = Counter()
+    for item, weight in stream:
+        sketch.add(item, weight)
+        truth[item] += weight
+
+    check_space_saving(sketch, truth)
+    assert sketch.top(1)[0]['item'] == truth.most_common(1)[0][0]
+
+
+def test_merged_space_saving_keeps_its_guarantees():
+    rng = random.Random(7)
+    truth = Counter()
+    merged = SpaceSaving(capacity=64)
+    for _ in range(3):
+        sketch = SpaceSaving(capacity=64)
+        for item, weight in zipf_stream(rng, 20000):
+            sketch.add(item, weight)
+            truth[item] += weight
+        merged.merge(SpaceSaving.from_dict(sketch.to_dict()))
+
+    check_space_saving(merged, truth)
+
+
+def test_windows_merge_only_the_buckets_they_cover():
+    sketches = StreamSketches(bucket_seconds=60, capacity_seconds=3600)
+    now = 1_700_003_600.0
+    for i in range(600):
+        sketches.on_insert({'timestamp': now - i * 5, 'customer_id': f'C{i}', 'amount': float(i),
+                            'merchant': 'M', 'risk_level': 'HIGH' if i % 10 == 0 else 'LOW'})
+
+    five_minutes = sketches.summary(300, now=now)
+    hour = sketches.summary(3600, now=now)
+
+    # 300s of 5s-spaced rows, plus the rest of the partly covered oldest bucket
+    assert 60 <= five_minutes['transactions'] <= 72
+    assert hour['transactions'] == 600
+    assert abs(hour['distinct_customers'] - 600) <= 20
+    assert hour['top_flagged_merchants'][0] == {'item': 'M', 'estimate': float(sum(range(0, 600, 10))),
+                                                'max_error': 0.0}
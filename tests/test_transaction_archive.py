@@ -0,0 +1,98 @@
+import os
+import threading
+
+from transaction_archive import BLOCK_RECORDS, RECORD_HEADER, TransactionArchive
+
+
+def row(i, timestamp, **fields):
+    tx = {'transaction_id': f'TX{i:05d}', 'timestamp': timestamp, 'customer_id': f'C{i % 7}',
+          'amount': round(10.5 + i, 2), 'transaction_type': 'credit_card', 'merchant': 'Amazon',
+          'category': 'electronics', 'status': 'approved', 'risk_level': 'LOW', 'is_fraud': False,
+          'fraud_risk_score': 0.1, 'location': {'city': 'Paris', 'country': 'FR'}}
+    tx.update(fields)
+    return tx
+
+
+def test_rows_round_trip_newest_first_across_blocks_segments_and_reopen(tmp_path):
+    directory = str(tmp_path)
+    rows = [row(i, 1000.0 + i) for i in range(BLOCK_RECORDS * 3)]
+    archive = TransactionArchive(directory, segment_bytes=64 * 1024)
+    for tx in rows:
+        archive.append(dict(tx))
+
+    assert len(archive.segments) > 1
+    assert [tx for _, tx in archive.scan(0, 1e9)] == rows[::-1]
+    archive.close()
+
+    reopened = TransactionArchive(directory, segment_bytes=64 * 1024)
+    assert [tx for _, tx in reopened.scan(0, 1e9)] == rows[::-1]
+    # Only rows inside the range come back
+    assert [ts for ts, _ in reopened.scan(1100, 1104.5)] == [1104.0, 1103.0, 1102.0, 1101.0, 1100.0]
+    assert reopened.recent(since=1000.0 + len(rows) - 3, limit=10) == rows[-3:]
+    reopened.close()
+
+
+def test_scan_can_be_consumed_in_another_thread_while_appending(tmp_path):
+    archive = TransactionArchive(str(tmp_path))
+    for i in range(100):
+        archive.append(row(i, 1000.0 + i))
+    entries = archive.scan(0, 1e9)
+    for i in range(100, 2000):
+        archive.append(row(i, 1000.0 + i))
+
+    result = []
+    worker = threading.Thread(target=lambda: result.extend(tx['transaction_id'] for _, tx in entries))
+    worker.start()
+    worker.join()
+
+    # The scan sees the rows archived when it was started, not the later ones
+    assert result == [f'TX{i:05d}' for i in range(99, -1, -1)]
+    archive.close()
+
+
+def test_replacement_hides_older_versions(tmp_path):
+    archive = TransactionArchive(str(tmp_path))
+    archive.on_insert(row(1, 1000.0))
+    archive.on_insert(row(2, 1001.0))
+    archive.on_replace(row(1, 1000.0), row(1, 1000.0, amount=99.0, risk_level='HIGH'))
+    archive.close()
+
+    archive = TransactionArchive(str(tmp_path))
+    scanned = [tx for _, tx in archive.scan(0, 1e9)]
+    assert [(tx['transaction_id'], tx['amount']) for tx in scanned] == [('TX00001', 99.0), ('TX00002', 12.5)]
+    archive.close()
+
+
+def test_replacement_outside_the_range_does_not_hide_the_row(tmp_path):
+    # Documented limit: only blocks overlapping the range are read
+    archive = TransactionArchive(str(tmp_path))
+    for i in range(BLOCK_RECORDS):
+        archive.append(row(i, 1000.0))
+    archive.on_replace(row(0, 1000.0), row(0, 5000.0, amount=99.0))
+
+    assert [tx['amount'] for _, tx in archive.scan(0, 2000) if tx['transaction_id'] == 'TX00000'] == [10.5]
+    assert [tx['amount'] for _, tx in archive.scan(0, 1e9) if tx['transaction_id'] == 'TX00000'] == [99.0]
+    archive.close()
+
+
+def test_reopen_truncates_a_torn_tail_and_keeps_appending(tmp_path):
+    directory = str(tmp_path)
+    archive = TransactionArchive(directory)
+    for i in range(10):
+        archive.append(row(i, 1000.0 + i))
+    # Flushed but never closed: the last block is not in the index, as after a crash
+    archive.flush()
+    data_path = archive.active.data_path
+    good_size = os.path.getsize(data_path)
+    with open(data_path, 'ab') as f:
+        f.write(RECORD_HEADER.pack(40, 12345) + b'partial record')
+
+    recovered = TransactionArchive(directory)
+    assert os.path.getsize(data_path) == good_size
+    assert [tx['transaction_id'] for _, tx in recovered.scan(0, 1e9)] == [f'TX{i:05d}' for i in range(9, -1, -1)]
+
+    recovered.append(row(10, 1010.0))
+    recovered.close()
+    reopened = TransactionArchive(directory)
+    assert [tx['transaction_id'] for _, tx in reopened.scan(1009, 1e9)] == ['TX00010', 'TX00009']
+    reopened.close()
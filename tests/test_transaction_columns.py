@@ -0,0 +1,38 @@
+from transaction_store import TransactionStore
+
+
+def make_row(i, customer):
+    return {
+        'transaction_id': f'TX_{i:08d}',
+        'transaction_type': 'credit_card',
+        'merchant': f'Merchant {i % 7}',
+        'amount': 10.0 + i,
+        'status': 'approved',
+        'customer_id': customer,
+        'timestamp': '2026-01-01T00:00:00',
+        'risk_level': 'LOW'
+    }
+
+
+def test_dictionaries_stay_bounded_when_customer_ids_churn():
+    store = TransactionStore(max_transactions=100, retention_seconds=0)
+    for i in range(5000):
+        store.upsert_many([make_row(i, f'CUST_{i:08d}')])
+
+    customers = store._columns.dictionaries['customer_id']
+    assert len(store) == 100
+    assert len(customers) == 100
+    # Codes of evicted customers are reused, so the table never outgrows the live rows
+    assert len(customers.values) <= 101
+    for tx_id in ('TX_00004999', 'TX_00004900'):
+        assert store.get(tx_id)['customer_id'] == 'CUST_' + tx_id[3:]
+
+
+def test_replacing_a_row_releases_its_old_values():
+    store = TransactionStore(max_transactions=10, retention_seconds=0)
+    store.upsert_many([make_row(1, 'CUST_A')])
+    store.upsert_many([make_row(1, 'CUST_B')])
+
+    customers = store._columns.dictionaries['customer_id']
+    assert sorted(customers.codes) == ['CUST_B']
+    assert store.get('TX_00000001')['customer_id'] == 'CUST_B'
@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+import transaction_index
+from transaction_index import TransactionIndex
+from transaction_query import TransactionQuery
+from transaction_store import TransactionStore
+
+MERCHANTS = ['Amazon', 'Apple Store', 'Shell', 'Zalando', 'Booking.com', 'Uber']
+CATEGORIES = ['electronics', 'Electronics', 'travel', 'grocery', 'gaming', None]
+
+
+def random_row(rng, i):
+    return {
+        'transaction_id': f'TX{i:05d}',
+        'timestamp': 1_700_000_000 + i,
+        'customer_id': f'CUST_{rng.randint(1, 40):03d}',
+        'merchant': rng.choice(MERCHANTS),
+        'category': rng.choice(CATEGORIES),
+        'transaction_type': rng.choice(['credit_card', 'paypal']),
+        'status': rng.choice(['approved', 'pending', 'failed']),
+        'risk_level': rng.choice(['LOW', 'MEDIUM', 'HIGH']),
+        'fraud_risk_score': rng.random(),
+        'amount': rng.choice([0.0, 10.0, 99.99, 100.0, 250.5, 1000.0, rng.uniform(0, 5000)])
+    }
+
+
+def filled_store(rng, index, rows=1500, max_transactions=500):
+    store = TransactionStore(max_transactions=max_transactions, retention_seconds=0)
+    store.add_listener(index)
+    for start in range(0, rows, 50):
+        batch = [random_row(rng, i) for i in range(start, start + 50)]
+        # Re-deliver some recent rows with changed fields, so indexes see replacements
+        redelivered = [{**random_row(rng, i), 'transaction_id': f'TX{i:05d}'}
+                       for i in rng.sample(range(max(0, start - 200), start + 50), 10)]
+        store.upsert_many(batch + redelivered)
+    return store
+
+
+def random_params(rng):
+    params = {'limit': str(rng.choice([5, 50, 1000])), 'sort': rng.choice(['timestamp', 'amount'])}
+    options = {
+        'transaction_type': lambda: rng.choice(['credit_card', 'paypal', 'crypto']),
+        'status': lambda: rng.choice(['approved', 'pending']),
+        'risk_level': lambda: rng.choice(['LOW', 'HIGH']),
+        'customer_id': lambda: f'CUST_{rng.randint(1, 45):03d}',
+        'category': lambda: rng.choice(['electr', 'TRAVEL', 'g', 'none']),
+        'merchant': lambda: rng.choice(['amaz', 'store', 'u']),
+        'min_amount': lambda: str(rng.choice([0, 99.99, 100, 250.5, 1000])),
+        'max_amount': lambda: str(rng.choice([10, 100, 250.5, 4000])),
+        'q': lambda: rng.choice(['cust_01', 'TX0123', 'ooking', 'ap', 'zz']),
+    }
+    for name in rng.sample(sorted(options), rng.randint(1, 3)):
+        params[name] = options[name]()
+    return params
+
+
+@pytest.fixture(params=['sortedcontainers', 'bisect'])
+def index(request, monkeypatch):
+    if request.param == 'bisect':
+        monkeypatch.setattr(transaction_index, 'SortedList', None)
+    elif transaction_index.SortedList is None:
+        pytest.skip('sortedcontainers is not installed')
+    return TransactionIndex()
+
+
+def test_indexed_lookup_returns_the_same_page_as_a_full_scan(index):
+    rng = random.Random(11)
+    store = filled_store(rng, index)
+    assert len(index) == len(store) == 500
+
+    for _ in range(300):
+        params = random_params(rng)
+        query = TransactionQuery.from_params(params)
+        indexed = query.execute(index.lookup(query, store))
+        indexed_ids = [tx['transaction_id'] for tx in indexed['transactions']]
+        full = query.execute(store.entries())
+        assert indexed_ids == [tx['transaction_id'] for tx in full['transactions']], params
+        assert indexed['summary'] == full['summary'], params
+
+
+def test_candidates_cover_every_match_and_narrow_the_scan(index):
+    rng = random.Random(5)
+    store = filled_store(rng, index)
+    query = TransactionQuery.from_params({'customer_id': 'CUST_007', 'status': 'approved'})
+
+    candidates = index.candidate_ids(query)
+
+    matching = {tx['transaction_id'] for _, tx in store.entries() if query.matches(tx)}
+    assert matching <= candidates
+    assert len(candidates) < len(store) / 10
+    assert index.candidate_ids(TransactionQuery.from_params({'sort': 'amount'})) is None
+
+
+def test_amount_bounds_are_inclusive(index):
+    store = TransactionStore(max_transactions=100, retention_seconds=0)
+    store.add_listener(index)
+    store.upsert_many({'transaction_id': f'A{amount}', 'amount': amount} for amount in (5.0, 10.0, 10.0001, 20.0))
+
+    query = TransactionQuery.from_params({'min_amount': '10', 'max_amount': '20'})
+    assert index.candidate_ids(query) == {'A10.0', 'A10.0001', 'A20.0'}
+
+
+def test_evicted_rows_leave_every_index(index):
+    rng = random.Random(2)
+    store = filled_store(rng, index, rows=200, max_transactions=50)
+    stored = {tx['transaction_id'] for _, tx in store.entries()}
+
+    for field, postings in index.fields.items():
+        assert set().union(*postings.values()) == stored, field
+        assert all(postings.values())
+    assert {tx_id for _, tx_id in index.amounts} == stored
@@ -0,0 +1,122 @@
+import random
+
+import pytest
+
+from transaction_query import TransactionQuery, decode_cursor, encode_cursor
+
+MERCHANTS = ['Amazon', 'Apple Store', 'Shell', 'Zalando', 'Booking.com']
+
+
+def make_rows(count=300, seed=3):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append((1000.0 + i // 3, {
+            'transaction_id': f'TX{i:04d}',
+            'customer_id': f'C{i % 17}',
+            'merchant': rng.choice(MERCHANTS),
+            'category': rng.choice(['electronics', 'travel', 'grocery']),
+            'transaction_type': rng.choice(['credit_card', 'paypal']),
+            'status': rng.choice(['approved', 'pending']),
+            'risk_level': rng.choice(['LOW', 'MEDIUM', 'HIGH']),
+            'fraud_risk_score': rng.choice([0.1, 0.5, 0.8]),
+            'amount': float(rng.choice([10, 20, 20, 35, 5000])),
+            'is_fraud': i % 50 == 0
+        }))
+    return rows
+
+
+def all_pages(params, rows):
+    pages, cursor = [], None
+    while True:
+        query = TransactionQuery.from_params({**params, **({'cursor': cursor} if cursor else {})})
+        page = query.execute(rows)
+        pages.append(page)
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize('sort', ['timestamp', 'amount', 'fraud_risk_score', 'merchant', 'transaction_id', 'relevance'])
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_cursor_pages_cover_every_match_once_in_order(sort, order):
+    rows = make_rows()
+    params = {'sort': sort, 'order': order, 'limit': '7', 'transaction_type': 'paypal', 'q': 'a'}
+    query = TransactionQuery.from_params(params)
+    expected = sorted((row for row in rows if query.matches(row[1])), key=lambda row: query.sort_key(*row),
+                      reverse=order == 'desc')
+
+    pages = all_pages(params, rows)
+
+    ids = [tx['transaction_id'] for page in pages for tx in page['transactions']]
+    assert ids == [tx['transaction_id'] for _, tx in expected]
+    assert all(len(page['transactions']) == 7 for page in pages[:-1])
+    assert pages[0]['summary']['total_transactions'] == len(expected)
+
+
+def test_cursor_stays_valid_while_newer_rows_arrive():
+    rows = make_rows(100)
+    first = TransactionQuery.from_params({'limit': '10'}).execute(rows)
+    newer = [(5000.0 + i, {'transaction_id': f'NEW{i}', 'amount': 1.0}) for i in range(20)]
+
+    second = TransactionQuery.from_params({'limit': '10', 'cursor': first['next_cursor']}).execute(rows + newer)
+
+    assert [tx['transaction_id'] for tx in second['transactions']] == \
+        [tx['transaction_id'] for _, tx in sorted(rows, key=lambda row: (row[0], row[1]['transaction_id']),
+                                                  reverse=True)[10:20]]
+
+
+def test_summary_counts_every_match_not_just_the_page():
+    rows = make_rows()
+    page = TransactionQuery.from_params({'limit': '5', 'min_amount': '20', 'max_amount': '35'}).execute(rows)
+    matching = [tx for _, tx in rows if 20 <= tx['amount'] <= 35]
+
+    assert len(page['transactions']) == 5
+    assert page['summary'] == {
+        'total_transactions': len(matching),
+        'total_amount': round(sum(tx['amount'] for tx in matching), 2),
+        'high_risk_count': sum(tx['fraud_risk_score'] > 0.7 for tx in matching),
+        'fraud_count': sum(tx['is_fraud'] for tx in matching)
+    }
+
+
+def test_merged_node_pages_equal_one_page_over_all_rows():
+    rows = make_rows()
+    params = {'limit': '9', 'sort': 'amount'}
+    nodes = [rows[i::3] for i in range(3)]
+    query = TransactionQuery.from_params(params)
+
+    merged = query.merge_pages([query.execute(node) for node in nodes])
+    single = query.execute(rows)
+
+    # merge_pages re-derives sort keys from the rows, which here carry no timestamp field
+    assert [tx['transaction_id'] for tx in merged['transactions']] == \
+        [tx['transaction_id'] for tx in single['transactions']]
+    assert merged['summary'] == single['summary']
+
+
+def test_cursor_round_trips_and_rejects_garbage():
+    assert decode_cursor(encode_cursor((12.5, 'TX1'))) == (12.5, 'TX1')
+    assert decode_cursor(encode_cursor(((3, 99.0), 'TX1'))) == ((3, 99.0), 'TX1')
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor('not-a-cursor')
+
+
+@pytest.mark.parametrize('params, message', [
+    ({'sort': 'colour'}, 'sort must be one of'),
+    ({'order': 'up'}, "order must be 'asc' or 'desc'"),
+    ({'limit': 'ten'}, 'limit must be an integer'),
+    ({'limit': '0'}, 'limit must be between 1 and 1000'),
+    ({'min_amount': 'cheap'}, 'min_amount must be a number'),
+])
+def test_bad_parameters_are_explained(params, message):
+    with pytest.raises(ValueError, match=message):
+        TransactionQuery.from_params(params)
+
+
+def test_missing_text_fields_do_not_match_the_word_none():
+    row = {'transaction_id': 'TX1', 'merchant': None, 'category': None}
+
+    assert not TransactionQuery.from_params({'category': 'none'}).matches(row)
+    assert not TransactionQuery.from_params({'q': 'non'}).matches(row)
+    assert TransactionQuery.from_params({'q': 'tx'}).matches(row)
@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp.test_utils import make_mocked_request
+
+from windowed_metrics import parse_window
+
+
+@pytest.mark.parametrize('value, seconds', [('90', 90), ('90s', 90), ('5m', 300), ('1h', 3600)])
+def test_parse_window_accepts_each_format(value, seconds):
+    assert parse_window(value) == seconds
+
+
+@pytest.mark.parametrize('value', ['2d', 'abc', '', '0', '-5m', '2h'])
+def test_parse_window_explains_bad_input(value):
+    with pytest.raises(ValueError) as error:
+        parse_window(value)
+    message = str(error.value)
+    assert 'Ns, Nm or Nh' in message
+    assert 'at most 3600 seconds' in message
+    assert 'invalid literal' not in message
+
+
+def test_window_endpoint_answers_400_with_the_accepted_formats():
+    from real_live_dashboard import RealLiveDashboard
+
+    dashboard = RealLiveDashboard()
+    request = make_mocked_request('GET', '/api/metrics/windows?window=2d')
+    response = asyncio.run(dashboard.get_window_metrics(request))
+    assert response.status == 400
+    body = json.loads(response.body)
+    assert body['error'] == "Invalid window '2d': use Ns, Nm or Nh (e.g. 90s, 5m, 1h), at most 3600 seconds"
+
+
+@pytest.mark.parametrize('interval', ['abc', '0', '-1', '2h', '3601'])
+def test_window_endpoint_explains_bad_intervals(interval):
+    from real_live_dashboard import RealLiveDashboard
+
+    dashboard = RealLiveDashboard()
+    request = make_mocked_request('GET', f'/api/metrics/windows?interval={interval}')
+    response = asyncio.run(dashboard.get_window_metrics(request))
+    assert response.status == 400
+    assert json.loads(response.body)['error'] == (f"Invalid interval '{interval}': use Ns, Nm or Nh "
+                                                  f"(e.g. 90s, 5m, 1h), at most 3600 seconds")
+
+
+def test_window_endpoint_accepts_interval_units():
+    from real_live_dashboard import RealLiveDashboard
+
+    dashboard = RealLiveDashboard()
+    request = make_mocked_request('GET', '/api/metrics/windows?window=10m&interval=5m')
+    response = asyncio.run(dashboard.get_window_metrics(request))
+    assert response.status == 200
+    series = json.loads(response.body)['series']
+    assert (series['interval_seconds'], series['window_seconds']) == (300, 600)
@@ -0,0 +1,73 @@
+import asyncio
+
+from transaction_store import TransactionStore
+from ws_broadcast import Broadcaster, ChangeTracker
+
+
+def make_row(tx_id, amount, timestamp='2026-01-01T00:00:00'):
+    return {'transaction_id': tx_id, 'amount': amount, 'timestamp': timestamp}
+
+
+def tracked_store(max_transactions):
+    store = TransactionStore(max_transactions=max_transactions, retention_seconds=0)
+    changes = ChangeTracker()
+    store.add_listener(changes)
+    return store, changes
+
+
+def test_row_replaced_then_evicted_in_one_tick_is_removed():
+    store, changes = tracked_store(2)
+    store.upsert_many([make_row('A', 1.0), make_row('B', 2.0)])
+    changes.drain()
+
+    store.upsert_many([make_row('A', 5.0)])
+    # Two newer rows push A out of the two-row store before the next drain
+    store.upsert_many([make_row('C', 3.0, '2026-01-01T00:00:01'), make_row('D', 4.0, '2026-01-01T00:00:02')])
+
+    upserts, removed = changes.drain()
+    assert 'A' not in [tx['transaction_id'] for tx in upserts]
+    assert 'A' in removed
+    assert 'A' not in store
+
+
+def test_row_evicted_then_reinserted_is_an_upsert():
+    store, changes = tracked_store(1)
+    store.upsert_many([make_row('A', 1.0)])
+    changes.drain()
+
+    store.upsert_many([make_row('B', 2.0, '2026-01-01T00:00:01')])
+    store.upsert_many([make_row('A', 3.0, '2026-01-01T00:00:02')])
+
+    upserts, removed = changes.drain()
+    assert [tx['transaction_id'] for tx in upserts] == ['A']
+    assert removed == ['B']
+
+
+class StalledSocket:
+    """A client whose sends never complete"""
+
+    def __init__(self):
+        self.closed = False
+
+    async def send_str(self, data):
+        await asyncio.Event().wait()
+
+    async def close(self):
+        await asyncio.sleep(0)
+        self.closed = True
+
+
+def test_slow_client_is_dropped_and_its_socket_closed():
+    async def run():
+        broadcaster = Broadcaster(send_timeout=0.05)
+        ws = StalledSocket()
+        broadcaster.register(ws)
+        broadcaster.publish({'type': 'update'})
+
+        await asyncio.sleep(0.1)
+        assert broadcaster.clients_dropped == 1 and len(broadcaster) == 0
+        return ws, broadcaster
+
+    ws, broadcaster = asyncio.run(run())
+    assert ws.closed
+    assert not broadcaster._closing
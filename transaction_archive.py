@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Transaction Archive
+Append-only segment files of scored transactions with a time index, read back through mmap
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from transaction_columns import FIELD_ORDER
+from transaction_store import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Known fields are written as a one-byte id; any other field carries its name
+FIELDS = ('transaction_id',) + FIELD_ORDER
+FIELD_IDS = {field: i for i, field in enumerate(FIELDS)}
+NAMED_FIELD = 255
+# Low-cardinality strings are written as ids into the segment's dictionary file
+DICTIONARY_FIELDS = frozenset(('transaction_type', 'merchant', 'category', 'status', 'risk_level'))
+MAX_DICTIONARY = 65535
+
+# Value tags
+NONE, FALSE, TRUE, INT, FLOAT, SHORT_STR, LONG_STR, DICT_REF, JSON_VALUE = range(9)
+
+RECORD_HEADER = struct.Struct('<II')   # body length, crc32 of the body
+RECORD_PREFIX = struct.Struct('<dB')   # epoch timestamp, flags
+INDEX_ENTRY = struct.Struct('<ddQQI')  # min timestamp, max timestamp, start offset, end offset, records
+U16 = struct.Struct('<H')
+U32 = struct.Struct('<I')
+I64 = struct.Struct('<q')
+F64 = struct.Struct('<d')
+
+# Record flag: this row replaced an earlier version of the same transaction_id
+REPLACES = 1
+# Records per time-index entry
+BLOCK_RECORDS = 512
+# Buffered bytes that force a write even between store batches
+FLUSH_BYTES = 1 << 20
+
+SEGMENT_NAME = re.compile(r'^segment-(\d{8})\.dat$')
+
+Block = Tuple[float, float, int, int, int]
+
+
+def archive_dir_from_config(config) -> str:
+    """Get the archive directory from ARCHIVE_DIR, or a file:// DATABASE_URL"""
+    if config.ARCHIVE_DIR:
+        return config.ARCHIVE_DIR
+    if config.DATABASE_URL:
+        url = urlparse(config.DATABASE_URL)
+        if url.scheme == 'file':
+            return url.path
+        logger.warning(f"DATABASE_URL scheme '{url.scheme}' is not supported; only file:// archives are built in")
+    return ''
+
+
+def parse_time(value: Optional[str], default: float) -> float:
+    """Parse an epoch (seconds or milliseconds) or ISO-8601 query parameter"""
+    if value is None or value == '':
+        return default
+    try:
+        return parse_timestamp(float(value))
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time: {value}") from None
+
+
+class SegmentDictionary:
+    """Strings of DICTIONARY_FIELDS seen in one segment, in id order"""
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values = values or []
+        self.codes = {value: code for code, value in enumerate(self.values)}
+        self.pending = bytearray()
+
+    def code(self, value: str) -> Optional[int]:
+        """Get a string's id, defining it if new; None once the dictionary is full"""
+        code = self.codes.get(value)
+        if code is None:
+            if len(self.values) >= MAX_DICTIONARY:
+                return None
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            data = value.encode()
+            self.pending += U16.pack(len(data)) + data
+        return code
+
+
+def _encode_value(body: bytearray, value: Any, dictionary: Optional[SegmentDictionary]):
+    if value is None:
+        body.append(NONE)
+    elif value is True:
+        body.append(TRUE)
+    elif value is False:
+        body.append(FALSE)
+    elif isinstance(value, float):
+        body.append(FLOAT)
+        body += F64.pack(value)
+    elif isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+        body.append(INT)
+        body += I64.pack(value)
+    elif isinstance(value, str):
+        code = dictionary.code(value) if dictionary is not None else None
+        if code is not None:
+            body.append(DICT_REF)
+            body += U16.pack(code)
+            return
+        data = value.encode()
+        if len(data) < 256:
+            body.append(SHORT_STR)
+            body.append(len(data))
+        else:
+            body.append(LONG_STR)
+            body += U32.pack(len(data))
+        body += data
+    else:
+        data = json.dumps(value).encode()
+        body.append(JSON_VALUE)
+        body += U32.pack(len(data))
+        body += data
+
+
+def encode_record(tx: Dict[str, Any], timestamp: float, flags: int, dictionary: SegmentDictionary) -> bytes:
+    """Encode a row as a checksummed record"""
+    body = bytearray(RECORD_PREFIX.pack(timestamp, flags))
+    for field, value in tx.items():
+        field_id = FIELD_IDS.get(field)
+        if field_id is None:
+            name = field.encode()
+            body.append(NAMED_FIELD)
+            body += U16.pack(len(name))
+            body += name
+        else:
+            body.append(field_id)
+        _encode_value(body, value, dictionary if field in DICTIONARY_FIELDS else None)
+    return RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def decode_body(buf, pos: int, end: int, values: List[str]) -> Tuple[float, int, Dict[str, Any]]:
+    """Decode one record body into (timestamp, flags, row)"""
+    timestamp, flags = RECORD_PREFIX.unpack_from(buf, pos)
+    pos += RECORD_PREFIX.size
+    tx = {}
+    while pos < end:
+        field_id = buf[pos]
+        pos += 1
+        if field_id == NAMED_FIELD:
+            length, = U16.unpack_from(buf, pos)
+            name = buf[pos + 2:pos + 2 + length].decode()
+            pos += 2 + length
+        else:
+            name = FIELDS[field_id]
+        tag = buf[pos]
+        pos += 1
+        if tag == DICT_REF:
+            value = values[U16.unpack_from(buf, pos)[0]]
+            pos += 2
+        elif tag == SHORT_STR:
+            length = buf[pos]
+            value = buf[pos + 1:pos + 1 + length].decode()
+            pos += 1 + length
+        elif tag == FLOAT:
+            value, = F64.unpack_from(buf, pos)
+            pos += 8
+        elif tag == NONE:
+            value = None
+        elif tag == TRUE:
+            value = True
+        elif tag == FALSE:
+            value = False
+        elif tag == INT:
+            value, = I64.unpack_from(buf, pos)
+            pos += 8
+        elif tag == LONG_STR:
+            length, = U32.unpack_from(buf, pos)
+            value = buf[pos + 4:pos + 4 + length].decode()
+            pos += 4 + length
+        elif tag == JSON_VALUE:
+            length, = U32.unpack_from(buf, pos)
+            value = json.loads(buf[pos + 4:pos + 4 + length])
+            pos += 4 + length
+        else:
+            raise ValueError(f"Unknown value tag {tag}")
+        tx[name] = value
+    return timestamp, flags, tx
+
+
+def decode_records(buf, start: int, end: int, values: List[str]) -> List[Tuple[float, int, Dict[str, Any]]]:
+    """Decode the records stored in a buffer between two offsets"""
+    records = []
+    offset = start
+    while offset < end:
+        length, _ = RECORD_HEADER.unpack_from(buf, offset)
+        body = offset + RECORD_HEADER.size
+        records.append(decode_body(buf, body, body + length, values))
+        offset = body + length
+    return records
+
+
+class Segment:
+    """One data file with its time index and string dictionary, mapped for reading"""
+
+    def __init__(self, directory: str, seq: int):
+        self.seq = seq
+        base = os.path.join(directory, f"segment-{seq:08d}")
+        self.data_path = base + '.dat'
+        self.index_path = base + '.idx'
+        self.dictionary_path = base + '.dict'
+        self.blocks: List[Block] = []
+        self.dictionary = SegmentDictionary()
+        self.size = 0
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+    def load(self):
+        """Read the index and dictionary, ignoring a torn trailing entry"""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            self.blocks = [INDEX_ENTRY.unpack_from(data, offset) for offset in range(0, usable, INDEX_ENTRY.size)]
+        values = []
+        if os.path.exists(self.dictionary_path):
+            with open(self.dictionary_path, 'rb') as f:
+                data = f.read()
+            pos = 0
+            while pos + U16.size <= len(data):
+                length, = U16.unpack_from(data, pos)
+                if pos + U16.size + length > len(data):
+                    break
+                values.append(data[pos + U16.size:pos + U16.size + length].decode())
+                pos += U16.size + length
+        self.dictionary = SegmentDictionary(values)
+        self.size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        # Index entries past the end of the data (a torn write) are dropped
+        self.blocks = [block for block in self.blocks if block[3] <= self.size]
+
+    @property
+    def bytes(self) -> int:
+        return self.size + len(self.blocks) * INDEX_ENTRY.size
+
+    def view(self) -> mmap.mmap:
+        """Map the data file, re-mapping if it has grown since"""
+        if self._map is None or self._mapped_size != self.size:
+            self.close()
+            with open(self.data_path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ)
+            self._mapped_size = self.size
+        return self._map
+
+    def records(self, start: int, end: int) -> List[Tuple[float, int, Dict[str, Any]]]:
+        """Decode the records stored between two offsets"""
+        return decode_records(self.view(), start, end, self.dictionary.values)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def delete(self):
+        self.close()
+        for path in (self.data_path, self.index_path, self.dictionary_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class TransactionArchive:
+    """Store listener appending every stored row to segment files on disk.
+
+    Records are checksummed, binary-encoded rows. Known field names become
+    one-byte ids, and low-cardinality strings become ids into the segment's
+    dictionary file. Every BLOCK_RECORDS records the time index gains a
+    (min, max timestamp, offsets) entry, so a range query only decodes
+    blocks that overlap it. Segments roll over at ``segment_bytes``, and
+    the oldest are deleted beyond ``max_bytes``.
+
+    Writes are buffered and go to the OS on flush(), which the dashboard
+    calls after each store batch. A process crash loses nothing that was
+    flushed. After an OS crash, reopening truncates the last segment at the
+    first record whose checksum fails.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, max_bytes: int = 1024 ** 3):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.segments: List[Segment] = []
+        for name in sorted(os.listdir(directory)):
+            match = SEGMENT_NAME.match(name)
+            if match:
+                segment = Segment(directory, int(match.group(1)))
+                segment.load()
+                self.segments.append(segment)
+        self._buffer = bytearray()
+        self._index_buffer = bytearray()
+        # Open block: [min timestamp, max timestamp, start offset, records]
+        self._block: Optional[List] = None
+        self.records_written = 0
+        if self.segments:
+            self._recover(self.segments[-1])
+        else:
+            self.segments.append(Segment(directory, 1))
+        self._open(self.segments[-1])
+
+    @classmethod
+    def from_config(cls, config) -> Optional['TransactionArchive']:
+        """Open the configured archive, or return None when none is configured"""
+        directory = archive_dir_from_config(config)
+        if not directory:
+            return None
+        return cls(directory, segment_bytes=config.ARCHIVE_SEGMENT_BYTES, max_bytes=config.ARCHIVE_MAX_BYTES)
+
+    @property
+    def active(self) -> Segment:
+        return self.segments[-1]
+
+    def _recover(self, segment: Segment):
+        """Re-scan the unindexed tail of the last segment and cut it at the first bad record"""
+        offset = segment.blocks[-1][3] if segment.blocks else 0
+        with open(segment.data_path, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+        pos = 0
+        while pos + RECORD_HEADER.size <= len(tail):
+            length, crc = RECORD_HEADER.unpack_from(tail, pos)
+            body = tail[pos + RECORD_HEADER.size:pos + RECORD_HEADER.size + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break
+            timestamp, _ = RECORD_PREFIX.unpack_from(body)
+            self._extend_block(timestamp, offset + pos)
+            pos += RECORD_HEADER.size + length
+        if offset + pos < segment.size:
+            logger.warning(f"Truncating {segment.size - offset - pos} torn bytes from {segment.data_path}")
+            with open(segment.data_path, 'r+b') as f:
+                f.truncate(offset + pos)
+            segment.size = offset + pos
+
+    def _open(self, segment: Segment):
+        self._data = open(segment.data_path, 'ab')
+        self._index = open(segment.index_path, 'ab')
+        self._dictionary = open(segment.dictionary_path, 'ab')
+
+    @property
+    def _end(self) -> int:
+        return self.active.size + len(self._buffer)
+
+    def _extend_block(self, timestamp: float, offset: int):
+        block = self._block
+        if block is None:
+            self._block = [timestamp, timestamp, offset, 1]
+            return
+        if timestamp < block[0]:
+            block[0] = timestamp
+        if timestamp > block[1]:
+            block[1] = timestamp
+        block[3] += 1
+
+    def _close_block(self):
+        if self._block is None:
+            return
+        low, high, start, count = self._block
+        entry = (low, high, start, self._end, count)
+        self.active.blocks.append(entry)
+        self._index_buffer += INDEX_ENTRY.pack(*entry)
+        self._block = None
+
+    def append(self, tx: Dict[str, Any], flags: int = 0):
+        """Buffer one row for the active segment"""
+        timestamp = parse_timestamp(tx.get('timestamp'))
+        record = encode_record(tx, timestamp, flags, self.active.dictionary)
+        self._extend_block(timestamp, self._end)
+        self._buffer += record
+        self.records_written += 1
+        if self._block[3] >= BLOCK_RECORDS:
+            self._close_block()
+        if len(self._buffer) >= FLUSH_BYTES:
+            self.flush()
+        if self._end >= self.segment_bytes:
+            self._rotate()
+
+    def on_insert(self, tx: Dict[str, Any]):
+        self.append(dict(tx))
+
+    def on_replace(self, old: Dict[str, Any], new: Dict[str, Any]):
+        self.append(dict(new), REPLACES)
+
+    def on_evict(self, tx: Dict[str, Any]):
+        """The archive keeps rows the live store lets go"""
+
+    def flush(self):
+        """Hand buffered records to the OS: dictionary first, then data, then index"""
+        if not (self._buffer or self._index_buffer):
+            return
+        dictionary = self.active.dictionary
+        if dictionary.pending:
+            self._dictionary.write(dictionary.pending)
+            self._dictionary.flush()
+            dictionary.pending = bytearray()
+        self._data.write(self._buffer)
+        self._data.flush()
+        self.active.size += len(self._buffer)
+        self._buffer = bytearray()
+        if self._index_buffer:
+            self._index.write(self._index_buffer)
+            self._index.flush()
+            self._index_buffer = bytearray()
+
+    def _sync_and_close(self):
+        self._close_block()
+        self.flush()
+        for f in (self._dictionary, self._data, self._index):
+            os.fsync(f.fileno())
+            f.close()
+
+    def _rotate(self):
+        """Seal the active segment, start the next and drop segments beyond max_bytes"""
+        self._sync_and_close()
+        self.segments.append(Segment(self.directory, self.active.seq + 1))
+        self._open(self.active)
+        while len(self.segments) > 1 and sum(segment.bytes for segment in self.segments) > self.max_bytes:
+            dropped = self.segments.pop(0)
+            dropped.delete()
+            logger.info(f"Dropped archive segment {dropped.data_path}")
+
+    def close(self):
+        """Flush, sync and close the archive"""
+        self._sync_and_close()
+        for segment in self.segments:
+            segment.close()
+
+    def _blocks(self, segment: Segment) -> List[Block]:
+        if segment is self.active and self._block is not None:
+            low, high, start, count = self._block
+            return segment.blocks + [(low, high, start, self._end, count)]
+        return segment.blocks
+
+    def scan(self, start: float, end: float) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        """Yield (timestamp, row) for archived rows in [start, end], newest first.
+
+        Only the latest archived version of a transaction is returned: a
+        record flagged REPLACES hides older versions of the same id that
+        the scan reaches after it. Only blocks overlapping the range are
+        read, so a re-delivery whose timestamp moved outside the range does
+        not hide the older version inside it.
+
+        The blocks to read are captured when scan() is called, and each
+        touched segment gets its own read-only map. The returned iterator
+        can therefore be consumed in another thread (as /api/history does)
+        while rows keep being appended.
+        """
+        self.flush()
+        plan = []
+        for segment in reversed(self.segments):
+            blocks = [block for block in self._blocks(segment) if not (block[1] < start or block[0] > end)]
+            if not blocks or segment.size == 0:
+                continue
+            with open(segment.data_path, 'rb') as f:
+                buf = mmap.mmap(f.fileno(), segment.size, access=mmap.ACCESS_READ)
+            plan.append((buf, segment.dictionary.values, blocks))
+        return self._scan_plan(plan, start, end)
+
+    @staticmethod
+    def _scan_plan(plan: List[Tuple[mmap.mmap, List[str], List[Block]]], start: float,
+                   end: float) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        superseded = set()
+        try:
+            for buf, values, blocks in plan:
+                for _, _, first, last, _ in reversed(blocks):
+                    for timestamp, flags, tx in reversed(decode_records(buf, first, last, values)):
+                        tx_id = tx.get('transaction_id')
+                        if tx_id in superseded:
+                            continue
+                        if flags & REPLACES:
+                            superseded.add(tx_id)
+                        if start <= timestamp <= end:
+                            yield timestamp, tx
+        finally:
+            for buf, _, _ in plan:
+                buf.close()
+
+    def recent(self, since: float, limit: int) -> List[Dict[str, Any]]:
+        """Get up to ``limit`` of the newest rows since a time, oldest first, for warm starts"""
+        rows = []
+        for _, tx in self.scan(since, float('inf')):
+            rows.append(tx)
+            if len(rows) >= limit:
+                break
+        rows.reverse()
+        return rows
+
+    def describe(self) -> Dict[str, Any]:
+        blocks = [block for segment in self.segments for block in self._blocks(segment)]
+        return {
+            'directory': self.directory,
+            'segments': len(self.segments),
+            'bytes': sum(segment.bytes for segment in self.segments) + len(self._buffer),
+            'records': sum(block[4] for block in blocks),
+            'oldest': min((block[0] for block in blocks), default=None),
+            'newest': max((block[1] for block in blocks), default=None)
+        }
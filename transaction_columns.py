@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Transaction Columns
+Compact columnar storage for stored transactions, with read-only row views
+"""
+
+from array import array
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+
+# Strings stored as codes into a per-field dictionary (customer ids are interned the same way)
+CODED_FIELDS = ('transaction_type', 'merchant', 'category', 'status', 'risk_level', 'customer_id')
+FLOAT_FIELDS = ('amount', 'fraud_risk_score')
+# Materialized rows list known fields in this order, then any extra fields
+FIELD_ORDER = ('transaction_type', 'merchant', 'category', 'amount', 'status', 'customer_id',
+               'timestamp', 'fraud_risk_score', 'risk_level', 'is_fraud')
+FIELD_BITS = {field: 1 << i for i, field in enumerate(FIELD_ORDER)}
+
+_MISSING = object()
+
+
+class ValueDictionary:
+    """Maps each distinct string to a small integer code and back.
+
+    Codes are reference counted: each encode() takes a reference that
+    release() gives back, and a code nobody references is freed for the
+    next new string. Its size therefore follows the distinct values of the
+    stored rows, not every value ever seen, which matters for customer ids.
+    """
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self.codes: Dict[str, int] = {}
+        self.refs = array('I')
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def encode(self, value: str) -> int:
+        """Get the code for a value, taking a reference to it"""
+        code = self.codes.get(value)
+        if code is None:
+            if self._free:
+                code = self._free.pop()
+                self.values[code] = value
+            else:
+                code = len(self.values)
+                self.values.append(value)
+                self.refs.append(0)
+            self.codes[value] = code
+        self.refs[code] += 1
+        return code
+
+    def release(self, code: int):
+        """Drop a reference taken by encode(), freeing the code with its last reference"""
+        self.refs[code] -= 1
+        if not self.refs[code]:
+            del self.codes[self.values[code]]
+            self.values[code] = None
+            self._free.append(code)
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+class TransactionColumns:
+    """Transactions stored column-wise in slots, instead of one dict per row.
+
+    Amounts, scores and epoch timestamps live in typed arrays; type,
+    merchant, category, status, risk level and customer id are dictionary
+    encoded into unsigned int arrays, so each distinct string is held once.
+    A bitmask per slot records which known fields the row had. Values that
+    do not fit their column (a non-string merchant, a timestamp that does
+    not round-trip through isoformat, unknown fields) go to a per-slot
+    extras dict, so materialize() always returns the row that was stored,
+    except that integer amounts and scores come back as floats. Freed slots
+    are reused, and releasing a slot drops its dictionary references, so
+    strings of evicted rows are freed too.
+    """
+
+    def __init__(self):
+        self.ids: List[Optional[str]] = []
+        self.timestamps = array('d')
+        self.present = array('H')
+        self.flags = array('b')
+        self.floats = {field: array('d') for field in FLOAT_FIELDS}
+        self.codes = {field: array('I') for field in CODED_FIELDS}
+        self.dictionaries = {field: ValueDictionary() for field in CODED_FIELDS}
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        self._free: List[int] = []
+        # field -> (presence bit, slot decoder), so reads are one dict lookup and a call
+        self._decoders: Dict[str, Tuple[int, Callable[[int], Any]]] = {
+            field: (FIELD_BITS[field], self._code_decoder(field)) for field in CODED_FIELDS
+        }
+        self._decoders.update({field: (FIELD_BITS[field], self.floats[field].__getitem__) for field in FLOAT_FIELDS})
+        self._decoders['timestamp'] = (FIELD_BITS['timestamp'], lambda slot: _iso(self.timestamps[slot]))
+        self._decoders['is_fraud'] = (FIELD_BITS['is_fraud'], lambda slot: bool(self.flags[slot]))
+        self._coded_bits = [(field, FIELD_BITS[field]) for field in CODED_FIELDS]
+
+    def _code_decoder(self, field: str) -> Callable[[int], Any]:
+        values = self.dictionaries[field].values
+        codes = self.codes[field]
+        return lambda slot: values[codes[slot]]
+
+    def __len__(self) -> int:
+        return len(self.ids) - len(self._free)
+
+    def _new_slot(self) -> int:
+        if self._free:
+            return self._free.pop()
+        self.ids.append(None)
+        self.timestamps.append(0.0)
+        self.present.append(0)
+        self.flags.append(0)
+        for column in self.floats.values():
+            column.append(0.0)
+        for column in self.codes.values():
+            column.append(0)
+        return len(self.ids) - 1
+
+    def append(self, tx: Dict[str, Any], timestamp: float) -> int:
+        """Encode a transaction into a free slot and return the slot"""
+        slot = self._new_slot()
+        present = 0
+        extras = None
+        for field, value in tx.items():
+            bit = FIELD_BITS.get(field)
+            if field == 'transaction_id':
+                self.ids[slot] = value
+                continue
+            if bit is not None:
+                if field in self.codes:
+                    if type(value) is str:
+                        self.codes[field][slot] = self.dictionaries[field].encode(value)
+                        present |= bit
+                        continue
+                elif field in self.floats:
+                    if type(value) is float or type(value) is int:
+                        self.floats[field][slot] = value
+                        present |= bit
+                        continue
+                elif field == 'timestamp':
+                    if type(value) is str and _iso(timestamp) == value:
+                        present |= bit
+                        continue
+                elif type(value) is bool:
+                    self.flags[slot] = value
+                    present |= bit
+                    continue
+            if extras is None:
+                extras = self.extras[slot] = {}
+            extras[field] = value
+        self.timestamps[slot] = timestamp
+        self.present[slot] = present
+        return slot
+
+    def release(self, slot: int):
+        """Free a slot for reuse; views of it must no longer be read"""
+        present = self.present[slot]
+        for field, bit in self._coded_bits:
+            if present & bit:
+                self.dictionaries[field].release(self.codes[field][slot])
+        self.present[slot] = 0
+        self.ids[slot] = None
+        self.extras.pop(slot, None)
+        self._free.append(slot)
+
+    def get(self, slot: int, field: str, default: Any = None) -> Any:
+        """Decode one field of a slot, or return default if the row lacks it"""
+        decoder = self._decoders.get(field)
+        if decoder is not None:
+            if self.present[slot] & decoder[0]:
+                return decoder[1](slot)
+        elif field == 'transaction_id':
+            return self.ids[slot]
+        extras = self.extras.get(slot)
+        if extras is None:
+            return default
+        return extras.get(field, default)
+
+    def value(self, slot: int, field: str) -> Any:
+        """Decode one field of a slot, raising KeyError if the row lacks it"""
+        value = self.get(slot, field, _MISSING)
+        if value is _MISSING:
+            raise KeyError(field)
+        return value
+
+    def fields(self, slot: int) -> List[str]:
+        present = self.present[slot]
+        fields = ['transaction_id']
+        fields.extend(field for field in FIELD_ORDER if present & FIELD_BITS[field])
+        extras = self.extras.get(slot)
+        if extras:
+            fields.extend(extras)
+        return fields
+
+    def materialize(self, slot: int) -> Dict[str, Any]:
+        """Build the plain dict for a slot, e.g. for JSON encoding"""
+        get = self.get
+        return {field: get(slot, field) for field in self.fields(slot)}
+
+    def row(self, slot: int) -> 'TransactionRow':
+        return TransactionRow(self, slot)
+
+
+class TransactionRow(Mapping):
+    """Read-only dict-like view of one stored transaction.
+
+    Views are only valid while their row is stored; listeners and queries
+    read them synchronously, and anything kept past that copies them with
+    dict(row).
+    """
+
+    __slots__ = ('_columns', '_slot')
+
+    def __init__(self, columns: TransactionColumns, slot: int):
+        self._columns = columns
+        self._slot = slot
+
+    def __getitem__(self, field: str) -> Any:
+        return self._columns.value(self._slot, field)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return self._columns.get(self._slot, field, default)
+
+    def keys(self) -> List[str]:
+        return self._columns.fields(self._slot)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns.fields(self._slot))
+
+    def __len__(self) -> int:
+        return len(self._columns.fields(self._slot))
+
+    def __repr__(self) -> str:
+        return f"TransactionRow({self._columns.materialize(self._slot)!r})"
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Transaction Generator
+Synthetic transactions shaped like get_live_data rows, at a chosen rate and cardinality
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+CATEGORIES = ['technology', 'automotive', 'electronics', 'financial', 'jewelry', 'travel', 'gaming', 'grocery']
+STATUSES = ['approved', 'completed', 'pending', 'failed']
+TRANSACTION_TYPES = ['credit_card', 'paypal']
+
+
+def generate_transactions(count: int, seed: int = 42, timestamp: Optional[float] = None):
+    """Generate transactions with the same fields get_live_data produces, stamped with now (or ``timestamp``)"""
+    rng = random.Random(seed)
+    stamp = datetime.fromtimestamp(timestamp if timestamp is not None else time.time()).isoformat()
+    return [
+        {
+            'transaction_id': f'BENCH_{i:08d}',
+            'transaction_type': rng.choice(TRANSACTION_TYPES),
+            'merchant': f'Merchant {rng.randint(1, 500)}',
+            'category': rng.choice(CATEGORIES),
+            'amount': round(rng.lognormvariate(6.5, 1.5), 2),
+            'status': rng.choice(STATUSES),
+            'customer_id': f'CUST_{rng.randint(1, 50000):06d}',
+            'timestamp': stamp
+        }
+        for i in range(count)
+    ]
+
+
+class TransactionGenerator:
+    """Makes rows with the fields get_live_data produces, before scoring.
+
+    ``customers`` and ``merchants`` set the cardinality of those columns,
+    which drives index, sketch and customer-feature sizes. Amounts are
+    log-normal like card spend, and ``hot_customers`` share of rows go to
+    the first 1% of customers, so velocity rules have something to find.
+    Ids are sequential per ``prefix``, so generators with different
+    prefixes never collide.
+    """
+
+    def __init__(self, customers: int = 50000, merchants: int = 500, hot_customers: float = 0.0,
+                 seed: int = 42, prefix: str = 'SYN'):
+        self.customers = customers
+        self.merchants = merchants
+        self.hot_customers = hot_customers
+        self.prefix = prefix
+        self.produced = 0
+        self._random = random.Random(seed)
+
+    def make(self, count: int, timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Generate the next ``count`` rows, stamped with now (or ``timestamp``)"""
+        rng = self._random
+        stamp = datetime.fromtimestamp(timestamp if timestamp is not None else time.time()).isoformat()
+        hot = max(1, self.customers // 100)
+        rows = []
+        for i in range(self.produced, self.produced + count):
+            if self.hot_customers and rng.random() < self.hot_customers:
+                customer = rng.randint(1, hot)
+            else:
+                customer = rng.randint(1, self.customers)
+            rows.append({
+                'transaction_id': f'{self.prefix}_{i:010d}',
+                'transaction_type': rng.choice(TRANSACTION_TYPES),
+                'merchant': f'Merchant {rng.randint(1, self.merchants)}',
+                'category': rng.choice(CATEGORIES),
+                'amount': round(rng.lognormvariate(6.5, 1.5), 2),
+                'status': rng.choice(STATUSES),
+                'customer_id': f'CUST_{customer:06d}',
+                'timestamp': stamp
+            })
+        self.produced += count
+        return rows
+
+    async def produce(self, broker, topics: Dict[str, str], rate: float, tick: float = 0.1):
+        """Feed ``rate`` rows per second into a broker until cancelled, keyed by customer"""
+        carry = 0.0
+        next_tick = time.monotonic()
+        while True:
+            carry += rate * tick
+            count = int(carry)
+            carry -= count
+            for tx in self.make(count):
+                broker.produce(topics[tx['transaction_type']], tx, key=tx['customer_id'])
+            next_tick += tick
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
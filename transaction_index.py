@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Transaction Index
+Secondary indexes over the live store so filtered queries skip the full scan
+"""
+
+import bisect
+import math
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:  # pragma: no cover - exercised only without sortedcontainers
+    SortedList = None
+
+from search_index import SearchIndex
+
+# Fields with a hash index: value -> set of transaction ids
+HASH_FIELDS = ('transaction_type', 'status', 'risk_level', 'customer_id', 'category')
+# Hash-indexed fields the query matches by substring; their distinct values are scanned instead of rows
+SUBSTRING_INDEXED = ('category',)
+
+_EMPTY: Set[str] = frozenset()
+
+
+class _BisectList(list):
+    """Stand-in for SortedList when sortedcontainers is missing.
+
+    Inserts and removals shift the list (O(n) memmove), which is fine up to a
+    few hundred thousand rows; install sortedcontainers for larger stores.
+    """
+
+    def add(self, value):
+        bisect.insort(self, value)
+
+    def remove(self, value):
+        index = bisect.bisect_left(self, value)
+        if index < len(self) and self[index] == value:
+            del self[index]
+
+    def bisect_left(self, value) -> int:
+        return bisect.bisect_left(self, value)
+
+
+def _amount(tx: Dict[str, Any]) -> float:
+    return float(tx.get('amount', 0) or 0)
+
+
+class TransactionIndex:
+    """Store listener maintaining hash indexes and a sorted amount index.
+
+    Every hash-indexed field maps each distinct value to the set of ids
+    holding it, which covers the low-cardinality filters as well as the
+    per-customer lookup. Amounts live in a sorted list of (amount, id) pairs
+    so a range is two binary searches, and free text goes through a trigram
+    SearchIndex. ``candidate_ids`` intersects the posting sets smallest
+    first; rows it returns are still checked with TransactionQuery.matches
+    for the filters no index covers.
+    """
+
+    def __init__(self, fields: Tuple[str, ...] = HASH_FIELDS):
+        self.fields: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in fields}
+        self.amounts = SortedList() if SortedList is not None else _BisectList()
+        self.search = SearchIndex()
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def on_insert(self, tx: Dict[str, Any]):
+        tx_id = tx.get('transaction_id')
+        for field, postings in self.fields.items():
+            ids = postings.get(tx.get(field))
+            if ids is None:
+                ids = postings[tx.get(field)] = set()
+            ids.add(tx_id)
+        self.amounts.add((_amount(tx), tx_id))
+        self.search.on_insert(tx)
+
+    def on_evict(self, tx: Dict[str, Any]):
+        tx_id = tx.get('transaction_id')
+        for field, postings in self.fields.items():
+            value = tx.get(field)
+            ids = postings.get(value)
+            if ids is not None:
+                ids.discard(tx_id)
+                if not ids:
+                    del postings[value]
+        self.amounts.remove((_amount(tx), tx_id))
+        self.search.on_evict(tx)
+
+    def values(self, field: str) -> Dict[Any, int]:
+        """Get the distinct values of an indexed field with their row counts"""
+        return {value: len(ids) for value, ids in self.fields[field].items()}
+
+    def ids_for(self, field: str, value: Any) -> Set[str]:
+        """Get the ids of rows whose field equals value (do not mutate)"""
+        return self.fields[field].get(value, _EMPTY)
+
+    def amount_bounds(self, min_amount: Optional[float], max_amount: Optional[float]) -> Tuple[int, int]:
+        """Get the [lo, hi) positions of an inclusive amount range in the sorted index"""
+        lo = 0 if min_amount is None else self.amounts.bisect_left((min_amount,))
+        hi = len(self.amounts) if max_amount is None else self.amounts.bisect_left((math.nextafter(max_amount, math.inf),))
+        return lo, max(lo, hi)
+
+    def candidate_ids(self, query) -> Optional[Set[str]]:
+        """Get ids that can match the query, or None if no index applies"""
+        sources: List[Tuple[int, Any]] = []
+        for field, value in query.exact.items():
+            if field in self.fields:
+                ids = self.ids_for(field, value)
+                sources.append((len(ids), ids))
+        for field, needle in query.substring.items():
+            if field in self.fields and field in SUBSTRING_INDEXED:
+                postings = [ids for value, ids in self.fields[field].items() if needle in str(value or '').lower()]
+                ids = postings[0] if len(postings) == 1 else set().union(*postings)
+                sources.append((len(ids), ids))
+        if query.search:
+            ids = self.search.candidate_ids(query.search)
+            sources.append((len(ids), ids))
+        amount_range = None
+        if query.min_amount is not None or query.max_amount is not None:
+            amount_range = self.amount_bounds(query.min_amount, query.max_amount)
+            sources.append((amount_range[1] - amount_range[0], None))
+        if not sources:
+            return None
+
+        sources.sort(key=lambda source: source[0])
+        _, result = sources[0]
+        if result is None:
+            lo, hi = amount_range
+            result = {tx_id for _, tx_id in self.amounts[lo:hi]}
+        for _, ids in sources[1:]:
+            if not result:
+                break
+            if ids is not None:
+                # The amount range is only used when it is the most selective source;
+                # otherwise matches() checks amounts on the already narrowed rows
+                result = result & ids
+        return result
+
+    def lookup(self, query, store) -> Iterable[Tuple[float, Dict[str, Any]]]:
+        """Get the (timestamp, transaction) entries a query needs to examine.
+
+        Falls back to every entry in the store when the query has no indexed
+        filter. Like store.entries(), consume the result before the next await.
+        """
+        ids = self.candidate_ids(query)
+        if ids is None:
+            return store.entries()
+        entry = store.entry
+        return [found for found in map(entry, ids) if found is not None]
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Transaction Query
+Server-side filtering, sorting and cursor pagination over the live store
+"""
+
+import base64
+import heapq
+import json
+from operator import itemgetter
+from typing import Dict, Any, Iterable, List, Mapping, Optional, Tuple
+
+from search_index import SEARCH_FIELDS
+from transaction_store import parse_timestamp
+
+# Sortable fields and whether they compare as numbers
+SORT_FIELDS = {
+    'relevance': True,
+    'timestamp': True,
+    'amount': True,
+    'fraud_risk_score': True,
+    'merchant': False,
+    'category': False,
+    'transaction_id': False
+}
+EXACT_FIELDS = ('transaction_type', 'status', 'risk_level', 'customer_id')
+SUBSTRING_FIELDS = ('merchant', 'category')
+
+
+def encode_cursor(key: Tuple[Any, str]) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        value, tx_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    # Relevance keys are (tier, timestamp) pairs, which JSON turns into lists
+    return (tuple(value) if isinstance(value, list) else value), tx_id
+
+
+def _parse_amount(params: Mapping[str, str], name: str) -> Optional[float]:
+    value = params.get(name, '')
+    if value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+
+
+class TransactionQuery:
+    """Filters, sort order and page position parsed from request parameters.
+
+    Supports the same filters as the dashboard page: exact matches on type,
+    status, risk level and customer, case-insensitive substring matches on
+    merchant and category, an amount range and free text over id, merchant,
+    category and customer. Pages are keyset-paginated on (sort value,
+    transaction_id), so a cursor stays valid while new rows arrive.
+    Sorting by relevance ranks exact field matches above prefix matches
+    above other substring matches, newest first within a rank.
+    """
+
+    def __init__(self, exact: Optional[Dict[str, str]] = None, substring: Optional[Dict[str, str]] = None,
+                 min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+                 search: str = '', sort: str = 'timestamp', descending: bool = True,
+                 limit: int = 100, cursor: Optional[str] = None):
+        self.exact = exact or {}
+        self.substring = {field: value.lower() for field, value in (substring or {}).items()}
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.search = search.lower()
+        self.sort = sort
+        self.descending = descending
+        self.limit = limit
+        self.after = decode_cursor(cursor) if cursor else None
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, str], default_limit: int = 100,
+                    max_limit: int = 1000, default_sort: str = 'timestamp') -> 'TransactionQuery':
+        """Parse query-string parameters, raising ValueError for bad input"""
+        sort = params.get('sort', default_sort)
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of: {', '.join(SORT_FIELDS)}")
+        order = params.get('order', 'desc')
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be 'asc' or 'desc'")
+        try:
+            limit = int(params.get('limit', default_limit))
+        except ValueError:
+            raise ValueError("limit must be an integer") from None
+        if not 1 <= limit <= max_limit:
+            raise ValueError(f"limit must be between 1 and {max_limit}")
+
+        return cls(
+            exact={field: params[field] for field in EXACT_FIELDS if params.get(field)},
+            substring={field: params[field] for field in SUBSTRING_FIELDS if params.get(field)},
+            min_amount=_parse_amount(params, 'min_amount'),
+            max_amount=_parse_amount(params, 'max_amount'),
+            search=params.get('q', ''),
+            sort=sort,
+            descending=order == 'desc',
+            limit=limit,
+            cursor=params.get('cursor') or None
+        )
+
+    @property
+    def is_filtered(self) -> bool:
+        return bool(self.exact or self.substring or self.search or
+                    self.min_amount is not None or self.max_amount is not None)
+
+    def matches(self, tx: Dict[str, Any]) -> bool:
+        """Check a transaction against every filter"""
+        for field, value in self.exact.items():
+            if tx.get(field) != value:
+                return False
+        amount = tx.get('amount', 0) or 0
+        if self.min_amount is not None and amount < self.min_amount:
+            return False
+        if self.max_amount is not None and amount > self.max_amount:
+            return False
+        # Missing values match nothing, as in the indexes (not the text 'none')
+        for field, value in self.substring.items():
+            if value not in str(tx.get(field) or '').lower():
+                return False
+        if self.search:
+            return any(self.search in str(tx.get(field) or '').lower() for field in SEARCH_FIELDS)
+        return True
+
+    def relevance(self, tx: Dict[str, Any]) -> int:
+        """Rank how well a row matches the search text: 3 exact, 2 prefix, 1 substring, 0 none"""
+        needle = self.search
+        if not needle:
+            return 0
+        best = 0
+        for field in SEARCH_FIELDS:
+            value = str(tx.get(field) or '').lower()
+            if value == needle:
+                return 3
+            if value.startswith(needle):
+                best = 2
+            elif best == 0 and needle in value:
+                best = 1
+        return best
+
+    def sort_key(self, timestamp: float, tx: Dict[str, Any]) -> Tuple[Any, str]:
+        """Get the (sort value, transaction_id) key used for ordering and cursors"""
+        if self.sort == 'timestamp':
+            value = timestamp
+        elif self.sort == 'relevance':
+            value = (self.relevance(tx), timestamp)
+        elif SORT_FIELDS[self.sort]:
+            value = float(tx.get(self.sort, 0) or 0)
+        else:
+            value = str(tx.get(self.sort, '') or '')
+        return value, str(tx.get('transaction_id', ''))
+
+    def execute(self, entries: Iterable[Tuple[float, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run the query over (timestamp, transaction) entries.
+
+        Returns one page of transactions, a cursor for the next page and a
+        summary (count, amount, high risk, fraud) of every matching row. Page
+        rows are the objects passed in (store views), so encode them before
+        the next await.
+        """
+        summary = {'total_transactions': 0, 'total_amount': 0.0, 'high_risk_count': 0, 'fraud_count': 0}
+        matches = self.matches if self.is_filtered else None
+        sort_key = self.sort_key
+        after, descending = self.after, self.descending
+
+        def candidates():
+            # A generator, so the heap below holds limit + 1 rows rather than every match
+            for timestamp, tx in entries:
+                if matches is not None and not matches(tx):
+                    continue
+                summary['total_transactions'] += 1
+                summary['total_amount'] += tx.get('amount', 0) or 0
+                if (tx.get('fraud_risk_score', 0) or 0) > 0.7:
+                    summary['high_risk_count'] += 1
+                if tx.get('is_fraud', False):
+                    summary['fraud_count'] += 1
+                key = sort_key(timestamp, tx)
+                if after is None or (key < after if descending else key > after):
+                    yield key, tx
+
+        select = heapq.nlargest if descending else heapq.nsmallest
+        page = select(self.limit + 1, candidates(), key=itemgetter(0))
+        has_more = len(page) > self.limit
+        page = page[:self.limit]
+        summary['total_amount'] = round(summary['total_amount'], 2)
+        return {
+            'transactions': [tx for _, tx in page],
+            'next_cursor': encode_cursor(page[-1][0]) if has_more else None,
+            'summary': summary
+        }
+
+    def merge_pages(self, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine pages that each node computed for this query into one page.
+
+        Every node applies the same cursor, so the best ``limit`` rows of the
+        union are the global page and the last row's key is the next cursor.
+        Summaries add up because nodes hold disjoint rows.
+        """
+        keyed = [(self.sort_key(parse_timestamp(tx.get('timestamp')), tx), tx)
+                 for page in pages for tx in page['transactions']]
+        select = heapq.nlargest if self.descending else heapq.nsmallest
+        rows = select(self.limit, keyed, key=itemgetter(0))
+        has_more = len(keyed) > self.limit or any(page['next_cursor'] for page in pages)
+        summary = {'total_transactions': 0, 'total_amount': 0.0, 'high_risk_count': 0, 'fraud_count': 0}
+        for page in pages:
+            for field in summary:
+                summary[field] += page['summary'][field]
+        summary['total_amount'] = round(summary['total_amount'], 2)
+        return {
+            'transactions': [tx for _, tx in rows],
+            'next_cursor': encode_cursor(rows[-1][0]) if has_more and rows else None,
+            'summary': summary
+        }
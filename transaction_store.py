@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Transaction Store
+Bounded, time-ordered in-memory store shared by every dashboard handler
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from transaction_columns import TransactionColumns, TransactionRow
+
+# Fields written by scoring rather than by the source
+SCORE_FIELDS = ('fraud_risk_score', 'risk_level')
+
+
+def parse_timestamp(value: Any) -> float:
+    """Convert an ISO-8601 string or epoch number into epoch seconds"""
+    if isinstance(value, (int, float)):
+        # Kafka/Lenses timestamps are usually epoch milliseconds
+        return value / 1000.0 if value > 1e11 else float(value)
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+class TransactionStore:
+    """Scored transactions keyed by transaction_id, oldest first.
+
+    A single ingestion task writes to the store; HTTP and WebSocket handlers
+    only read snapshots, so upstream load does not depend on client count.
+    Rows are immutable once stored. They are kept in TransactionColumns and
+    handed out as TransactionRow views; plain dicts are only built for
+    get(), snapshot() and JSON responses.
+    """
+
+    def __init__(self, max_transactions: int = 10000, retention_seconds: float = 3600):
+        self.max_transactions = max_transactions
+        self.retention_seconds = retention_seconds
+        self._columns = TransactionColumns()
+        # transaction_id -> column slot, oldest first
+        self._rows: "OrderedDict[str, int]" = OrderedDict()
+        self.version = 0
+        self.last_updated: Optional[str] = None
+        self._listeners: List[Any] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, transaction_id: str) -> bool:
+        return transaction_id in self._rows
+
+    def add_listener(self, listener: Any):
+        """Register an object with on_insert(tx) and on_evict(tx) callbacks.
+
+        Listeners see every row exactly once on the way in and once on the
+        way out, which lets them maintain aggregates incrementally. A
+        listener may also define on_replace(old, new) for re-delivered rows;
+        otherwise a replacement is reported as an evict followed by an insert.
+        Rows are passed as TransactionRow views, valid during the callback
+        and for as long as the row stays stored.
+        """
+        self._listeners.append(listener)
+
+    def _notify_insert(self, tx: Dict[str, Any]):
+        for listener in self._listeners:
+            listener.on_insert(tx)
+
+    def _notify_evict(self, tx: Dict[str, Any]):
+        for listener in self._listeners:
+            listener.on_evict(tx)
+
+    def _notify_replace(self, old: Dict[str, Any], new: Dict[str, Any]):
+        for listener in self._listeners:
+            on_replace = getattr(listener, 'on_replace', None)
+            if on_replace is not None:
+                on_replace(old, new)
+            else:
+                listener.on_evict(old)
+                listener.on_insert(new)
+
+    def upsert_many(self, transactions: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace transactions, returning how many rows changed"""
+        changed = 0
+        columns = self._columns
+        for tx in transactions:
+            tx_id = tx.get('transaction_id')
+            if not tx_id:
+                continue
+            existing = self._rows.get(tx_id)
+            if existing is not None:
+                if columns.materialize(existing) == tx:
+                    continue
+                # Re-delivered rows move to the end so the store stays time-ordered
+                slot = columns.append(tx, parse_timestamp(tx.get('timestamp')))
+                del self._rows[tx_id]
+                self._rows[tx_id] = slot
+                self._notify_replace(columns.row(existing), columns.row(slot))
+                columns.release(existing)
+            else:
+                slot = self._rows[tx_id] = columns.append(tx, parse_timestamp(tx.get('timestamp')))
+                self._notify_insert(columns.row(slot))
+            changed += 1
+
+        changed += self.evict()
+        if changed:
+            self.version += 1
+            self.last_updated = datetime.now().isoformat()
+        return changed
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Drop rows beyond the size bound or older than the retention window"""
+        evicted = 0
+        while len(self._rows) > self.max_transactions:
+            self._evict_oldest()
+            evicted += 1
+
+        if self.retention_seconds:
+            cutoff = (now if now is not None else time.time()) - self.retention_seconds
+            timestamps = self._columns.timestamps
+            while self._rows:
+                if timestamps[next(iter(self._rows.values()))] >= cutoff:
+                    break
+                self._evict_oldest()
+                evicted += 1
+        return evicted
+
+    def _evict_oldest(self):
+        _, slot = self._rows.popitem(last=False)
+        self._notify_evict(self._columns.row(slot))
+        self._columns.release(slot)
+
+    def is_unchanged(self, tx: Dict[str, Any]) -> bool:
+        """Check whether a re-delivered row equals its stored version, scores aside"""
+        slot = self._rows.get(tx.get('transaction_id'))
+        if slot is None:
+            return False
+        stored = self._columns.materialize(slot)
+        return ({k: v for k, v in stored.items() if k not in SCORE_FIELDS} ==
+                {k: v for k, v in tx.items() if k not in SCORE_FIELDS})
+
+    def get(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single stored transaction by id"""
+        slot = self._rows.get(transaction_id)
+        return self._columns.materialize(slot) if slot is not None else None
+
+    def entry(self, transaction_id: str) -> Optional[Tuple[float, TransactionRow]]:
+        """Get the (epoch timestamp, row view) pair stored for an id"""
+        slot = self._rows.get(transaction_id)
+        if slot is None:
+            return None
+        return self._columns.timestamps[slot], TransactionRow(self._columns, slot)
+
+    def entries(self) -> Iterable[Tuple[float, TransactionRow]]:
+        """Get (epoch timestamp, row view) pairs, oldest first.
+
+        This is a live view: consume it before the next await.
+        """
+        columns = self._columns
+        timestamps = columns.timestamps
+        return ((timestamps[slot], TransactionRow(columns, slot)) for slot in self._rows.values())
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Get a point-in-time list of stored transactions, oldest first"""
+        materialize = self._columns.materialize
+        return [materialize(slot) for slot in self._rows.values()]
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Windowed Metrics
+Sliding and tumbling time-window aggregates backed by per-second ring buffers
+"""
+
+import time
+from array import array
+from typing import Dict, Any, List, Optional
+
+from metrics_aggregator import to_cents
+from transaction_store import parse_timestamp
+
+# Sliding windows reported by /api/metrics/windows, in seconds
+WINDOWS = {
+    '1m': 60,
+    '5m': 300,
+    '1h': 3600
+}
+
+
+def parse_window(value: str, max_seconds: int = max(WINDOWS.values()), name: str = 'window') -> int:
+    """Parse a duration such as '90', '90s', '5m' or '1h' into seconds, raising ValueError unless 1..max_seconds.
+
+    ``name`` is the query parameter the error message refers to.
+    """
+    seconds = WINDOWS.get(value)
+    if seconds is None:
+        units = {'s': 1, 'm': 60, 'h': 3600}
+        number, unit = (value[:-1], units[value[-1]]) if value and value[-1] in units else (value, 1)
+        try:
+            seconds = int(number) * unit
+        except ValueError:
+            seconds = None
+    if seconds is None or not 0 < seconds <= max_seconds:
+        raise ValueError(f"Invalid {name} '{value}': use Ns, Nm or Nh (e.g. 90s, 5m, 1h), "
+                         f"at most {max_seconds} seconds")
+    return seconds
+
+
+def merge_summaries(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add up one window's summaries from several nodes"""
+    count = sum(summary['count'] for summary in summaries)
+    flagged = sum(summary['flagged_count'] for summary in summaries)
+    return {
+        'count': count,
+        'amount': round(sum(summary['amount'] for summary in summaries), 2),
+        'flagged_count': flagged,
+        # Every node divides by the same window length, so rates add up too
+        'throughput_per_sec': sum(summary['throughput_per_sec'] for summary in summaries),
+        'fraud_rate': flagged / count if count else 0.0
+    }
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine snapshot() results taken with the same parameters on several nodes"""
+    first = snapshots[0]
+    points: Dict[int, List[Dict[str, Any]]] = {}
+    for snapshot in snapshots:
+        for point in snapshot['series']['points']:
+            points.setdefault(point['start'], []).append(point)
+    return {
+        'windows': {name: merge_summaries([snapshot['windows'][name] for snapshot in snapshots])
+                    for name in first['windows']},
+        'series': {
+            'interval_seconds': first['series']['interval_seconds'],
+            'window_seconds': first['series']['window_seconds'],
+            'points': [{**merge_summaries(points[start]), 'start': start} for start in sorted(points)]
+        }
+    }
+
+
+class WindowedMetrics:
+    """Per-second buckets in fixed-size ring buffers, keyed by transaction time.
+
+    Bucket ``slot = second % capacity`` is reused once the ring wraps, so
+    memory stays constant however long the process runs. A transaction is
+    counted in the second of its own timestamp, not the second it arrived.
+    """
+
+    def __init__(self, capacity_seconds: int = max(WINDOWS.values())):
+        self.capacity = capacity_seconds
+        self._seconds = array('q', [-1]) * capacity_seconds
+        self._counts = array('q', [0]) * capacity_seconds
+        self._amount_cents = array('q', [0]) * capacity_seconds
+        self._flagged = array('q', [0]) * capacity_seconds
+        self._latest_second = -1
+
+    def _slot(self, second: int, create: bool) -> int:
+        """Get the ring slot for a second, or -1 if it has already rotated out"""
+        if second <= self._latest_second - self.capacity:
+            return -1
+        slot = second % self.capacity
+        if self._seconds[slot] != second:
+            if not create:
+                return -1
+            self._seconds[slot] = second
+            self._counts[slot] = 0
+            self._amount_cents[slot] = 0
+            self._flagged[slot] = 0
+        if second > self._latest_second:
+            self._latest_second = second
+        return slot
+
+    def _apply(self, tx: Dict[str, Any], sign: int):
+        slot = self._slot(int(parse_timestamp(tx.get('timestamp'))), create=sign > 0)
+        if slot < 0:
+            return
+        self._counts[slot] += sign
+        self._amount_cents[slot] += sign * to_cents(tx.get('amount', 0))
+        if tx.get('is_fraud', False) or tx.get('risk_level') == 'HIGH':
+            self._flagged[slot] += sign
+
+    def on_insert(self, tx: Dict[str, Any]):
+        """Count a newly stored transaction in its second's bucket"""
+        self._apply(tx, 1)
+
+    def on_replace(self, old: Dict[str, Any], new: Dict[str, Any]):
+        """Move a re-delivered transaction without double counting it"""
+        self._apply(old, -1)
+        self._apply(new, 1)
+
+    def on_evict(self, tx: Dict[str, Any]):
+        """Store evictions do not retract: windows expire as the ring rotates"""
+
+    def _summarize(self, start: int, end: int) -> Dict[str, Any]:
+        """Aggregate the buckets for seconds in [start, end)"""
+        count = cents = flagged = 0
+        for second in range(max(start, end - self.capacity), end):
+            slot = second % self.capacity
+            if self._seconds[slot] == second:
+                count += self._counts[slot]
+                cents += self._amount_cents[slot]
+                flagged += self._flagged[slot]
+        seconds = end - start
+        return {
+            'count': count,
+            'amount': cents / 100.0,
+            'flagged_count': flagged,
+            'throughput_per_sec': count / seconds if seconds else 0.0,
+            'fraud_rate': flagged / count if count else 0.0
+        }
+
+    def sliding(self, window_seconds: int, now: Optional[float] = None) -> Dict[str, Any]:
+        """Aggregate the last ``window_seconds`` seconds ending now"""
+        end = int(now if now is not None else time.time()) + 1
+        return self._summarize(end - min(window_seconds, self.capacity), end)
+
+    def tumbling(self, interval_seconds: int, window_seconds: int,
+                 now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Series of aligned ``interval_seconds`` buckets covering the window"""
+        interval_seconds = max(1, min(interval_seconds, self.capacity))
+        now_second = int(now if now is not None else time.time())
+        last_start = now_second - now_second % interval_seconds
+        points = max(1, -(-min(window_seconds, self.capacity) // interval_seconds))
+        first_start = last_start - (points - 1) * interval_seconds
+
+        series = []
+        for start in range(first_start, last_start + 1, interval_seconds):
+            point = self._summarize(start, start + interval_seconds)
+            point['start'] = start
+            series.append(point)
+        return series
+
+    def snapshot(self, interval_seconds: int, window_seconds: Optional[int] = None,
+                 now: Optional[float] = None) -> Dict[str, Any]:
+        """Get all sliding windows plus a tumbling series for the dashboard"""
+        now = now if now is not None else time.time()
+        window_seconds = window_seconds or self.capacity
+        return {
+            'windows': {name: self.sliding(seconds, now) for name, seconds in WINDOWS.items()},
+            'series': {
+                'interval_seconds': interval_seconds,
+                'window_seconds': min(window_seconds, self.capacity),
+                'points': self.tumbling(interval_seconds, window_seconds, now)
+            }
+        }
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+WebSocket Broadcast
+Pushes transaction and metric deltas to connected dashboard sockets
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeTracker:
+    """Store listener that remembers what changed since the last drain.
+
+    Several writes to the same transaction collapse into its latest version,
+    and a row that is evicted and then re-inserted is reported as an upsert.
+    An evicted row is always reported as removed, even if it was written
+    earlier in the same tick, since clients may hold an older version of it.
+    Only rows still stored are held, and drain() copies them into dicts.
+    """
+
+    def __init__(self):
+        self._upserts: Dict[str, Dict[str, Any]] = {}
+        self._removed: Dict[str, None] = {}
+
+    def on_insert(self, tx: Dict[str, Any]):
+        tx_id = tx.get('transaction_id')
+        self._removed.pop(tx_id, None)
+        self._upserts[tx_id] = tx
+
+    def on_replace(self, old: Dict[str, Any], new: Dict[str, Any]):
+        self.on_insert(new)
+
+    def on_evict(self, tx: Dict[str, Any]):
+        tx_id = tx.get('transaction_id')
+        self._upserts.pop(tx_id, None)
+        self._removed[tx_id] = None
+
+    def drain(self) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Get (upserted rows, removed ids) and start tracking afresh"""
+        upserts, removed = [dict(tx) for tx in self._upserts.values()], list(self._removed)
+        self._upserts = {}
+        self._removed = {}
+        return upserts, removed
+
+
+class ClientChannel:
+    """One socket's bounded send queue and the task that drains it"""
+
+    def __init__(self, ws: web.WebSocketResponse, queue_size: int):
+        self.ws = ws
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.coalesced = 0
+        self.task: Optional[asyncio.Task] = None
+
+
+class Broadcaster:
+    """Fans out pre-encoded messages to every socket without blocking the publisher.
+
+    Each message is JSON-encoded once and offered to every client's bounded
+    queue with put_nowait. A client whose queue is full has its backlog
+    coalesced into a single resync message telling it to re-read the
+    snapshot. A client that stays that far behind, or whose send takes longer
+    than ``send_timeout``, is disconnected, so one slow browser can never
+    stall ingestion or the other clients.
+    """
+
+    RESYNC = json.dumps({'type': 'resync'})
+
+    def __init__(self, queue_size: int = 16, send_timeout: float = 5.0, max_coalesce: int = 3):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.max_coalesce = max_coalesce
+        self.clients: Dict[web.WebSocketResponse, ClientChannel] = {}
+        self.messages_sent = 0
+        self.messages_coalesced = 0
+        self.clients_dropped = 0
+        # Close tasks of dropped clients, held so they are not collected mid-close
+        self._closing: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def register(self, ws: web.WebSocketResponse) -> ClientChannel:
+        """Start pushing to a newly connected socket"""
+        channel = ClientChannel(ws, self.queue_size)
+        channel.task = asyncio.create_task(self._sender(channel))
+        self.clients[ws] = channel
+        return channel
+
+    async def unregister(self, ws: web.WebSocketResponse):
+        """Stop pushing to a socket and wait for its sender to finish"""
+        channel = self.clients.pop(ws, None)
+        if channel is not None and channel.task is not None:
+            channel.task.cancel()
+            try:
+                await channel.task
+            except asyncio.CancelledError:
+                pass
+
+    async def close(self):
+        """Disconnect every client, e.g. on shutdown"""
+        for ws in list(self.clients):
+            await self.unregister(ws)
+            await ws.close()
+
+    def publish(self, message: Dict[str, Any]) -> int:
+        """Queue a message for every client; never awaits, returns clients reached"""
+        if not self.clients:
+            return 0
+        data = json.dumps(message)
+        reached = 0
+        for channel in list(self.clients.values()):
+            try:
+                channel.queue.put_nowait(data)
+                reached += 1
+            except asyncio.QueueFull:
+                self._coalesce(channel)
+        return reached
+
+    def _coalesce(self, channel: ClientChannel):
+        """Replace a full backlog with one resync message, or drop the client"""
+        channel.coalesced += 1
+        self.messages_coalesced += channel.queue.qsize()
+        if channel.coalesced > self.max_coalesce:
+            self._drop(channel, 'too far behind')
+            return
+        while not channel.queue.empty():
+            channel.queue.get_nowait()
+        channel.queue.put_nowait(self.RESYNC)
+
+    def _drop(self, channel: ClientChannel, reason: str):
+        logger.warning(f"Dropping slow WebSocket client: {reason}")
+        self.clients_dropped += 1
+        self.clients.pop(channel.ws, None)
+        if channel.task is not None:
+            channel.task.cancel()
+        task = asyncio.create_task(channel.ws.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _sender(self, channel: ClientChannel):
+        while True:
+            data = await channel.queue.get()
+            try:
+                await asyncio.wait_for(channel.ws.send_str(data), self.send_timeout)
+            except asyncio.TimeoutError:
+                self._drop(channel, f'send took over {self.send_timeout}s')
+                return
+            except (ConnectionResetError, RuntimeError):
+                self.clients.pop(channel.ws, None)
+                return
+            self.messages_sent += 1
+            if channel.queue.empty():
+                channel.coalesced = 0